@@ -25,6 +25,17 @@ bh, ah = signal.butter(N=5, Wn=48, btype="high", fs=16000)
 
 input_audio_path2wav = {}
 
+# feature index -> (faiss index, reconstructed vectors), kept by long-lived processes (rvc_server.py)
+_index_cache = {}
+
+
+def read_index(file_index):
+    mtime = os.path.getmtime(file_index)
+    if file_index not in _index_cache or _index_cache[file_index][0] != mtime:
+        index = faiss.read_index(file_index)
+        _index_cache[file_index] = (mtime, index, index.reconstruct_n(0, index.ntotal))
+    return _index_cache[file_index][1:]
+
 
 @lru_cache
 def cache_harvest_f0(input_audio_path, fs, f0max, f0min, frame_period):
@@ -80,6 +91,12 @@ class Pipeline(object):
         self.t_center = self.sr * self.x_center  # 查询切点位置
         self.t_max = self.sr * self.x_max  # 免查询时长阈值
         self.device = config.device
+        # optional progress(stage, done, total) callback, set by rvc_server.py
+        self.progress = None
+
+    def report(self, stage, done=1, total=1):
+        if self.progress:
+            self.progress(stage, done, total)
 
     def get_f0(
         self,
@@ -307,9 +324,8 @@ class Pipeline(object):
             and index_rate != 0
         ):
             try:
-                index = faiss.read_index(file_index)
                 # big_npy = np.load(file_big_npy)
-                big_npy = index.reconstruct_n(0, index.ntotal)
+                index, big_npy = read_index(file_index)
             except:
                 traceback.print_exc()
                 index = big_npy = None
@@ -368,7 +384,10 @@ class Pipeline(object):
             pitchf = torch.tensor(pitchf, device=self.device).unsqueeze(0).float()
         t2 = ttime()
         times[1] += t2 - t1
-        for t in opt_ts:
+        self.report("f0")
+        segments = len(opt_ts) + 1
+        self.report("infer", 0, segments)
+        for segment, t in enumerate(opt_ts):
             t = t // self.window * self.window
             if if_f0 == 1:
                 audio_opt.append(
@@ -405,6 +424,7 @@ class Pipeline(object):
                     )[self.t_pad_tgt : -self.t_pad_tgt]
                 )
             s = t
+            self.report("infer", segment + 1, segments)
         if if_f0 == 1:
             audio_opt.append(
                 self.vc(
@@ -439,6 +459,7 @@ class Pipeline(object):
                     protect,
                 )[self.t_pad_tgt : -self.t_pad_tgt]
             )
+        self.report("infer", segments, segments)
         audio_opt = np.concatenate(audio_opt)
         if rms_mix_rate != 1:
             audio_opt = change_rms(audio, 16000, audio_opt, tgt_sr, rms_mix_rate)
@@ -0,0 +1,199 @@
+"""
+Long-lived RVC conversion worker.
+
+rvc_inference_v2.py reloads torch, fairseq, HuBERT, RMVPE, the synthesizer
+and the FAISS index for every conversion. This worker loads HuBERT and RMVPE
+once at start, keeps one synthesizer per voice model and the feature indexes
+in memory, and takes conversion jobs over a local socket
+(multiprocessing.connection), so only the first job of a given model pays for
+loading it.
+
+Protocol: one JSON object per message. The client sends jobs
+    {"model": "trump", "input": "in.wav", "transpose": 0, "output": "out.wav"}
+and receives events until the job ends:
+    {"event": "progress", "stage": "load_model" | "f0" | "infer" | "write",
+     "unit": "segment", "done": k, "total": t, "elapsed": s}
+    {"event": "done", "output": path, "seconds": s, "info": RVC status text}
+    {"event": "error", "message": traceback}
+{"command": "ping"} answers {"event": "pong"}, {"command": "shutdown"} stops the worker.
+
+Jobs name arbitrary input and output paths, so only the user who started the
+worker may connect: each start draws a random authkey and writes it to a
+file readable by that user only (--key-file), which the client reads.
+
+Run from this directory (the GUI starts it on demand):
+    python -u rvc_server.py --port 47861
+"""
+
+import os
+import sys
+import json
+import secrets
+import argparse
+import traceback
+from time import perf_counter
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+
+DEFAULT_PORT = 47861
+KEY_DIR = os.path.join(os.path.expanduser("~"), ".cache", "deepfake_pfe")
+
+
+class ResidentRVC:
+    def __init__(self, device=None, is_half=None):
+        from configs.config import Config
+        from infer.modules.vc.utils import load_hubert
+        from infer.lib.rmvpe import RMVPE
+        from rvc_inference_v2 import now_dir
+
+        self.config = Config()
+        if device:
+            self.config.device = device
+        if is_half is not None:
+            self.config.is_half = is_half
+        os.environ["weight_root"] = os.path.join(now_dir, "assets", "weights")
+        os.environ["index_root"] = os.path.join(now_dir, "logs")
+        os.environ["rmvpe_root"] = os.path.join(now_dir, "assets", "rmvpe")
+
+        start = perf_counter()
+        self.hubert = load_hubert(self.config)
+        self.rmvpe = RMVPE(
+            os.path.join(os.environ["rmvpe_root"], "rmvpe.pt"),
+            is_half=self.config.is_half,
+            device=self.config.device,
+        )
+        self.models = {}  # model name -> (VC, index path)
+        print(f"[rvc] HuBERT and RMVPE loaded in {perf_counter() - start:.1f}s", flush=True)
+
+    def model(self, name):
+        """VC instance of a voice model, built on first use and then kept."""
+        if name not in self.models:
+            from infer.modules.vc.modules import VC
+            from rvc_inference_v2 import get_model_paths
+
+            model_path, index_path = get_model_paths(name)
+            vc = VC(self.config)
+            vc.get_vc(os.path.basename(model_path))
+            vc.hubert_model = self.hubert
+            vc.pipeline.model_rmvpe = self.rmvpe
+            self.models[name] = (vc, index_path)
+        return self.models[name]
+
+    def convert(self, job, emit):
+        from scipy.io import wavfile
+
+        start = perf_counter()
+        stage_start = {}
+
+        def progress(stage, done=0, total=1):
+            stage_start.setdefault(stage, perf_counter())
+            emit({
+                "event": "progress",
+                "stage": stage,
+                "unit": "segment" if stage == "infer" else None,
+                "done": done,
+                "total": total,
+                "elapsed": perf_counter() - stage_start[stage],
+            })
+
+        progress("load_model")
+        vc, index_path = self.model(job["model"])
+
+        # f0 and infer are reported by the pipeline itself
+        progress("f0")
+        vc.pipeline.progress = progress
+        try:
+            info, (sr, audio) = vc.vc_single(
+                0,                           # sid
+                job["input"],                # input audio path
+                int(job.get("transpose", 0)),
+                None,                        # f0 file (optional)
+                job.get("f0method", "rmvpe"),
+                index_path,                  # feature index path
+                None,                        # feature index path 2 (optional)
+                job.get("index_rate", 0.7),  # feature ratio
+                3,                           # filter radius (default)
+                0,                           # resample sr (default)
+                1,                           # rms mix rate (default)
+                0.33,                        # protect (default)
+            )
+        finally:
+            vc.pipeline.progress = None
+        if audio is None:
+            raise RuntimeError(info)
+
+        progress("write")
+        os.makedirs(os.path.dirname(os.path.abspath(job["output"])), exist_ok=True)
+        wavfile.write(job["output"], sr, audio)
+        return {"event": "done", "output": job["output"], "seconds": perf_counter() - start, "info": info}
+
+
+def write_key(path, key):
+    """Write the authkey of this worker start to a file only the current user can read (0600)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(key)
+    os.replace(tmp_path, path)
+
+
+def send(conn, event):
+    conn.send_bytes(json.dumps(event).encode())
+
+
+def serve(worker, listener):
+    """Accept clients one after the other; each client may send several jobs."""
+    print(f"[rvc] ready on {listener.address[0]}:{listener.address[1]}", flush=True)
+    while True:
+        try:
+            conn = listener.accept()
+        except AuthenticationError:
+            # wrong or stale key: refuse this client, keep serving
+            continue
+        try:
+            while True:
+                try:
+                    job = json.loads(conn.recv_bytes())
+                except EOFError:
+                    break
+                if job.get("command") == "ping":
+                    send(conn, {"event": "pong"})
+                    continue
+                if job.get("command") == "shutdown":
+                    send(conn, {"event": "done"})
+                    return
+                try:
+                    send(conn, worker.convert(job, lambda event: send(conn, event)))
+                except Exception:
+                    send(conn, {"event": "error", "message": traceback.format_exc()})
+        except (EOFError, ConnectionResetError, BrokenPipeError):
+            # client gone in the middle of a job: wait for the next one
+            pass
+        finally:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident RVC conversion worker")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--device", type=str, default=None, help="Device override (default: RVC Config)")
+    parser.add_argument("--half", action="store_true", help="Use half precision")
+    parser.add_argument("--key-file", type=str, default=None, help="Authkey file (default: ~/.cache/deepfake_pfe/rvc-<port>.key)")
+    args = parser.parse_args()
+    authkey = secrets.token_hex(32)
+
+    # Bound before the models load: a client arriving meanwhile waits in the
+    # handshake instead of finding the port closed and starting a second
+    # worker. A worker already on the port makes this one exit here, before
+    # it overwrites the key file or loads anything.
+    with Listener(("127.0.0.1", args.port), authkey=authkey.encode()) as listener:
+        write_key(args.key_file or os.path.join(KEY_DIR, f"rvc-{args.port}.key"), authkey)
+        # Config() parses sys.argv itself
+        sys.argv = [sys.argv[0]]
+        worker = ResidentRVC(args.device, True if args.half else None)
+        serve(worker, listener)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ import onnxruntime
 import tensorflow
 import roop.globals
 import roop.metadata
+import roop.progress
 import roop.ui as ui
 from roop.predictor import predict_image, predict_video
 from roop.processors.frame.core import get_frame_processors_modules
@@ -149,11 +150,13 @@ def start() -> None:
             update_status('Processing to image failed!')
         return
     # process image to videos
+    roop.progress.set_stage('check')
     if predict_video(roop.globals.target_path):
         destroy()
     update_status('Creating temporary resources...')
     create_temp(roop.globals.target_path)
     # extract frames
+    roop.progress.set_stage('extract')
     if roop.globals.keep_fps:
         fps = detect_fps(roop.globals.target_path)
         update_status(f'Extracting frames with {fps} FPS...')
@@ -164,14 +167,17 @@ def start() -> None:
     # process frame
     temp_frame_paths = get_temp_frame_paths(roop.globals.target_path)
     if temp_frame_paths:
-        for frame_processor in get_frame_processors_modules(roop.globals.frame_processors):
+        frame_processors = get_frame_processors_modules(roop.globals.frame_processors)
+        for step, frame_processor in enumerate(frame_processors):
             update_status('Progressing...', frame_processor.NAME)
+            roop.progress.set_stage('frames', step, len(frame_processors), frame_processor.NAME, 'frame')
             frame_processor.process_video(roop.globals.source_path, temp_frame_paths)
             frame_processor.post_process()
     else:
         update_status('Frames not found...')
         return
     # create video
+    roop.progress.set_stage('encode')
     if roop.globals.keep_fps:
         fps = detect_fps(roop.globals.target_path)
         update_status(f'Creating video with {fps} FPS...')
@@ -192,6 +198,7 @@ def start() -> None:
     # clean temp
     update_status('Cleaning temporary resources...')
     clean_temp(roop.globals.target_path)
+    roop.progress.clear()
     # validate video
     if is_video(roop.globals.target_path):
         update_status('Processing to video succeed!')
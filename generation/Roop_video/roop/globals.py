@@ -20,3 +20,5 @@ max_memory: Optional[int] = None
 execution_providers: List[str] = []
 execution_threads: Optional[int] = None
 log_level: str = 'error'
+# set by resident workers (roop_server.py) to keep models loaded between runs
+keep_models: Optional[bool] = None
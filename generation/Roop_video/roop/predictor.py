@@ -1,4 +1,5 @@
 import threading
+import cv2
 import numpy
 import opennsfw2
 from PIL import Image
@@ -9,6 +10,8 @@ from roop.typing import Frame
 PREDICTOR = None
 THREAD_LOCK = threading.Lock()
 MAX_PROBABILITY = 0.85
+FRAME_INTERVAL = 100
+AGGREGATION_SIZE = 8
 
 
 def get_predictor() -> Model:
@@ -35,9 +38,26 @@ def predict_frame(target_frame: Frame) -> bool:
 
 
 def predict_image(target_path: str) -> bool:
-    return opennsfw2.predict_image(target_path) > MAX_PROBABILITY
+    return predict_frame(numpy.array(Image.open(target_path).convert('RGB')))
 
 
 def predict_video(target_path: str) -> bool:
-    _, probabilities = opennsfw2.predict_video_frames(video_path=target_path, frame_interval=100)
+    # same sampling and aggregation as opennsfw2.predict_video_frames(frame_interval=100),
+    # but with the shared predictor instead of a model built for every video
+    capture = cv2.VideoCapture(target_path)
+    views = []
+    probabilities = []
+    frame_count = 0
+    while capture.isOpened():
+        has_frame, frame = capture.read()
+        if not has_frame:
+            break
+        frame_count += 1
+        if frame_count == 1 or (frame_count + 1) % FRAME_INTERVAL == 0:
+            image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            views.append(opennsfw2.preprocess_image(image, opennsfw2.Preprocessing.YAHOO))
+            if frame_count == 1 or len(views) >= AGGREGATION_SIZE:
+                probabilities.append(numpy.mean(get_predictor().predict(numpy.stack(views), verbose=0)[:, 1]))
+                views = []
+    capture.release()
     return any(probability > MAX_PROBABILITY for probability in probabilities)
@@ -9,6 +9,7 @@ from typing import Any, List, Callable
 from tqdm import tqdm
 
 import roop
+import roop.progress
 
 FRAME_PROCESSORS_MODULES: List[ModuleType] = []
 FRAME_PROCESSORS_INTERFACE = [
@@ -89,3 +90,4 @@ def update_progress(progress: Any = None) -> None:
     })
     progress.refresh()
     progress.update(1)
+    roop.progress.update(progress.n, progress.total)
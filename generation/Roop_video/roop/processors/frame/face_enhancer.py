@@ -55,7 +55,8 @@ def pre_start() -> bool:
 
 
 def post_process() -> None:
-    clear_face_enhancer()
+    if not roop.globals.keep_models:
+        clear_face_enhancer()
 
 
 def enhance_face(target_face: Face, temp_frame: Frame) -> Frame:
@@ -52,7 +52,8 @@ def pre_start() -> bool:
 
 
 def post_process() -> None:
-    clear_face_swapper()
+    if not roop.globals.keep_models:
+        clear_face_swapper()
     clear_face_reference()
 
 
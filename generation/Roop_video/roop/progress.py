@@ -0,0 +1,62 @@
+import threading
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional
+
+# receives every progress event (set by roop_server.py, which forwards them to its client)
+LISTENER: Optional[Callable[[Dict[str, Any]], None]] = None
+THREAD_LOCK = threading.Lock()
+MIN_INTERVAL = 0.1
+
+STAGE: Dict[str, Any] = {}
+LAST_EMIT = 0.0
+
+
+def set_listener(listener: Optional[Callable[[Dict[str, Any]], None]]) -> None:
+    global LISTENER
+
+    LISTENER = listener
+
+
+def emit(event: Dict[str, Any]) -> None:
+    with THREAD_LOCK:
+        if LISTENER:
+            LISTENER(event)
+
+
+def set_stage(stage: str, step: int = 0, steps: int = 1, name: Optional[str] = None, unit: Optional[str] = None) -> None:
+    """Start a stage; its frame updates are reported as step `step` of `steps`."""
+    global STAGE, LAST_EMIT
+
+    STAGE = {'stage': stage, 'step': step, 'steps': steps, 'name': name or stage, 'unit': unit, 'start': perf_counter()}
+    LAST_EMIT = 0.0
+    update(0, 1)
+
+
+def update(done: int, total: int) -> None:
+    """Report `done` of `total` items of the current stage, at most every MIN_INTERVAL seconds."""
+    global LAST_EMIT
+
+    if not STAGE:
+        return
+    now = perf_counter()
+    if done < total and 0 < done and now - LAST_EMIT < MIN_INTERVAL:
+        return
+    LAST_EMIT = now
+    elapsed = now - STAGE['start']
+    emit({
+        'event': 'progress',
+        'stage': STAGE['stage'],
+        'name': STAGE['name'],
+        'step': STAGE['step'],
+        'steps': STAGE['steps'],
+        'unit': STAGE['unit'],
+        'done': done,
+        'total': total,
+        'elapsed': elapsed
+    })
+
+
+def clear() -> None:
+    global STAGE
+
+    STAGE = {}
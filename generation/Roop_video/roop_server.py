@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Resident roop worker.
+
+run.py imports TensorFlow and onnxruntime, builds the NSFW predictor, loads
+buffalo_l, inswapper_128.onnx and GFPGAN for every generation, then exits.
+This worker does it once: it loads everything at start, keeps the models
+between runs (roop.globals.keep_models) and takes jobs over a local socket
+(multiprocessing.connection), so a repeated generation goes straight to frame
+extraction and processing.
+
+Protocol: one JSON object per message. The client sends jobs
+    {"source": "face.jpg", "target": "clip.mp4", "output": "out.mp4", "args": [run.py options]}
+and receives events until the job ends:
+    {"event": "progress", "stage": "check" | "extract" | "frames" | "encode",
+     "name": processor, "step": i, "steps": n, "unit": "frame", "done": k, "total": t, "elapsed": s}
+    {"event": "done", "output": path, "seconds": s}
+    {"event": "error", "message": text}
+"frames" progress comes from roop.processors.frame.core.update_progress (see
+roop/progress.py), once per step for each frame processor.
+{"command": "ping"} answers {"event": "pong"}, {"command": "shutdown"} stops the worker.
+
+Execution providers are fixed per worker start (--execution-provider on this
+script): the resident sessions keep the providers they were built with, so a
+job whose args ask for other providers is refused with an error event. Jobs
+without --execution-provider run on the worker's providers.
+
+Jobs name arbitrary source, target and output paths (the output is removed
+first), so only the user who started the worker may connect: each start draws
+a random authkey and writes it to a file readable by that user only
+(--key-file), which the client reads.
+
+    python -u roop_server.py --port 47862
+"""
+
+import os
+import sys
+# same as run.py with --execution-provider: single thread doubles cuda performance
+os.environ['OMP_NUM_THREADS'] = '1'
+import json
+import secrets
+import argparse
+import traceback
+from time import perf_counter
+from typing import Any, Callable, Dict, List
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+
+from roop import core
+import roop.globals
+import roop.progress
+import roop.processors.frame.core as frame_core
+from roop.face_analyser import get_face_analyser
+from roop.face_reference import clear_face_reference
+from roop.predictor import get_predictor
+from roop.utilities import clean_temp
+
+DEFAULT_PORT = 47862
+KEY_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'deepfake_pfe')
+# model getter of each frame processor, called once at start
+RESIDENT_MODELS = {
+    'face_swapper': 'get_face_swapper',
+    'face_enhancer': 'get_face_enhancer'
+}
+# onnxruntime providers the resident models were built with, set by warmup()
+EXECUTION_PROVIDERS: List[str] = []
+
+
+def configure(job: Dict[str, Any]) -> None:
+    # the worker's providers come first so that jobs which do not name any keep them
+    sys.argv = ['run.py', '-s', job['source'], '-t', job['target'], '-o', job['output'],
+                '--execution-provider', *core.encode_execution_providers(EXECUTION_PROVIDERS)] + list(job.get('args', []))
+    core.parse_args()
+    if roop.globals.execution_providers != EXECUTION_PROVIDERS:
+        raise ValueError(f'this worker runs on {EXECUTION_PROVIDERS}, not {roop.globals.execution_providers}: '
+                         'restart roop_server.py with --execution-provider to change them')
+    roop.globals.keep_models = True
+    # a failed run may have left the reference face of its target
+    clear_face_reference()
+    loaded = [module.__name__.split('.')[-1] for module in frame_core.FRAME_PROCESSORS_MODULES]
+    if loaded != roop.globals.frame_processors:
+        # modules stay imported, so their models stay loaded: only the selection changes
+        frame_core.FRAME_PROCESSORS_MODULES = []
+
+
+def warmup(frame_processors: List[str], execution_provider: List[str]) -> None:
+    start = perf_counter()
+    sys.argv = ['run.py', '--frame-processor', *frame_processors, '--execution-provider', *execution_provider]
+    core.parse_args()
+    roop.globals.headless = True
+    roop.globals.keep_models = True
+    EXECUTION_PROVIDERS[:] = roop.globals.execution_providers
+    if not core.pre_check():
+        sys.exit(1)
+    core.limit_resources()
+    get_predictor()
+    get_face_analyser()
+    for module in core.get_frame_processors_modules(roop.globals.frame_processors):
+        if not module.pre_check():
+            sys.exit(1)
+        getter = RESIDENT_MODELS.get(module.__name__.split('.')[-1])
+        if getter:
+            getattr(module, getter)()
+    print(f'[ROOP.SERVER] models loaded in {perf_counter() - start:.1f}s', flush=True)
+
+
+def generate(job: Dict[str, Any], emit: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+    start = perf_counter()
+    try:
+        configure(job)
+    except SystemExit:
+        raise ValueError(f'invalid roop options: {job.get("args")}')
+    for module in core.get_frame_processors_modules(roop.globals.frame_processors):
+        if not module.pre_check():
+            raise RuntimeError(f'{module.NAME} is not available')
+    if os.path.isfile(roop.globals.output_path):
+        os.remove(roop.globals.output_path)
+
+    roop.progress.set_listener(emit)
+    try:
+        core.start()
+    except SystemExit:
+        # core.destroy(): the target was refused by the NSFW predictor
+        raise RuntimeError('roop refused the target (NSFW content detected)')
+    except Exception:
+        clean_temp(roop.globals.target_path)
+        raise
+    finally:
+        roop.progress.set_listener(None)
+        roop.progress.clear()
+    if not os.path.isfile(roop.globals.output_path):
+        raise RuntimeError('roop did not produce an output (no face found in the source image?)')
+    return {'event': 'done', 'output': roop.globals.output_path, 'seconds': perf_counter() - start}
+
+
+def write_key(path: str, key: str) -> None:
+    """Write the authkey of this worker start to a file only the current user can read (0600)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as file:
+        file.write(key)
+    os.replace(tmp_path, path)
+
+
+def send(conn: Any, event: Dict[str, Any]) -> None:
+    conn.send_bytes(json.dumps(event).encode())
+
+
+def serve(listener: Listener) -> None:
+    """Accept clients one after the other; each client may send several jobs."""
+    print(f'[ROOP.SERVER] ready on {listener.address[0]}:{listener.address[1]}', flush=True)
+    while True:
+        try:
+            conn = listener.accept()
+        except AuthenticationError:
+            # wrong or stale key: refuse this client, keep serving
+            continue
+        try:
+            while True:
+                try:
+                    job = json.loads(conn.recv_bytes())
+                except EOFError:
+                    break
+                if job.get('command') == 'ping':
+                    send(conn, {'event': 'pong'})
+                    continue
+                if job.get('command') == 'shutdown':
+                    send(conn, {'event': 'done'})
+                    return
+                try:
+                    send(conn, generate(job, lambda event: send(conn, event)))
+                except Exception:
+                    send(conn, {'event': 'error', 'message': traceback.format_exc()})
+        except (EOFError, ConnectionResetError, BrokenPipeError):
+            # client gone in the middle of a job: wait for the next one
+            pass
+        finally:
+            conn.close()
+
+
+def main() -> None:
+    program = argparse.ArgumentParser(description='Resident roop worker')
+    program.add_argument('--port', type=int, default=DEFAULT_PORT)
+    program.add_argument('--frame-processor', dest='frame_processor', default=['face_swapper', 'face_enhancer'], nargs='+')
+    program.add_argument('--execution-provider', dest='execution_provider', default=['cpu'], nargs='+')
+    program.add_argument('--key-file', dest='key_file', default=None, help='authkey file (default: ~/.cache/deepfake_pfe/roop-<port>.key)')
+    args = program.parse_args()
+    authkey = secrets.token_hex(32)
+
+    # bound before the models load: a client arriving meanwhile waits in the
+    # handshake instead of starting a second worker, and a worker already on
+    # the port makes this one exit here, before it overwrites the key file
+    with Listener(('127.0.0.1', args.port), authkey=authkey.encode()) as listener:
+        write_key(args.key_file or os.path.join(KEY_DIR, f'roop-{args.port}.key'), authkey)
+        warmup(args.frame_processor, args.execution_provider)
+        serve(listener)
+
+
+if __name__ == '__main__':
+    main()
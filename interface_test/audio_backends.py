@@ -0,0 +1,153 @@
+"""
+Backends d'inférence du détecteur audio.
+
+Le modèle Keras (final_model.h5) peut être exporté une fois en ONNX ou en
+TFLite ; la détection utilise alors onnxruntime ou l'interpréteur TFLite et
+n'importe plus TensorFlow. Sans fichier exporté (ou sans runtime installé),
+le modèle Keras d'origine est utilisé.
+
+Conversion et vérification de parité (depuis interface_test/) :
+    python audio_backends.py convert --format onnx
+    python audio_backends.py convert --format tflite
+    python audio_backends.py check --format onnx
+"""
+
+import os
+import argparse
+import numpy as np
+
+MODEL_PATH = "detection_audio/final_model.h5"
+INPUT_SHAPE = (224, 224, 3)
+
+
+def exported_path(path, fmt):
+    return os.path.splitext(path)[0] + (".onnx" if fmt == "onnx" else ".tflite")
+
+
+class KerasBackend:
+    name = "keras"
+
+    def __init__(self, path):
+        from tensorflow.keras.models import load_model
+
+        self.model = load_model(path)
+
+    def predict(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, path):
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(path, providers=ort.get_available_providers())
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class TFLiteBackend:
+    name = "tflite"
+
+    def __init__(self, path):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            # repli sur TensorFlow complet (seulement si le backend est demandé explicitement)
+            from tensorflow.lite import Interpreter
+        self.interpreter = Interpreter(model_path=path)
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self.batch_size = None
+
+    def predict(self, batch):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        if self.batch_size != len(batch):
+            self.interpreter.resize_tensor_input(self.input_index, batch.shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = len(batch)
+        self.interpreter.set_tensor(self.input_index, batch)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index).copy()
+
+
+def _available(module):
+    import importlib.util
+
+    return importlib.util.find_spec(module) is not None
+
+
+def load_backend(path=MODEL_PATH, backend=None):
+    """
+    backend : 'onnx', 'tflite', 'keras' ou 'auto' (défaut : variable
+    DEEPFAKE_AUDIO_BACKEND, sinon 'auto'). En 'auto', le premier modèle exporté
+    dont le runtime est installé est choisi, TensorFlow en dernier recours.
+    """
+    backend = backend or os.environ.get("DEEPFAKE_AUDIO_BACKEND", "auto")
+    if backend == "onnx":
+        return OnnxBackend(exported_path(path, "onnx"))
+    if backend == "tflite":
+        return TFLiteBackend(exported_path(path, "tflite"))
+    if backend == "keras":
+        return KerasBackend(path)
+
+    if os.path.isfile(exported_path(path, "onnx")) and _available("onnxruntime"):
+        return OnnxBackend(exported_path(path, "onnx"))
+    if os.path.isfile(exported_path(path, "tflite")) and _available("tflite_runtime"):
+        return TFLiteBackend(exported_path(path, "tflite"))
+    return KerasBackend(path)
+
+
+def convert(path=MODEL_PATH, fmt="onnx", output=None):
+    """Exporte le modèle Keras en ONNX (tf2onnx) ou TFLite ; retourne le chemin écrit."""
+    import tensorflow as tf
+    from tensorflow.keras.models import load_model
+
+    if fmt == "onnx":
+        try:
+            import tf2onnx
+        except ImportError:
+            # outil d'export seulement : absent des requirements, l'inférence ONNX n'en a pas besoin
+            raise SystemExit("L'export ONNX nécessite tf2onnx : pip install tf2onnx (ou --format tflite)")
+
+    output = output or exported_path(path, fmt)
+    model = load_model(path)
+    if fmt == "onnx":
+        spec = (tf.TensorSpec((None,) + INPUT_SHAPE, tf.float32, name="mel"),)
+        tf2onnx.convert.from_keras(model, input_signature=spec, opset=13, output_path=output)
+    else:
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        with open(output, "wb") as f:
+            f.write(converter.convert())
+    print(f"Modèle exporté : {output} ({os.path.getsize(output) / 2**20:.1f} Mo)")
+    return output
+
+
+def parity(path=MODEL_PATH, fmt="onnx", exported=None, batch_size=4, seed=0):
+    """Écart max entre Keras et le modèle exporté sur des entrées fixes (log-mel typiques : -80..0 dB)."""
+    rng = np.random.default_rng(seed)
+    batch = rng.uniform(-80.0, 0.0, (batch_size,) + INPUT_SHAPE).astype(np.float32)
+    reference = KerasBackend(path).predict(batch)
+    backend = OnnxBackend if fmt == "onnx" else TFLiteBackend
+    output = backend(exported or exported_path(path, fmt)).predict(batch)
+    return float(np.abs(reference - output).max())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export et parité du modèle audio")
+    parser.add_argument("command", choices=["convert", "check"])
+    parser.add_argument("--format", choices=["onnx", "tflite"], default="onnx")
+    parser.add_argument("--model", type=str, default=MODEL_PATH, help="Modèle Keras (.h5)")
+    parser.add_argument("--o", type=str, help="Fichier de sortie (défaut : à côté du .h5)")
+    parser.add_argument("--tol", type=float, default=1e-4, help="Écart maximal toléré avec Keras")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        convert(args.model, args.format, args.o)
+    diff = parity(args.model, args.format, args.o)
+    print(f"Parité {args.format} / Keras : écart max {diff:.2e}")
+    exit(0 if diff <= args.tol else 1)
@@ -0,0 +1,126 @@
+"""
+Frontend log-mel vectorisé du détecteur audio.
+
+Mêmes réglages que librosa.feature.melspectrogram(n_mels=224, hop_length=358,
+n_fft=2048) suivi de power_to_db(ref=np.max), mais la fenêtre de Hann et le
+banc de filtres mel sont calculés une seule fois, et un lot de fenêtres passe
+par une seule STFT (scipy.fft en float32). L'entrée 3 canaux du modèle est une
+vue diffusée (broadcast) du log-mel, sans copie.
+
+Vérification de parité avec librosa et mesure en fenêtres/seconde :
+    python audio_frontend.py --batch 32 --n 10
+"""
+
+import argparse
+from time import perf_counter
+import numpy as np
+import scipy.fft
+import librosa
+
+SAMPLE_RATE = 16000
+N_FFT = 2048
+HOP_LENGTH = 358  # 224 frames pour 5 s à 16 kHz
+N_MELS = 224
+TOP_DB = 80.0
+AMIN = 1e-10
+
+
+class MelFrontend:
+
+    def __init__(self, sr=SAMPLE_RATE, n_fft=N_FFT, hop_length=HOP_LENGTH, n_mels=N_MELS, top_db=TOP_DB, fft_workers=-1):
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.top_db = top_db
+        # threads scipy.fft par STFT (-1 : tous les cœurs, 1 dans un pool de processus)
+        self.fft_workers = fft_workers
+        # fenêtre de Hann périodique, comme get_window("hann", n_fft, fftbins=True)
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+        # (n_fft // 2 + 1, n_mels), pour un produit matriciel sur le dernier axe
+        self.mel_basis_t = np.ascontiguousarray(
+            librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels).T, dtype=np.float32
+        )
+
+    def power_mel(self, batch):
+        """Spectrogramme mel de puissance (B, n_mels, T) pour des signaux (B, N) de même longueur."""
+        batch = np.atleast_2d(np.asarray(batch, dtype=np.float32))
+        pad = self.n_fft // 2
+        # center=True, pad_mode="constant" (défaut librosa 0.10)
+        padded = np.pad(batch, ((0, 0), (pad, pad)))
+        frames = np.lib.stride_tricks.sliding_window_view(padded, self.n_fft, axis=-1)[:, ::self.hop_length]
+        return self.frame_mel(frames).transpose(0, 2, 1)
+
+    def frame_mel(self, frames):
+        """Colonnes mel de puissance (..., n_mels) de trames (..., n_fft) déjà découpées."""
+        spectrum = scipy.fft.rfft(frames * self.window, axis=-1, workers=self.fft_workers)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        return np.matmul(power, self.mel_basis_t)
+
+    def log_mel(self, batch):
+        """power_to_db(ref=np.max, top_db) appliqué fenêtre par fenêtre : (B, n_mels, T)."""
+        return self.to_db(self.power_mel(batch))
+
+    def to_db(self, mel):
+        """power_to_db(ref=np.max, top_db) d'un mel de puissance (B, n_mels, T)."""
+        mel_db = 10.0 * np.log10(np.maximum(AMIN, mel))
+        mel_db -= 10.0 * np.log10(np.maximum(AMIN, mel.max(axis=(1, 2), keepdims=True)))
+        return np.maximum(mel_db, mel_db.max(axis=(1, 2), keepdims=True) - self.top_db)
+
+    def model_input(self, batch):
+        """Entrée (B, n_mels, T, 3) du modèle : les 3 canaux sont une vue du même log-mel."""
+        mel_db = self.log_mel(batch)
+        return np.broadcast_to(mel_db[..., None], mel_db.shape + (3,))
+
+
+def librosa_log_mel(batch, sr=SAMPLE_RATE):
+    """Référence : le calcul d'origine de process_audio, fenêtre par fenêtre."""
+    out = []
+    for audio in batch:
+        mel_spec = librosa.feature.melspectrogram(y=audio, sr=sr, n_mels=N_MELS, hop_length=HOP_LENGTH, n_fft=N_FFT)
+        out.append(librosa.power_to_db(mel_spec, ref=np.max))
+    return np.stack(out)
+
+
+def test_windows(count, seconds=5, sr=SAMPLE_RATE, seed=0):
+    """Bruit + sinusoïdes glissantes, pour avoir de l'énergie sur toute la bande."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    windows = []
+    for i in range(count):
+        f0 = 100 + 300 * i
+        chirp = np.sin(2 * np.pi * (f0 + 200 * t) * t)
+        windows.append((0.3 * chirp + 0.05 * rng.standard_normal(len(t))).astype(np.float32))
+    return np.stack(windows)
+
+
+def check_parity(frontend, count=4):
+    batch = test_windows(count)
+    diff = np.abs(frontend.log_mel(batch) - librosa_log_mel(batch))
+    return float(diff.max()), float(diff.mean())
+
+
+def windows_per_second(fn, batch, repeat):
+    fn(batch)
+    start = perf_counter()
+    for _ in range(repeat):
+        fn(batch)
+    return repeat * len(batch) / (perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parité et débit du frontend log-mel")
+    parser.add_argument("--batch", type=int, default=32, help="Fenêtres de 5 s par lot")
+    parser.add_argument("--n", type=int, default=10, help="Répétitions chronométrées")
+    parser.add_argument("--tol", type=float, default=0.05, help="Écart maximal toléré avec librosa (dB)")
+    args = parser.parse_args()
+
+    frontend = MelFrontend()
+    max_diff, mean_diff = check_parity(frontend)
+    print(f"Parité librosa : écart max {max_diff:.4f} dB, moyen {mean_diff:.6f} dB")
+
+    batch = test_windows(args.batch)
+    reference = windows_per_second(lambda b: np.stack([librosa_log_mel(b)] * 3, axis=-1), batch, args.n)
+    vectorized = windows_per_second(frontend.model_input, batch, args.n)
+    print(f"librosa   : {reference:8.1f} fenêtres/s")
+    print(f"frontend  : {vectorized:8.1f} fenêtres/s ({vectorized / reference:.1f}x)")
+    exit(0 if max_diff <= args.tol else 1)
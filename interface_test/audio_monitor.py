@@ -0,0 +1,249 @@
+"""
+Surveillance audio en temps réel (appels, flux).
+
+Le son arrive par blocs dans un tampon circulaire et une fenêtre glissante de
+5 s est notée à chaque pas, dès que son dernier échantillon est reçu. Les
+trames STFT sont calculées une seule fois sur le flux continu : deux fenêtres
+qui se chevauchent partagent leurs trames intérieures, seules les 3 trames de
+chaque bord (complétées par des zéros, comme center=True) sont recalculées.
+Le log-mel obtenu est identique à celui de MelFrontend.log_mel sur la fenêtre.
+
+Si l'inférence prend du retard sur une source en direct, les fenêtres
+périmées sont sautées : la latence reste bornée à environ un pas.
+
+Sources (depuis interface_test/) :
+    python audio_monitor.py --mic
+    python audio_monitor.py appel.wav --realtime
+    ffmpeg -i flux.m3u8 -f s16le -ac 1 -ar 16000 - | python audio_monitor.py -
+    python audio_monitor.py --check
+"""
+
+import sys
+import json
+import queue
+import argparse
+from time import perf_counter, sleep
+import numpy as np
+from inference_interface import SAMPLE_RATE, WINDOW_SECONDS, HOP_SECONDS, frontend, audio_model, stream_audio
+
+THRESHOLD = 0.5
+
+
+class RingBuffer:
+    """Derniers `capacity` échantillons du flux, adressés par leur position absolue."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=np.float32)
+        self.end = 0  # nombre total d'échantillons reçus
+
+    def write(self, samples):
+        samples = np.asarray(samples, dtype=np.float32)[-self.capacity:]
+        self.data.put(np.arange(self.end, self.end + len(samples)), samples, mode="wrap")
+        self.end += len(samples)
+
+    def read(self, start, length):
+        if start < self.end - self.capacity or start + length > self.end:
+            raise IndexError(f"échantillons {start}..{start + length} hors du tampon")
+        return self.data.take(np.arange(start, start + length), mode="wrap")
+
+
+class StreamingMel:
+    """
+    Log-mel de fenêtres glissantes d'un flux. Le pas est arrondi à un multiple
+    de hop_length pour que les trames d'une fenêtre tombent sur celles de la
+    suivante.
+    """
+
+    def __init__(self, sr=SAMPLE_RATE, window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS):
+        self.frontend = frontend(sr)
+        hop_length = self.frontend.hop_length
+        half = self.frontend.n_fft // 2
+        self.sr = sr
+        self.win = int(window_seconds * sr)
+        self.hop_frames = max(1, round(hop_seconds * sr / hop_length))
+        self.hop = self.hop_frames * hop_length
+        self.n_frames = 1 + self.win // hop_length
+        # trames entièrement à l'intérieur de la fenêtre (sans zéros de bord)
+        self.first = -(-half // hop_length)
+        self.last = (self.win - half) // hop_length
+        self.cache = {}  # trame absolue -> colonne mel de puissance
+
+    def _interior(self, ring, frames):
+        """Colonnes des trames absolues `frames`, calculées en un seul lot pour celles qui manquent."""
+        hop_length = self.frontend.hop_length
+        half = self.frontend.n_fft // 2
+        missing = [j for j in frames if j not in self.cache]
+        if missing:
+            # une seule lecture du tampon puis un découpage sans copie
+            start = missing[0] * hop_length - half
+            signal = ring.read(start, (missing[-1] - missing[0]) * hop_length + 2 * half)
+            cut = np.lib.stride_tricks.sliding_window_view(signal, 2 * half)[::hop_length]
+            for j, column in zip(range(missing[0], missing[-1] + 1), self.frontend.frame_mel(cut)):
+                self.cache[j] = column
+        return [self.cache[j] for j in frames]
+
+    def window(self, ring, k):
+        """Log-mel (n_mels, T) de la fenêtre k (début : k * hop échantillons)."""
+        base = k * self.hop_frames
+        interior = self._interior(ring, list(range(base + self.first, base + self.last + 1)))
+        for j in [j for j in self.cache if j < base + self.hop_frames + self.first]:
+            del self.cache[j]
+
+        # bords : trames qui débordent de la fenêtre, complétées par des zéros
+        half = self.frontend.n_fft // 2
+        padded = np.pad(ring.read(k * self.hop, self.win), (half, half))
+        frames = np.lib.stride_tricks.sliding_window_view(padded, 2 * half)[::self.frontend.hop_length]
+        edges = list(range(self.first)) + list(range(self.last + 1, self.n_frames))
+        edge_columns = dict(zip(edges, self.frontend.frame_mel(frames[edges])))
+
+        columns = [edge_columns[t] if t in edge_columns else interior[t - self.first] for t in range(self.n_frames)]
+        mel = np.stack(columns, axis=1)[None]
+        return self.frontend.to_db(mel)[0]
+
+
+def _pieces(blocks, size):
+    """Découpe les blocs trop longs : aucune fenêtre prête ne sort du tampon avant d'être notée."""
+    for block in blocks:
+        for start in range(0, len(block), size):
+            yield block[start:start + size]
+
+
+def monitor(blocks, sr=SAMPLE_RATE, window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS, live=True):
+    """
+    Note une fenêtre de `window_seconds` tous les `hop_seconds` sur le flux
+    `blocks` (blocs mono float32 à `sr` Hz). Génère un événement par fenêtre :
+    début et fin dans le flux, score, latence depuis l'arrivée du dernier
+    échantillon et nombre de fenêtres sautées pour tenir le temps réel (`live`).
+    """
+    stream = StreamingMel(sr, window_seconds, hop_seconds)
+    ring = RingBuffer(stream.win + 2 * stream.hop + stream.frontend.n_fft)
+    model = audio_model()
+    model.warmup()
+    k = 0
+    for block in _pieces(blocks, stream.hop):
+        ring.write(block)
+        received = perf_counter()
+        ready = (ring.end - stream.win) // stream.hop + 1 if ring.end >= stream.win else 0
+        dropped = 0
+        if live and ready - k > 1:
+            # en retard : seule la fenêtre la plus récente est encore utile
+            dropped = ready - 1 - k
+            k = ready - 1
+        while k < ready:
+            mel_db = stream.window(ring, k)
+            score = float(model.predict(np.broadcast_to(mel_db[None, ..., None], (1,) + mel_db.shape + (3,)))[0][1])
+            yield {
+                "start": k * stream.hop / sr,
+                "end": (k * stream.hop + stream.win) / sr,
+                "score": score,
+                "label": "FAKE" if score >= THRESHOLD else "REAL",
+                "latency": perf_counter() - received,
+                "dropped": dropped,
+            }
+            dropped = 0
+            k += 1
+
+
+def mic_source(sr=SAMPLE_RATE, block_seconds=0.25, device=None):
+    """Microphone (sounddevice). Si le consommateur bloque, les blocs les plus anciens sont perdus."""
+    import sounddevice as sd
+
+    # au plus deux fenêtres en attente : au-delà, le son est trop vieux pour être utile
+    blocks = queue.Queue(maxsize=int(2 * WINDOW_SECONDS / block_seconds))
+
+    def callback(indata, frames, time, status):
+        if blocks.full():
+            blocks.get_nowait()
+        blocks.put_nowait(indata[:, 0].copy())
+
+    with sd.InputStream(samplerate=sr, channels=1, dtype="float32", blocksize=int(block_seconds * sr),
+                        device=device, callback=callback):
+        while True:
+            yield blocks.get()
+
+
+def stdin_source(sr=SAMPLE_RATE, block_seconds=0.25, fmt="s16le"):
+    """PCM mono brut sur l'entrée standard (s16le ou f32le), par exemple la sortie d'ffmpeg."""
+    dtype = np.int16 if fmt == "s16le" else np.float32
+    size = np.dtype(dtype).itemsize
+    block_bytes = int(block_seconds * sr) * size
+    buffer = sys.stdin.buffer
+    rest = b""
+    while True:
+        data = buffer.read1(block_bytes) if hasattr(buffer, "read1") else buffer.read(block_bytes)
+        if not data:
+            break
+        data = rest + data
+        usable = len(data) - len(data) % size
+        rest = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=dtype)
+        yield samples.astype(np.float32) / 32768.0 if dtype == np.int16 else samples
+
+
+def file_source(path, sr=SAMPLE_RATE, block_seconds=0.25, realtime=False):
+    """Fichier audio décodé par blocs ; avec `realtime`, livré au rythme de la lecture."""
+    start = perf_counter()
+    position = 0.0
+    for block in stream_audio(path, sr, block_seconds):
+        if realtime:
+            sleep(max(0.0, start + position - perf_counter()))
+        position += len(block) / sr
+        yield block
+
+
+def check_parity(seconds=30, hop_seconds=HOP_SECONDS):
+    """Log-mel en flux contre MelFrontend.log_mel recalculé fenêtre par fenêtre."""
+    from audio_frontend import test_windows
+
+    stream = StreamingMel(SAMPLE_RATE, WINDOW_SECONDS, hop_seconds)
+    signal = np.concatenate(test_windows(-(-seconds // WINDOW_SECONDS)))
+    ring = RingBuffer(len(signal))
+    ring.write(signal)
+    worst = 0.0
+    k = 0
+    while k * stream.hop + stream.win <= len(signal):
+        window = signal[k * stream.hop:k * stream.hop + stream.win]
+        reference = stream.frontend.log_mel(window)[0]
+        worst = max(worst, float(np.abs(stream.window(ring, k) - reference).max()))
+        k += 1
+    return worst, k
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Détection de deepfake audio en temps réel")
+    parser.add_argument("source", nargs="?", help="Fichier audio, ou - pour du PCM mono sur l'entrée standard")
+    parser.add_argument("--mic", action="store_true", help="Écouter le microphone (sounddevice)")
+    parser.add_argument("--device", type=str, default=None, help="Périphérique d'entrée sounddevice")
+    parser.add_argument("--hop", type=float, default=HOP_SECONDS, help="Pas entre deux fenêtres notées (s)")
+    parser.add_argument("--block", type=float, default=0.25, help="Taille des blocs lus (s)")
+    parser.add_argument("--pcm", choices=["s16le", "f32le"], default="s16le", help="Format du PCM sur l'entrée standard")
+    parser.add_argument("--realtime", action="store_true", help="Lire le fichier au rythme réel (simulation de flux)")
+    parser.add_argument("--json", action="store_true", help="Un événement JSON par ligne")
+    parser.add_argument("--check", action="store_true", help="Vérifier la réutilisation des trames STFT et quitter")
+    args = parser.parse_args()
+
+    if args.check:
+        diff, windows = check_parity(hop_seconds=args.hop)
+        print(f"Parité flux / fenêtre complète sur {windows} fenêtres : écart max {diff:.2e} dB")
+        exit(0 if diff <= 1e-3 else 1)
+
+    if args.mic:
+        blocks, live = mic_source(SAMPLE_RATE, args.block, args.device), True
+    elif args.source == "-":
+        blocks, live = stdin_source(SAMPLE_RATE, args.block, args.pcm), True
+    elif args.source:
+        blocks, live = file_source(args.source, SAMPLE_RATE, args.block, args.realtime), args.realtime
+    else:
+        parser.error("une source est requise : fichier, - ou --mic")
+
+    try:
+        for event in monitor(blocks, SAMPLE_RATE, WINDOW_SECONDS, args.hop, live):
+            if args.json:
+                print(json.dumps(event), flush=True)
+            else:
+                skipped = f" ({event['dropped']} fenêtres sautées)" if event["dropped"] else ""
+                print(f"[{event['start']:8.1f}s - {event['end']:8.1f}s] {event['label']} {event['score']:.2%} "
+                      f"latence {event['latency'] * 1000:.0f} ms{skipped}", flush=True)
+    except KeyboardInterrupt:
+        pass
@@ -1,4 +1,20 @@
 from PyQt5.QtCore import QThread, pyqtSignal, pyqtSlot
+from time import perf_counter
+
+
+class AudioWarmupWorker(QThread):
+    """Charge le modèle audio en arrière-plan pour que la première détection n'attende pas TensorFlow."""
+    done = pyqtSignal(float)  # Durée du warmup en secondes
+    error = pyqtSignal(str)
+
+    def run(self):
+        try:
+            from inference_interface import audio_model
+            start = perf_counter()
+            audio_model().warmup()
+            self.done.emit(perf_counter() - start)
+        except Exception as e:
+            self.error.emit(str(e))
 
 class DetectionAudioWorker(QThread):
     progress = pyqtSignal(int)
@@ -11,16 +27,19 @@ class DetectionAudioWorker(QThread):
 
     def run(self):
         try:
+            start = perf_counter()
             from inference_interface import predict_file
-            self.progress.emit(10)
-            # Simuler une progression
-            QThread.sleep(1)
-            self.progress.emit(30)
-            result = predict_file(self.audio_path)
+            from progress import StageProgress
+
+            # Progression suivant les étapes réelles : log-mel puis modèle
+            progress = StageProgress(self.progress.emit, {"features": (0, 40), "score": (40, 100)})
+            self.progress.emit(5)
+            result = predict_file(self.audio_path, progress)
             if result is None:
                 self.error.emit("La détection a échoué. Veuillez réessayer.")
                 return
-            self.progress.emit(100)
+            print(f"[audio] détection en {perf_counter() - start:.2f}s")
+            progress.done()
             self.finished.emit(result)
         except Exception as e:
             self.error.emit(str(e))
@@ -1,12 +1,21 @@
 from PyQt5.QtCore import QObject, pyqtSignal
-import subprocess
-import shlex
 import os
+from generation_service import ServiceClient, ProgressMeter
+
+# Plage de la barre occupée par chaque étape du worker RVC
+STAGES = {"load_model": (0, 5), "f0": (5, 25), "infer": (25, 95), "write": (95, 99)}
+LABELS = {
+    "load_model": "Chargement du modèle",
+    "f0": "Extraction de la hauteur (RMVPE)",
+    "infer": "Conversion",
+    "write": "Écriture",
+}
 
 class AudioGenerationWorker(QObject):
     progress = pyqtSignal(int)  # Pour la barre de progression
     finished = pyqtSignal(str)  # Chemin de l'audio généré
     error = pyqtSignal(str)     # Message d'erreur
+    status = pyqtSignal(str)    # Texte de la barre : étape, débit, temps restant
 
     def __init__(self, model, input_audio, transpose, output_audio):
         super().__init__()
@@ -14,38 +23,37 @@ class AudioGenerationWorker(QObject):
         self.input_audio = input_audio
         self.transpose = transpose
         self.output_audio = output_audio
+        self.meter = ProgressMeter(STAGES, LABELS)
 
-    def run(self):
-        
-        # Commande à exécuter
-        command = f"python -u rvc_inference_v2.py --model \"{self.model}\" --input \"{self.input_audio}\" --transpose \"{self.transpose}\" --output \"{self.output_audio}\""
-        print("Command:", command)
-
-        # Démarrer le processus
-        process = subprocess.Popen(
-            shlex.split(command),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True,
-            cwd=r"C:\Users\khoze\Desktop\M2 ISI\PFE\Deepfake-PFE-generation\generation\Retrieval-based-Voice-Conversion-WebUI"
-        )
+    def on_event(self, event):
+        """Événements de progression du worker RVC, lus au fil de l'eau sur sa socket."""
+        if event["event"] == "progress":
+            value, text = self.meter.update(event)
+            self.progress.emit(value)
+            self.status.emit(text)
 
-        # Lire la sortie et les erreurs
-        while True:
-            line = process.stdout.readline()
-            if line == '' and process.poll() is not None:
-                break
-            if line:
-                print("STDOUT:", line.strip())
-                # self.progress.emit(...) si vous voulez un avancement simulé
-
-            # Lire stderr aussi, mais de préférence dans un autre thread ou en asynchrone
-            err_line = process.stderr.readline()
-            if err_line:
-                print("STDERR:", err_line.strip())
+    def run(self):
+        """
+        Envoie la conversion au worker RVC résident (lancé au premier appel,
+        voir generation_service.py) : HuBERT, RMVPE, le modèle de voix et son
+        index restent chargés d'une conversion à l'autre.
+        """
+        try:
+            job = {
+                "model": self.model,
+                "input": os.path.abspath(self.input_audio),
+                "transpose": int(self.transpose),
+                "output": os.path.abspath(self.output_audio),
+            }
+            print("[AudioGenerationWorker] Tâche :", job)
+            result = ServiceClient("rvc").submit(job, self.on_event)
+        except Exception as e:
+            self.error.emit(str(e))
+            return
 
-        rc = process.poll()
-        if rc == 0:
-            self.finished.emit(self.output_audio)
+        if result["event"] == "done":
+            print(f"[AudioGenerationWorker] Conversion en {result['seconds']:.1f}s")
+            self.progress.emit(100)
+            self.finished.emit(result["output"])
         else:
-            self.error.emit(f"Le processus s'est terminé avec le code {rc}")
+            self.error.emit(result["message"])
@@ -0,0 +1,131 @@
+"""
+Analyse combinée audio + vidéo d'un clip.
+
+La piste audio est extraite par un pipe ffmpeg (PCM float32 mono 16 kHz, sans
+fichier temporaire) et passée au détecteur audio Keras, pendant que GenConViT
+analyse les visages de la vidéo. Les deux détecteurs tournent dans deux
+processus séparés (TensorFlow et PyTorch ne partagent rien), donc la durée
+totale est celle du plus lent des deux et non leur somme.
+
+Usage (depuis interface_test/) :
+    python av_detection.py clip.mp4 --f 20
+"""
+
+import os
+import json
+import argparse
+import subprocess
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+import numpy as np
+
+SAMPLE_RATE = 16000
+THRESHOLD = 0.5
+
+
+def demux_audio(video_path, sr=SAMPLE_RATE):
+    """Piste audio de la vidéo en mono float32 à `sr` Hz, ou None si la vidéo n'a pas de son."""
+    command = [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-i", video_path,
+        "-vn", "-ac", "1", "-ar", str(sr),
+        "-f", "f32le", "pipe:1",
+    ]
+    proc = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0 and not proc.stdout:
+        message = proc.stderr.decode(errors="ignore").strip()
+        if "does not contain any stream" in message or "Output file #0 does not contain" in message:
+            return None
+        raise RuntimeError(f"ffmpeg: {message}")
+    audio = np.frombuffer(proc.stdout, dtype=np.float32)
+    return audio if len(audio) else None
+
+
+def audio_job(video_path):
+    """Processus audio : extraction ffmpeg puis détecteur Keras."""
+    start = perf_counter()
+    audio = demux_audio(video_path)
+    if audio is None:
+        return {"score": None, "label": None, "seconds": perf_counter() - start}
+    from inference_interface import predict_audio
+
+    score = float(predict_audio(audio, SAMPLE_RATE))
+    return {
+        "score": score,
+        "label": "FAKE" if score >= THRESHOLD else "REAL",
+        "duration": len(audio) / SAMPLE_RATE,
+        "seconds": perf_counter() - start,
+    }
+
+
+def video_job(video_path, num_frames=20, net="genconvit"):
+    """Processus vidéo : GenConViT sur les visages de `num_frames` frames."""
+    start = perf_counter()
+    from detection import runtime
+    from detection.GenConViT.model.config import load_config
+    from detection.GenConViT.model.pred_func import load_genconvit, predict_events, real_or_fake
+
+    runtime.configure()
+    model = load_genconvit(load_config(), net, "genconvit_ed_inference", "genconvit_vae_inference", False)
+    fake_scores = []
+    for event in predict_events(video_path, model, num_frames):
+        if event["event"] == "score":
+            fake_scores.append(event["score"])
+    # event est le dernier : "result". Son "score" (y_val de pred_vid) n'est pas
+    # la probabilité fake : le score vidéo est la moyenne des probabilités
+    # fake des visages, la même que celle dont "pred" est l'argmax.
+    return {
+        "score": float(np.mean(fake_scores)) if fake_scores else None,
+        "label": real_or_fake(event["pred"]) if event["faces"] else None,
+        "faces": event["faces"],
+        "seconds": perf_counter() - start,
+    }
+
+
+def fuse(video, audio):
+    """
+    Verdict commun : le clip est FAKE dès qu'une des deux pistes l'est (règle
+    du max), une bande-son truquée suffisant à rendre le clip trompeur.
+    Les deux scores sont des probabilités fake.
+    """
+    scores = {name: r["score"] for name, r in (("video", video), ("audio", audio)) if r["score"] is not None}
+    if not scores:
+        return {"score": None, "label": None, "rule": "max", "source": None}
+    source = max(scores, key=scores.get)
+    score = scores[source]
+    return {
+        "score": score,
+        "label": "FAKE" if score >= THRESHOLD else "REAL",
+        "rule": "max",
+        "source": source,
+    }
+
+
+def analyze(video_path, num_frames=20, net="genconvit"):
+    """Scores audio et vidéo du clip, calculés en parallèle, et verdict fusionné."""
+    start = perf_counter()
+    # spawn : chaque détecteur charge son framework dans un processus neuf
+    with ProcessPoolExecutor(max_workers=2, mp_context=mp.get_context("spawn")) as pool:
+        video_future = pool.submit(video_job, video_path, num_frames, net)
+        audio_future = pool.submit(audio_job, video_path)
+        video = video_future.result()
+        audio = audio_future.result()
+    return {
+        "file": os.path.basename(video_path),
+        "video": video,
+        "audio": audio,
+        "fused": fuse(video, audio),
+        "seconds": perf_counter() - start,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Détection de deepfake audio + vidéo")
+    parser.add_argument("video", type=str, help="Chemin vers la vidéo à analyser")
+    parser.add_argument("--f", type=int, default=20, help="Nombre de frames analysées par GenConViT")
+    parser.add_argument("--net", type=str, default="genconvit", help="ed, vae ou genconvit")
+    args = parser.parse_args()
+
+    result = analyze(args.video, args.f, args.net)
+    print(json.dumps(result, indent=1))
@@ -1,5 +1,8 @@
 import sys
 import os
+import time
+
+_START_TIME = time.perf_counter()  # Mesure du temps de démarrage de l'interface
 import vlc  # Utiliser VLC pour la lecture vidéo
 import math
 import shutil
@@ -26,7 +29,7 @@ from PyQt5.QtCore import Qt, QTimer, QThread, QRectF, QPropertyAnimation, pyqtSl
 from PyQt5.QtGui import QIcon, QPixmap, QFont, QColor, QPainter
 
 from detection_page import DetectionWorker
-from audio_page import DetectionAudioWorker
+from audio_page import DetectionAudioWorker, AudioWarmupWorker
 from audio_worker import AudioGenerationWorker
 from heatmap_page import HeatmapPage
 from video_worker import VideoGenerationWorker
@@ -533,6 +536,7 @@ class GenerationAudioPage(QWidget):
         # Afficher la barre de progression
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("%p%")  # texte remplacé par l'étape en cours
 
         # Définir le chemin de sortie audio
         input_basename = os.path.splitext(os.path.basename(self.selected_audio_path))[0]
@@ -553,6 +557,7 @@ class GenerationAudioPage(QWidget):
         # Connecter les signaux
         self.thread.started.connect(self.worker.run)
         self.worker.progress.connect(self.on_progress)
+        self.worker.status.connect(self.progress_bar.setFormat)
         self.worker.finished.connect(self.on_generation_finished)
         self.worker.error.connect(self.on_generation_error)
         self.worker.finished.connect(self.thread.quit)
@@ -894,6 +899,7 @@ class GenerationVideoPage(QWidget):
         # Afficher la barre de progression
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("%p%")  # texte remplacé par l'étape en cours
 
         # Créer le Worker + Thread
         self.thread = QThread()
@@ -907,6 +913,7 @@ class GenerationVideoPage(QWidget):
         # Connecter signaux
         self.thread.started.connect(self.worker.run)
         self.worker.progress.connect(self.on_progress)
+        self.worker.status.connect(self.progress_bar.setFormat)
         self.worker.finished.connect(self.on_generation_finished)
         self.worker.error.connect(self.on_generation_error)
 
@@ -1114,6 +1121,8 @@ class DetectionVideoPage(QWidget):
         # Références pour le thread et le worker
         self.thread = None
         self.worker = None
+        self.running = False    # détection en cours
+        self.cancelled = False  # quittée par Retour : résultat ignoré
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -1162,6 +1171,19 @@ class DetectionVideoPage(QWidget):
         self.progress_bar.setObjectName("progress_bar")
         layout.addWidget(self.progress_bar)
 
+        # Score en direct pendant l'analyse (initialement caché)
+        self.live_score_label = QLabel("")
+        self.live_score_label.setAlignment(Qt.AlignCenter)
+        self.live_score_label.setVisible(False)
+        layout.addWidget(self.live_score_label)
+
+        # Arrêt anticipé : le résultat porte sur les frames déjà analysées
+        self.stop_button = QPushButton("Arrêter l'analyse")
+        self.stop_button.setObjectName("menu_button")
+        self.stop_button.clicked.connect(self.stop_detection)
+        self.stop_button.setVisible(False)
+        layout.addWidget(self.stop_button, alignment=Qt.AlignCenter)
+
         # Navigation : Bouton retour
         nav_layout = QHBoxLayout()
         nav_layout.addStretch()  # Espacement à gauche
@@ -1169,7 +1191,7 @@ class DetectionVideoPage(QWidget):
         back_button.setObjectName("back_button")
         back_button.setIcon(QIcon(QPixmap("retour.png")))
         back_button.setIconSize(back_button.sizeHint())
-        back_button.clicked.connect(self.back)
+        back_button.clicked.connect(self.stop_and_go_back)
         nav_layout.addWidget(back_button)
         nav_layout.addStretch()  # Espacement à droite
         layout.addLayout(nav_layout)
@@ -1196,9 +1218,15 @@ class DetectionVideoPage(QWidget):
         # Afficher la barre de progression
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
+        self.live_score_label.setText("Analyse en cours...")
+        self.live_score_label.setVisible(True)
 
         # Désactiver le bouton pour éviter plusieurs clics
         self.detect_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.stop_button.setVisible(True)
+        self.running = True
+        self.cancelled = False
 
         # Créer le Worker et le Thread
         self.worker = DetectionWorker(self.selected_video_path)
@@ -1209,6 +1237,7 @@ class DetectionVideoPage(QWidget):
 
         # Connecter les signaux du worker
         self.worker.progress.connect(self.on_progress)
+        self.worker.score.connect(self.on_live_score)
         self.worker.finished.connect(self.on_detection_finished)
         self.worker.error.connect(self.on_detection_error)
 
@@ -1227,15 +1256,41 @@ class DetectionVideoPage(QWidget):
         # Lancer le thread
         self.thread.start()
 
+    def stop_detection(self):
+        """Arrête l'analyse au prochain visage ; le résultat porte sur ce qui a déjà été analysé."""
+        if self.running:
+            self.worker.stop()
+            self.stop_button.setEnabled(False)
+            self.live_score_label.setText("Arrêt en cours...")
+
+    def stop_and_go_back(self):
+        """Retour : annule la détection en cours (son résultat sera ignoré) puis quitte la page."""
+        if self.running:
+            self.cancelled = True
+            self.worker.stop()
+        self.back()
+
+    def end_detection(self):
+        self.running = False
+        self.progress_bar.setVisible(False)
+        self.live_score_label.setVisible(False)
+        self.stop_button.setVisible(False)
+        self.detect_button.setEnabled(True)
+
     def on_progress(self, value):
         """Met à jour la barre de progression."""
         self.progress_bar.setValue(value)
 
+    def on_live_score(self, score):
+        """Affiche le score moyen courant (probabilité fake) pendant l'analyse."""
+        self.live_score_label.setText(f"Score en direct : {score:.1%} fake")
+
     def on_detection_finished(self, result):
         """Slot appelé quand la détection est terminée."""
         self.progress_bar.setValue(100)
-        self.progress_bar.setVisible(False)
-        self.detect_button.setEnabled(True)
+        self.end_detection()
+        if self.cancelled:
+            return
 
         # Extraire la prédiction et la confiance depuis le résultat
         predicted_label, confidence = self.extract_prediction(result)
@@ -1245,8 +1300,9 @@ class DetectionVideoPage(QWidget):
 
     def on_detection_error(self, error_msg):
         """Slot appelé en cas d'erreur lors de la détection."""
-        self.progress_bar.setVisible(False)
-        self.detect_button.setEnabled(True)
+        self.end_detection()
+        if self.cancelled:
+            return
         QMessageBox.critical(self, "Erreur de détection", f"Une erreur est survenue:\n{error_msg}")
 
     def extract_prediction(self, result):
@@ -1505,6 +1561,16 @@ class DetectionAudioPage(QWidget):
         # Références pour le thread et le worker
         self.thread = None
         self.worker = None
+        self.warmup_worker = None
+
+    def showEvent(self, event):
+        """Précharge le modèle audio la première fois que la page est affichée."""
+        super().showEvent(event)
+        if self.warmup_worker is None:
+            self.warmup_worker = AudioWarmupWorker()
+            self.warmup_worker.done.connect(lambda seconds: print(f"[audio] modèle prêt ({seconds:.2f}s)"))
+            self.warmup_worker.error.connect(lambda msg: print(f"[audio] warmup impossible : {msg}"))
+            self.warmup_worker.start()
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -2086,4 +2152,5 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+    print(f"[interface] démarrage en {time.perf_counter() - _START_TIME:.2f}s")
     sys.exit(app.exec_())
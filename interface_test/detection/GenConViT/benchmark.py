@@ -0,0 +1,315 @@
+"""
+Stage-by-stage benchmark of the GenConViT detection pipeline.
+
+Synthetic videos are rendered locally at several resolutions and lengths
+(a drawn face, or a sample face image given with --face, moving over a noisy
+background). Each stage is timed on its own: extract_frames, face_rec,
+preprocess_frame, GenConViT.forward for every net mode, the guided-backprop
+heatmap attribution and the end-to-end vids(). Min, p50 (median), p90 and
+p95 latencies, frames/second and the resident memory each stage adds are
+written as JSON; with --baseline the run is compared with a previous report
+and slower stages are flagged.
+
+Run from interface_test/:
+    python -m detection.GenConViT.benchmark --r 360p,720p --l 5,20 --o result/bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import tempfile
+import argparse
+from datetime import datetime
+import numpy as np
+import cv2
+import psutil
+import torch
+from detection.GenConViT.model.config import load_config
+from detection.GenConViT.model.pred_func import (
+    extract_frames,
+    face_rec,
+    preprocess_frame,
+    load_genconvit,
+    device,
+)
+
+RESOLUTIONS = {"360p": (640, 360), "720p": (1280, 720), "1080p": (1920, 1080)}
+NETS = ["ed", "vae", "genconvit"]
+ED_WEIGHT = "genconvit_ed_inference"
+VAE_WEIGHT = "genconvit_vae_inference"
+# timed repetitions below which p95 is only an interpolation of the slowest runs
+MIN_REPEAT = 20
+
+
+def draw_face(size):
+    """A plain drawn face (BGR), used when no sample face image is given."""
+    face = np.full((size, size, 3), 40, dtype=np.uint8)
+    c = size // 2
+    cv2.ellipse(face, (c, c), (int(size * 0.33), int(size * 0.45)), 0, 0, 360, (150, 180, 225), -1)
+    for dx in (-1, 1):
+        eye = (c + dx * int(size * 0.14), int(size * 0.42))
+        cv2.ellipse(face, eye, (int(size * 0.07), int(size * 0.035)), 0, 0, 360, (255, 255, 255), -1)
+        cv2.circle(face, eye, int(size * 0.025), (60, 40, 30), -1)
+        brow = (eye[0] - int(size * 0.08), eye[1] - int(size * 0.08))
+        cv2.line(face, brow, (brow[0] + int(size * 0.16), brow[1]), (50, 60, 80), max(2, size // 60))
+    cv2.line(face, (c, int(size * 0.45)), (c - int(size * 0.04), int(size * 0.6)), (110, 140, 190), max(2, size // 80))
+    cv2.ellipse(face, (c, int(size * 0.72)), (int(size * 0.12), int(size * 0.05)), 0, 0, 180, (70, 70, 170), -1)
+    return face
+
+
+def synthetic_video(path, width, height, seconds, fps=25, face=None, seed=0):
+    """Write an mp4 of `seconds` with one face drifting over a noisy background."""
+    rng = np.random.default_rng(seed)
+    size = min(width, height) // 2
+    face = draw_face(size) if face is None else cv2.resize(face, (size, size), interpolation=cv2.INTER_AREA)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    background = cv2.GaussianBlur(background, (0, 0), 5)
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    frames = int(seconds * fps)
+    for i in range(frames):
+        frame = background.copy()
+        t = i / max(frames - 1, 1)
+        x = int((width - size) * (0.5 + 0.4 * np.sin(2 * np.pi * t)))
+        y = int((height - size) * (0.5 + 0.3 * np.cos(2 * np.pi * t)))
+        frame[y:y + size, x:x + size] = face
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def rss_mb():
+    """Current resident memory of this process in MB."""
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def peak_rss_mb():
+    """Process-wide peak resident memory in MB, None where the resource module is missing (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    return round(rss, 1)
+
+
+def sync():
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+
+def time_stage(fn, items, repeat=MIN_REPEAT, warmup=1):
+    """
+    Run `fn` warmup + repeat times; `items` frames/faces are processed per call.
+    rss_growth_mb is the resident memory the stage leaves allocated (after -
+    before), not its transient peak: the process peak is a high-water mark
+    shared by every stage, so it is only reported once for the whole run.
+    """
+    rss_before = rss_mb()
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        sync()
+        start = time.perf_counter()
+        fn()
+        sync()
+        times.append(time.perf_counter() - start)
+    median, p90, p95 = (float(x) for x in np.percentile(times, [50, 90, 95]))
+    return {
+        "repeat": repeat,
+        "items": items,
+        "min_s": float(np.min(times)),
+        "median_s": median,
+        "p90_s": p90,
+        "p95_s": p95,
+        "fps": float(items / median) if items else None,
+        "rss_growth_mb": round(rss_mb() - rss_before, 1),
+    }
+
+
+def bench_video(path, num_frames, repeat):
+    """extract_frames, face_rec and preprocess_frame on one synthetic video."""
+    stages = {}
+    stages["extract_frames"] = time_stage(lambda: extract_frames(path, num_frames), num_frames, repeat)
+    frames = extract_frames(path, num_frames)
+    stages["face_rec"] = time_stage(lambda: face_rec(frames, verbose=False), len(frames), repeat)
+    faces, count = face_rec(frames, verbose=False)
+    if count == 0:
+        # keep the preprocess timing comparable when the detector misses the drawn face
+        faces = np.random.default_rng(0).integers(0, 255, (len(frames), 224, 224, 3), dtype=np.uint8)
+    stages["face_rec"]["faces_found"] = int(count)
+    stages["preprocess_frame"] = time_stage(lambda: preprocess_frame(faces), len(faces), repeat)
+    return stages
+
+
+def bench_models(config, batch, fp16, repeat):
+    """GenConViT.forward for each net mode on a batch of normalized face tensors."""
+    stages = {}
+    df = torch.randn(batch, 3, 224, 224)
+    for net in NETS:
+        try:
+            model = load_genconvit(config, net, ED_WEIGHT, VAE_WEIGHT, fp16)
+        except Exception as e:
+            stages[f"forward_{net}"] = {"skipped": str(e)}
+            continue
+        x = df.to(device).half() if fp16 else df.to(device)
+
+        def forward():
+            with torch.no_grad():
+                model(x)
+
+        stages[f"forward_{net}"] = time_stage(forward, batch, repeat)
+        del model
+    return stages
+
+
+def bench_heatmap(fp16, repeat):
+    """Guided-backprop attribution of one face, as done per face by the heatmap page."""
+    try:
+        from detection.GenConViT_heatmap.prediction import FakeLogitWrapper, compute_guided_backprop_saliency
+        from detection.GenConViT_heatmap.model.config import load_config as load_heatmap_config
+        from detection.GenConViT_heatmap.model.pred_func import load_genconvit as load_heatmap_genconvit
+        model = load_heatmap_genconvit(load_heatmap_config(), "genconvit", ED_WEIGHT, VAE_WEIGHT, fp16)
+    except Exception as e:
+        return {"heatmap_attribution": {"skipped": str(e)}}
+
+    wrapped = FakeLogitWrapper(model)
+
+    def attribute():
+        face_in = torch.randn(1, 3, 224, 224, device=device)
+        face_in.requires_grad_()
+        compute_guided_backprop_saliency(wrapped, face_in)
+
+    return {"heatmap_attribution": time_stage(attribute, 1, repeat)}
+
+
+def bench_end_to_end(path, num_frames, fp16, repeat):
+    from detection.GenConViT.prediction import vids
+
+    def run():
+        vids(ED_WEIGHT, VAE_WEIGHT, os.path.dirname(path), None, num_frames, "genconvit", fp16)
+
+    try:
+        return {"vids": time_stage(run, num_frames, repeat, warmup=1)}
+    except Exception as e:
+        return {"vids": {"skipped": str(e)}}
+
+
+def compare(report, baseline, tolerance):
+    """Stages whose median latency grew by more than `tolerance` (0.2 = 20%) over the baseline."""
+    regressions = []
+    for case, stages in report["cases"].items():
+        for stage, stats in stages.items():
+            base_median = baseline.get("cases", {}).get(case, {}).get(stage, {}).get("median_s")
+            if "median_s" not in stats or base_median is None:
+                continue
+            ratio = stats["median_s"] / base_median
+            if ratio > 1 + tolerance:
+                regressions.append({"case": case, "stage": stage, "median_s": stats["median_s"], "baseline_median_s": base_median, "ratio": round(ratio, 3)})
+    return regressions
+
+
+def run(resolutions, lengths, num_frames=15, repeat=MIN_REPEAT, fp16=False, face=None, skip_models=False, work_dir=None):
+    config = load_config()
+    report = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "torch": torch.__version__,
+        "cuda": torch.cuda.is_available(),
+        "threads": torch.get_num_threads(),
+        "num_frames": num_frames,
+        "fp16": fp16,
+        "cases": {},
+    }
+    work_dir = work_dir or tempfile.mkdtemp(prefix="genconvit_bench_")
+    face_img = cv2.imread(face) if face else None
+
+    for res in resolutions:
+        width, height = RESOLUTIONS[res]
+        for seconds in lengths:
+            case = f"{res}_{seconds}s"
+            case_dir = os.path.join(work_dir, case)
+            os.makedirs(case_dir, exist_ok=True)
+            path = os.path.join(case_dir, f"{case}.mp4")
+            if not os.path.isfile(path):
+                synthetic_video(path, width, height, seconds, face=face_img)
+            print(f"\n== {case} ==")
+            stages = bench_video(path, num_frames, repeat)
+            if not skip_models:
+                stages.update(bench_end_to_end(path, num_frames, fp16, max(1, repeat // 2)))
+            report["cases"][case] = stages
+
+    if not skip_models:
+        report["cases"]["model"] = bench_models(config, num_frames, fp16, repeat)
+        report["cases"]["model"].update(bench_heatmap(fp16, repeat))
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser("GenConViT detection benchmark")
+    parser.add_argument("--r", type=str, default="360p,720p,1080p", help="resolutions: " + ",".join(RESOLUTIONS))
+    parser.add_argument("--l", type=str, default="5,20", help="video lengths in seconds")
+    parser.add_argument("--f", type=int, default=15, help="frames per video, as in prediction.py")
+    parser.add_argument("--n", type=int, default=MIN_REPEAT, help=f"timed repetitions per stage (p95 needs at least {MIN_REPEAT})")
+    parser.add_argument("--face", type=str, help="sample face image pasted in the videos (default: drawn face)")
+    parser.add_argument("--fp16", action="store_true")
+    parser.add_argument("--skip-models", action="store_true", help="only time decoding, face detection and preprocessing")
+    parser.add_argument("--dir", type=str, help="where synthetic videos are kept (default: a temp dir)")
+    parser.add_argument("--o", type=str, help="JSON report path (default: result/benchmark_<date>.json)")
+    parser.add_argument("--baseline", type=str, help="previous report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed median slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="also write this report to --baseline")
+    args = parser.parse_args()
+    if args.n < MIN_REPEAT:
+        print(f"--n {args.n}: fewer than {MIN_REPEAT} repetitions, p90/p95 are close to the max")
+
+    report = run(
+        args.r.split(","),
+        [float(x) for x in args.l.split(",")],
+        args.f,
+        args.n,
+        args.fp16,
+        args.face,
+        args.skip_models,
+        args.dir,
+    )
+
+    regressions = []
+    if args.baseline and os.path.isfile(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+
+    out = args.o or os.path.join("result", f"benchmark_{datetime.now().strftime('%B_%d_%Y_%H_%M_%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"\nReport => {out}")
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"Baseline => {args.baseline}")
+
+    for case, stages in report["cases"].items():
+        for stage, stats in stages.items():
+            if "median_s" in stats:
+                fps = f"{stats['fps']:.1f}/s" if stats["fps"] else ""
+                print(
+                    f"{case:<12} {stage:<20} min {stats['min_s'] * 1000:9.1f} ms  p50 {stats['median_s'] * 1000:9.1f} ms  "
+                    f"p90 {stats['p90_s'] * 1000:9.1f} ms  p95 {stats['p95_s'] * 1000:9.1f} ms  {fps}  {stats['rss_growth_mb']:+.1f} MB"
+                )
+    for r in regressions:
+        print(f"REGRESSION {r['case']} {r['stage']}: {r['ratio']:.2f}x baseline median")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
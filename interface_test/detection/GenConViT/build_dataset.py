@@ -0,0 +1,261 @@
+"""
+Build the GenConViT training tree (train/valid/test, fake/real) from videos.
+
+Each video is sampled, faces are found with the same logic as
+pred_func.face_rec, and the 224x224 crops are written either as JPEG files in
+an ImageFolder tree or straight into pre-decoded shards. Videos are processed
+by a pool of worker processes; finished videos are appended to
+<output>/manifest.jsonl so an interrupted build resumes where it stopped.
+Shards end on video boundaries and their videos are recorded right after the
+shard is written; a resumed build first drops the shards of an earlier run
+that never made it to the manifest, so no video is stored twice.
+Splits and sampled frames only depend on --seed and the video path.
+"""
+
+import os
+import json
+import random
+import hashlib
+import argparse
+import multiprocessing as mp
+from time import perf_counter
+import numpy as np
+import cv2
+from decord import VideoReader, cpu
+from detection.GenConViT.model.pred_func import face_rec
+from detection.GenConViT.dataset.shards import ShardWriter, rebuild_index, CLASSES
+
+SPLITS = ["train", "valid", "test"]
+VIDEO_EXTS = (".avi", ".mp4", ".mpg", ".mpeg", ".mov")
+MANIFEST = "manifest.jsonl"
+
+# files listed in json_file/ are held out for testing (see prediction.py)
+TEST_LISTS = {
+    "dfdc": "dfdc_files.json",
+    "faceforensics": "ff_file_list.json",
+    "celeb": "celeb_test.json",
+}
+
+
+def collect_dfdc(root):
+    with open(os.path.join(root, "metadata.json")) as f:
+        meta = json.load(f)
+    return [(name, meta[name]["label"]) for name in sorted(meta)]
+
+
+def collect_faceforensics(root):
+    videos = []
+    for v_t in ["original_sequences", "manipulated_sequences"]:
+        for dirpath, _, filenames in os.walk(os.path.join(root, v_t)):
+            label = "REAL" if v_t == "original_sequences" else "FAKE"
+            for filename in sorted(filenames):
+                rel = os.path.relpath(os.path.join(dirpath, filename), root)
+                videos.append((rel, label))
+    return sorted(videos)
+
+
+def collect_celeb(root):
+    videos = []
+    for klass in ["Celeb-real", "YouTube-real", "Celeb-synthesis"]:
+        label = "FAKE" if klass == "Celeb-synthesis" else "REAL"
+        klass_dir = os.path.join(root, klass)
+        if os.path.isdir(klass_dir):
+            videos += [(f"{klass}/{f}", label) for f in sorted(os.listdir(klass_dir))]
+    return videos
+
+
+def collect_other(root):
+    # root/real/*.mp4 and root/fake/*.mp4
+    videos = []
+    for label in ["REAL", "FAKE"]:
+        klass_dir = os.path.join(root, label.lower())
+        if os.path.isdir(klass_dir):
+            videos += [(f"{label.lower()}/{f}", label) for f in sorted(os.listdir(klass_dir))]
+    return videos
+
+
+def load_test_list(dataset):
+    if dataset not in TEST_LISTS:
+        return set()
+    with open(os.path.join("detection", "GenConViT", "json_file", TEST_LISTS[dataset])) as f:
+        return set(json.load(f))
+
+
+def video_seed(seed, rel_path):
+    digest = hashlib.md5(f"{seed}:{rel_path}".encode()).hexdigest()
+    return int(digest[:8], 16)
+
+
+def assign_split(rel_path, test_list, seed, valid_ratio):
+    if rel_path in test_list or os.path.basename(rel_path) in test_list:
+        return "test"
+    rng = random.Random(video_seed(seed, rel_path))
+    return "valid" if rng.random() < valid_ratio else "train"
+
+
+def sample_frames(video_file, num_frames, rng):
+    vr = VideoReader(video_file, ctx=cpu(0))
+    step_size = max(1, len(vr) // num_frames)
+    offset = rng.randrange(step_size)
+    return vr.get_batch(
+        list(range(offset, len(vr), step_size))[:num_frames]
+    ).asnumpy()
+
+
+def process_video(task):
+    """Worker: return (task, faces) with faces as a uint8 (N, 224, 224, 3) RGB array."""
+    root, rel_path, label, split, num_frames, seed, image_dir = task
+    path = os.path.join(root, rel_path)
+    try:
+        rng = random.Random(video_seed(seed, rel_path))
+        frames = sample_frames(path, num_frames, rng)
+        faces, count = face_rec(frames, verbose=False)
+    except Exception as e:
+        print(f"An error occurred: {rel_path}: {str(e)}")
+        return task, None
+
+    if count == 0:
+        faces = np.zeros((0, 224, 224, 3), dtype=np.uint8)
+
+    if image_dir is not None:
+        # ImageFolder output: encode in the worker, only send the count back
+        out_dir = os.path.join(image_dir, split, label.lower())
+        os.makedirs(out_dir, exist_ok=True)
+        stem = rel_path.replace("/", "_").replace(os.sep, "_").rsplit(".", 1)[0]
+        for i, face in enumerate(faces):
+            cv2.imwrite(os.path.join(out_dir, f"{stem}_{i}.jpg"), face[..., ::-1])
+        return task, len(faces)
+
+    return task, faces
+
+
+def read_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.isfile(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def drop_uncommitted_shards(out_dir, entries):
+    """Remove shards written by an interrupted run before their videos were recorded."""
+    committed = {entry.get("shard") for entry in entries}
+    for split in SPLITS:
+        split_dir = os.path.join(out_dir, split)
+        if not os.path.isdir(split_dir):
+            continue
+        for f in sorted(os.listdir(split_dir)):
+            if f.startswith("run") and f.endswith("_labels.npy") and f[: -len("_labels.npy")] not in committed:
+                name = f[: -len("_labels.npy")]
+                print(f"Dropping uncommitted shard {split}/{name}")
+                for path in (f"{name}.npy", f):
+                    os.remove(os.path.join(split_dir, path))
+
+
+def build(dataset, root, out_dir, num_frames=15, workers=None, seed=0, valid_ratio=0.1, fmt="shards", shard_size=1024):
+    collect = globals()[f"collect_{dataset}"]
+    test_list = load_test_list(dataset)
+    entries = read_manifest(out_dir)
+    done = {entry["video"] for entry in entries}
+    os.makedirs(out_dir, exist_ok=True)
+    if fmt == "shards":
+        drop_uncommitted_shards(out_dir, entries)
+        # face_rec keeps at most one face per sampled frame: a video always fits in one shard
+        shard_size = max(shard_size, num_frames)
+
+    tasks = []
+    for rel_path, label in collect(root):
+        if rel_path in done or not rel_path.lower().endswith(VIDEO_EXTS):
+            continue
+        split = assign_split(rel_path, test_list, seed, valid_ratio)
+        image_dir = out_dir if fmt == "images" else None
+        tasks.append((root, rel_path, label, split, num_frames, seed, image_dir))
+    print(f"{len(done)} videos already built, {len(tasks)} to process.")
+
+    # one shard prefix per run, so a resumed build never overwrites earlier shards
+    prefix = f"run{max((int(run[3:]) for run in glob_runs(out_dir)), default=-1) + 1:03d}"
+    writers = {}
+    pending = {split: [] for split in SPLITS}
+    manifest = open(os.path.join(out_dir, MANIFEST), "a")
+
+    def commit(entries):
+        for entry in entries:
+            manifest.write(json.dumps(entry) + "\n")
+        manifest.flush()
+
+    start = perf_counter()
+    with mp.Pool(workers or os.cpu_count()) as pool:
+        # ordered imap keeps the shard contents identical from one run to the next
+        for n, (task, faces) in enumerate(pool.imap(process_video, tasks, chunksize=4), 1):
+            _, rel_path, label, split, *_ = task
+            if faces is None:
+                continue
+            entry = {"video": rel_path, "split": split, "label": label}
+
+            if fmt == "images":
+                entry["faces"] = faces
+                commit([entry])
+            else:
+                entry["faces"] = len(faces)
+                if split not in writers:
+                    writers[split] = ShardWriter(
+                        os.path.join(out_dir, split), prefix=prefix, shard_size=shard_size
+                    )
+                writer = writers[split]
+                if writer.count + len(faces) > shard_size:
+                    # close the shard before this video: a shard only holds whole
+                    # videos, all recorded together once it is on disk
+                    writer.flush()
+                    commit(pending[split])
+                    pending[split] = []
+                entry["shard"] = f"{prefix}_{writer.shard_id:05d}" if len(faces) else None
+                for face in faces:
+                    writer.add(face, CLASSES.index(label.lower()))
+                pending[split].append(entry)
+                if writer.count == 0:
+                    # empty shard (no faces yet) or just filled and written by add()
+                    commit(pending[split])
+                    pending[split] = []
+
+            if n % 100 == 0:
+                print(f"[{n}/{len(tasks)}] {n / (perf_counter() - start):.1f} videos/s")
+
+    for split, writer in writers.items():
+        writer.close(write_index=False)
+        commit(pending[split])
+    for split in SPLITS:
+        if fmt == "shards" and os.path.isdir(os.path.join(out_dir, split)):
+            rebuild_index(os.path.join(out_dir, split))
+    manifest.close()
+    print(f"Done: {len(tasks)} videos in {perf_counter() - start:.1f}s")
+
+
+def glob_runs(out_dir):
+    runs = set()
+    for split in SPLITS:
+        split_dir = os.path.join(out_dir, split)
+        if os.path.isdir(split_dir):
+            runs |= {f.split("_")[0] for f in os.listdir(split_dir) if f.startswith("run")}
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser("Build the GenConViT face-crop training set")
+    parser.add_argument("--p", type=str, required=True, help="dataset root directory")
+    parser.add_argument(
+        "--d", type=str, default="other", help="dataset type: dfdc, faceforensics, celeb, other (real/ and fake/)"
+    )
+    parser.add_argument("--o", type=str, required=True, help="output directory")
+    parser.add_argument("--f", type=int, default=15, help="frames sampled per video")
+    parser.add_argument("--w", type=int, default=None, help="worker processes (default: cpu count)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--valid", type=float, default=0.1, help="fraction of non-test videos used for validation")
+    parser.add_argument("--format", choices=["shards", "images"], default="shards")
+    parser.add_argument("--shard-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    build(args.d, args.p, args.o, args.f, args.w, args.seed, args.valid, args.format, args.shard_size)
+
+
+if __name__ == "__main__":
+    main()
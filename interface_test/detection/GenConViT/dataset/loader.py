@@ -1,5 +1,9 @@
 import os
+import time
 import torch
+import torch.distributed as dist
+from torch.utils.data import Subset
+from torch.utils.data.distributed import DistributedSampler
 from torchvision import transforms, datasets
 from albumentations import (
     HorizontalFlip,
@@ -19,6 +23,7 @@ from albumentations import (
 )
 import numpy as np
 from PIL import Image
+from .shards import ShardDataset, is_shard_dir
 
 
 def strong_aug(p=0.5):
@@ -55,9 +60,14 @@ def augment(aug, image):
 
 
 class Aug(object):
+    def __init__(self):
+        self.aug = None
+
     def __call__(self, img):
-        aug = strong_aug(p=0.9)
-        return Image.fromarray(augment(aug, np.array(img)))
+        # Built on first use, i.e. once per DataLoader worker, not once per image.
+        if self.aug is None:
+            self.aug = strong_aug(p=0.9)
+        return Image.fromarray(augment(self.aug, np.array(img)))
 
 
 def normalize_data():
@@ -78,50 +88,111 @@ def normalize_data():
     }
 
 
-def load_data(data_dir="sample/", batch_size=4):
-    data_dir = data_dir
-    image_datasets = {
-        x: datasets.ImageFolder(os.path.join(data_dir, x), normalize_data()[x])
-        for x in ["train", "valid", "test"]
-    }
+class ResumableSampler(DistributedSampler):
+    """
+    Training sampler. Like DistributedSampler, the shuffled order only depends
+    on the seed and the epoch (set_epoch), also for a single process, so a
+    mid-epoch checkpoint can resume by skipping the samples already trained on.
+    """
 
-    # dataloaders = {x: torch.utils.data.DataLoader(image_datasets[x], batch_size,
-    #                                             shuffle=True, num_workers=0, pin_memory=True)
-    #               for x in ['train', 'validation', 'test']}
+    def __init__(self, dataset, shuffle=True, distributed=False):
+        replicas = {} if distributed else {"num_replicas": 1, "rank": 0}
+        super().__init__(dataset, shuffle=shuffle, **replicas)
+        self.start = 0
 
-    dataset_sizes = {x: len(image_datasets[x]) for x in ["train", "valid", "test"]}
+    def set_epoch(self, epoch):
+        super().set_epoch(epoch)
+        self.start = 0
 
-    train_dataloaders = torch.utils.data.DataLoader(
-        image_datasets["train"],
-        batch_size,
-        shuffle=True,
-        num_workers=0,
-        pin_memory=True,
-    )
-    validation_dataloaders = torch.utils.data.DataLoader(
-        image_datasets["valid"],
-        batch_size,
-        shuffle=False,
-        num_workers=0,
-        pin_memory=True,
-    )
-    test_dataloaders = torch.utils.data.DataLoader(
-        image_datasets["test"],
+    def skip(self, samples):
+        """Start the current epoch after its first `samples` samples (of this process)."""
+        self.start = min(samples, self.num_samples)
+
+    def __iter__(self):
+        return iter(list(super().__iter__())[self.start :])
+
+    def __len__(self):
+        return self.num_samples - self.start
+
+
+def default_num_workers():
+    return min(8, os.cpu_count() or 1)
+
+
+def make_loader(dataset, batch_size, shuffle, num_workers=None, prefetch_factor=4, distributed=False):
+    if num_workers is None:
+        num_workers = default_num_workers()
+    options = {}
+    if num_workers > 0:
+        options = {"persistent_workers": True, "prefetch_factor": prefetch_factor}
+
+    # each process of a distributed run only iterates over its own slice
+    sampler = None
+    if shuffle:
+        sampler = ResumableSampler(dataset, shuffle=True, distributed=distributed)
+    elif distributed:
+        # evaluation: DistributedSampler pads the last slice with repeated
+        # samples, which would be counted twice in the all-reduced metrics
+        dataset = Subset(dataset, range(dist.get_rank(), len(dataset), dist.get_world_size()))
+
+    return torch.utils.data.DataLoader(
+        dataset,
         batch_size,
-        shuffle=False,
-        num_workers=0,
-        pin_memory=True,
+        sampler=sampler,
+        num_workers=num_workers,
+        pin_memory=torch.cuda.is_available(),
+        **options,
     )
 
+
+def load_data(data_dir="sample/", batch_size=4, num_workers=None, distributed=False):
+    # Each split is either a pre-decoded shard directory or an ImageFolder tree.
+    image_datasets = {
+        x: ShardDataset(os.path.join(data_dir, x), normalize_data()[x])
+        if is_shard_dir(os.path.join(data_dir, x))
+        else datasets.ImageFolder(os.path.join(data_dir, x), normalize_data()[x])
+        for x in ["train", "valid", "test"]
+    }
+
+    dataset_sizes = {x: len(image_datasets[x]) for x in ["train", "valid", "test"]}
+
     dataloaders = {
-        "train": train_dataloaders,
-        "validation": validation_dataloaders,
-        "test": test_dataloaders,
+        "train": make_loader(
+            image_datasets["train"], batch_size, True, num_workers, distributed=distributed
+        ),
+        "validation": make_loader(
+            image_datasets["valid"], batch_size, False, num_workers, distributed=distributed
+        ),
+        "test": make_loader(image_datasets["test"], batch_size, False, num_workers),
     }
 
     return dataloaders, dataset_sizes
 
 
+def benchmark_loader(loader, num_batches=100, warmup=5):
+    """Iterate over `loader` without a model and report images/second."""
+    images_seen = 0
+    start = None
+    for batch_idx, (images, _) in enumerate(loader):
+        if batch_idx == warmup:
+            start = time.perf_counter()
+            images_seen = 0
+        images_seen += len(images)
+        if batch_idx + 1 >= warmup + num_batches:
+            break
+
+    if start is None:
+        print("Not enough batches to benchmark the loader.")
+        return 0.0
+    elapsed = time.perf_counter() - start
+    throughput = images_seen / elapsed
+    print(
+        f"Loader: {images_seen} images in {elapsed:.2f}s => {throughput:.1f} images/s "
+        f"({loader.num_workers} workers)"
+    )
+    return throughput
+
+
 def load_checkpoint(model, optimizer, filename=None):
     start_epoch = 0
     log_loss = 0
@@ -0,0 +1,182 @@
+"""
+Pre-decoded face shards.
+
+A split directory (train/, valid/, test/) holds uint8 face crops stored as
+plain .npy arrays of shape (N, 224, 224, 3) in RGB order, one labels array per
+shard, and an index.json listing the classes and the shards:
+
+    train/
+        index.json
+        shard_00000.npy
+        shard_00000_labels.npy
+        ...
+
+Images are memory-mapped on first access in each DataLoader worker, so no JPEG
+decoding happens while training.
+"""
+
+import os
+import json
+import glob
+import bisect
+import argparse
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+INDEX_FILE = "index.json"
+CLASSES = ["fake", "real"]  # same order as datasets.ImageFolder on fake/ real/
+
+
+def is_shard_dir(path):
+    return os.path.isfile(os.path.join(path, INDEX_FILE))
+
+
+def rebuild_index(root, classes=CLASSES):
+    """Scan `root` for shards and (re)write its index.json atomically."""
+    shards = []
+    for labels_path in sorted(glob.glob(os.path.join(root, "*_labels.npy"))):
+        images_file = os.path.basename(labels_path)[: -len("_labels.npy")] + ".npy"
+        if not os.path.isfile(os.path.join(root, images_file)):
+            continue
+        count = len(np.load(labels_path, mmap_mode="r"))
+        shards.append({"file": images_file, "count": count})
+
+    index = {"classes": list(classes), "shards": shards}
+    tmp_path = os.path.join(root, f".{INDEX_FILE}.{os.getpid()}")
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, os.path.join(root, INDEX_FILE))
+    return index
+
+
+class ShardWriter:
+    """
+    Append face crops to a split directory, one .npy shard per `shard_size` images.
+
+    Several writers (e.g. one per process) can fill the same directory as long as
+    they use distinct prefixes; call rebuild_index() once they are all closed.
+    """
+
+    def __init__(self, root, prefix="shard", shard_size=1024, image_size=224, classes=CLASSES):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.prefix = prefix
+        self.classes = classes
+        self.images = np.empty((shard_size, image_size, image_size, 3), dtype=np.uint8)
+        self.labels = np.empty(shard_size, dtype=np.int64)
+        self.count = 0
+        self.shard_id = len(glob.glob(os.path.join(root, f"{prefix}_*_labels.npy")))
+
+    def add(self, image, label):
+        self.images[self.count] = image
+        self.labels[self.count] = label
+        self.count += 1
+        if self.count == len(self.images):
+            self.flush()
+
+    def flush(self):
+        if self.count == 0:
+            return
+        name = f"{self.prefix}_{self.shard_id:05d}"
+        np.save(os.path.join(self.root, f"{name}.npy"), self.images[: self.count])
+        # labels last: a shard only counts once its labels file exists
+        np.save(os.path.join(self.root, f"{name}_labels.npy"), self.labels[: self.count])
+        self.shard_id += 1
+        self.count = 0
+
+    def close(self, write_index=True):
+        self.flush()
+        if write_index:
+            rebuild_index(self.root, self.classes)
+
+
+class ShardDataset(Dataset):
+    def __init__(self, root, transform=None):
+        with open(os.path.join(root, INDEX_FILE)) as f:
+            index = json.load(f)
+
+        self.root = root
+        self.transform = transform
+        self.classes = index["classes"]
+        self.files = [s["file"] for s in index["shards"]]
+        self.offsets = np.cumsum([0] + [s["count"] for s in index["shards"]])
+        labels = [
+            np.load(os.path.join(root, f[: -len(".npy")] + "_labels.npy"))
+            for f in self.files
+        ]
+        self.targets = np.concatenate(labels) if labels else np.empty(0, dtype=np.int64)
+        self._images = None
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def _open(self):
+        # opened lazily so each worker process maps the shards itself
+        self._images = [
+            np.load(os.path.join(self.root, f), mmap_mode="r") for f in self.files
+        ]
+
+    def __getitem__(self, idx):
+        if self._images is None:
+            self._open()
+        shard = bisect.bisect_right(self.offsets, idx) - 1
+        image = np.array(self._images[shard][idx - self.offsets[shard]])
+        label = int(self.targets[idx])
+        if self.transform is not None:
+            image = self.transform(image)
+        return image, label
+
+
+def _decode(img):
+    return np.asarray(img.convert("RGB").resize((224, 224)), dtype=np.uint8)
+
+
+def convert_image_folder(src, dst, num_workers=4, shard_size=1024):
+    """Decode an ImageFolder tree (train/valid/test) once into shard directories."""
+    from torchvision import datasets
+
+    for split in ["train", "valid", "test"]:
+        split_dir = os.path.join(src, split)
+        if not os.path.isdir(split_dir):
+            continue
+        folder = datasets.ImageFolder(split_dir, transform=_decode)
+        loader = torch.utils.data.DataLoader(
+            folder, batch_size=256, shuffle=False, num_workers=num_workers
+        )
+        writer = ShardWriter(os.path.join(dst, split), shard_size=shard_size, classes=folder.classes)
+        for images, labels in loader:
+            for image, label in zip(images.numpy(), labels.numpy()):
+                writer.add(image, label)
+        writer.close()
+        print(f"{split}: {len(folder)} images -> {os.path.join(dst, split)}")
+
+
+def main():
+    parser = argparse.ArgumentParser("GenConViT face shards")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    conv = sub.add_parser("convert", help="convert an ImageFolder tree to shards")
+    conv.add_argument("--src", required=True)
+    conv.add_argument("--dst", required=True)
+    conv.add_argument("--workers", type=int, default=4)
+    conv.add_argument("--shard-size", type=int, default=1024)
+
+    bench = sub.add_parser("bench", help="measure training loader throughput")
+    bench.add_argument("--dir", required=True, help="ImageFolder or shard root")
+    bench.add_argument("--workers", type=int, default=None)
+    bench.add_argument("--batch-size", type=int, default=32)
+    bench.add_argument("--batches", type=int, default=100)
+
+    args = parser.parse_args()
+    if args.cmd == "convert":
+        convert_image_folder(args.src, args.dst, args.workers, args.shard_size)
+    else:
+        from .loader import load_data, benchmark_loader
+
+        dataloaders, _ = load_data(args.dir, args.batch_size, num_workers=args.workers)
+        benchmark_loader(dataloaders["train"], args.batches)
+
+
+if __name__ == "__main__":
+    main()
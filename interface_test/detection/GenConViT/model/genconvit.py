@@ -1,70 +1,110 @@
 import torch
 import torch.nn as nn
+import weakref
 from detection.GenConViT.model.genconvit_ed import GenConViTED
 from detection.GenConViT.model.genconvit_vae import GenConViTVAE
+from detection.GenConViT.model.student import GenConViTStudent
+from detection.model_registry import registry
 from torchvision import transforms
 import os
-class GenConViT(nn.Module):
 
-    def __init__(self, config, ed, vae, net, fp16):
+# Both detection pages ship the same inference weights; look them up in this order.
+WEIGHT_DIRS = [
+    os.path.join('detection', 'GenConViT', 'weight'),
+    os.path.join('detection', 'GenConViT_heatmap', 'weight'),
+]
+
+
+def weight_path(weight):
+    for weight_dir in WEIGHT_DIRS:
+        path = os.path.join(weight_dir, f'{weight}.pth')
+        if os.path.isfile(path):
+            return path
+    raise FileNotFoundError(f"Error: detection/GenConViT/weight/{weight}.pth file not found.")
+
+
+def load_submodel(kind, config, weight, fp16, device):
+    if kind == 'student':
+        model = GenConViTStudent(config, pretrained=False)
+    else:
+        model = GenConViTED(config) if kind == 'ed' else GenConViTVAE(config)
+    checkpoint = torch.load(weight_path(weight), map_location=torch.device('cpu'))
+    if 'state_dict' in checkpoint:
+        model.load_state_dict(checkpoint['state_dict'])
+    else:
+        model.load_state_dict(checkpoint)
+    del checkpoint
+
+    model.to(device)
+    model.eval()
+    # Shared instances are read-only: gradients are only ever needed w.r.t. inputs.
+    model.requires_grad_(False)
+    if fp16:
+        model.half()
+    return model
+
+
+def acquire_submodel(kind, config, weight, fp16, device):
+    """Return (key, model) for a shared ED/VAE/student instance from the process-wide registry."""
+    if kind == 'student':
+        arch = f"genconvit_student:{config['student']['backbone']}"
+    else:
+        arch = f"genconvit_{kind}:{config['model']['backbone']}+{config['model']['embedder']}"
+    key = (arch, weight, 'fp16' if fp16 else 'fp32', str(device))
+    model = registry.acquire(
+        key, lambda: load_submodel(kind, config, weight, fp16, device)
+    )
+    return key, model
+
+
+class RegistryModule(nn.Module):
+    """
+    Wrapper around submodels owned by the registry. Other pages hold the same
+    instances, so the wrapper never changes their mode, device or precision:
+    train()/eval() only set its own flag, and .to()/.half() are refused since
+    device and precision are part of the registry key (pass them at load).
+    """
+
+    def train(self, mode=True):
+        self.training = mode
+        return self
+
+    def _apply(self, fn, *args, **kwargs):
+        raise RuntimeError(
+            f"{type(self).__name__} holds shared registry models: "
+            "choose device and fp16 when loading it instead of moving or casting it"
+        )
+
+
+class GenConViT(RegistryModule):
+
+    def __init__(self, config, ed, vae, net, fp16, device='cpu', student=None):
         super(GenConViT, self).__init__()
         self.net = net
         self.fp16 = fp16
-        if self.net=='ed':
-            try:
-                self.model_ed = GenConViTED(config)
-                self.checkpoint_ed = torch.load(f'detection/GenConViT/weight/{ed}.pth', map_location=torch.device('cpu'))
-
-                if 'state_dict' in self.checkpoint_ed:
-                    self.model_ed.load_state_dict(self.checkpoint_ed['state_dict'])
-                else:
-                    self.model_ed.load_state_dict(self.checkpoint_ed)
-
-                self.model_ed.eval()
-                if self.fp16:
-                    self.model_ed.half()
-            except FileNotFoundError:
-                raise Exception(f"Error: detection/GenConViT/weight/{ed}.pth file not found.")
-        elif self.net=='vae':
-            try:
-                self.model_vae = GenConViTVAE(config)
-                self.checkpoint_vae = torch.load(f'detection/GenConViT/weight/{vae}.pth', map_location=torch.device('cpu'))
-
-                if 'state_dict' in self.checkpoint_vae:
-                    self.model_vae.load_state_dict(self.checkpoint_vae['state_dict'])
-                else:
-                    self.model_vae.load_state_dict(self.checkpoint_vae)
-                    
-                self.model_vae.eval()
-                if self.fp16:
-                    self.model_vae.half()
-            except FileNotFoundError:
-                raise Exception(f"Error: weight/{vae}.pth file not found.")
-        else:
-            try:
-                self.model_ed = GenConViTED(config)
-                self.model_vae = GenConViTVAE(config)
-                self.checkpoint_ed = torch.load(f'detection/GenConViT/weight/{ed}.pth', map_location=torch.device('cpu'))
-                self.checkpoint_vae = torch.load(f'detection/GenConViT/weight/{vae}.pth', map_location=torch.device('cpu'))
-                if 'state_dict' in self.checkpoint_ed:
-                    self.model_ed.load_state_dict(self.checkpoint_ed['state_dict'])
-                else:
-                    self.model_ed.load_state_dict(self.checkpoint_ed)
-                if 'state_dict' in self.checkpoint_vae:
-                    self.model_vae.load_state_dict(self.checkpoint_vae['state_dict'])
-                else:
-                    self.model_vae.load_state_dict(self.checkpoint_vae)
-                self.model_ed.eval()
-                self.model_vae.eval()
-                if self.fp16:
-                    self.model_ed.half()
-                    self.model_vae.half()
-            except FileNotFoundError as e:
-                raise Exception(f"Error: Model weights file not found.")
+        keys = []
+        try:
+            if self.net == 'student':
+                key, self.model_student = acquire_submodel('student', config, student, fp16, device)
+                keys.append(key)
+            elif self.net != 'vae':
+                key, self.model_ed = acquire_submodel('ed', config, ed, fp16, device)
+                keys.append(key)
+            if self.net not in ('ed', 'student'):
+                key, self.model_vae = acquire_submodel('vae', config, vae, fp16, device)
+                keys.append(key)
+        except FileNotFoundError as e:
+            for key in keys:
+                registry.release(key)
+            raise Exception(str(e))
+        # Hand the shared models back to the registry once this wrapper is gone.
+        self._finalizer = weakref.finalize(self, _release_all, keys)
 
 
     def forward(self, x):
-        if self.net == 'ed' :
+        if self.net == 'student':
+            x = self.model_student(x)
+        elif self.net == 'ed' :
             x = self.model_ed(x)
         elif self.net == 'vae':
             x,_ = self.model_vae(x)
@@ -72,4 +112,9 @@ class GenConViT(nn.Module):
             x1 = self.model_ed(x)
             x2,_ = self.model_vae(x)
             x =  torch.cat((x1, x2), dim=0) #(x1+x2)/2 #
-        return x
\ No newline at end of file
+        return x
+
+
+def _release_all(keys):
+    for key in keys:
+        registry.release(key)
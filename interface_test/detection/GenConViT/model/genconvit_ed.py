@@ -75,7 +75,10 @@ class GenConViTED(nn.Module):
         self.relu = nn.GELU()
 
     def forward(self, images):
+        return self.forward_decoded(images)[0]
 
+    def forward_decoded(self, images):
+        """Return (logits, decoded image) so heatmap callers can share this model."""
         encimg = self.encoder(images)
         decimg = self.decoder(encimg)
 
@@ -86,4 +89,4 @@ class GenConViTED(nn.Module):
 
         x = self.fc2(self.relu(self.fc(self.relu(x))))
 
-        return x
\ No newline at end of file
+        return x, decimg
@@ -40,21 +40,33 @@ class Encoder(nn.Module):
         self.kl_weight = 0.5#0.00025
         self.relu = nn.LeakyReLU()
 
-    def reparameterize(self, x):
+    def reparameterize(self, mu):
         # https://github.com/AntixK/PyTorch-VAE/blob/a6896b944c918dd7030e7d795a8c13e5c6345ec7/models/vanilla_vae.py
-        std = torch.exp(0.5*self.mu(x))
+        std = torch.exp(0.5*mu)
         eps = torch.randn_like(std)
-        z = eps * std + self.mu(x)
+        z = eps * std + mu
 
         return z, std
 
-    def forward(self, x):
+    def forward(self, x, sample=None):
+        """
+        In training (or when `sample=True`) draw z and compute the KL term.
+        In eval mode the mean latent is used as is: no noise, no `var`
+        projection and no KL, so predictions are deterministic.
+        """
+        if sample is None:
+            sample = self.training
+
         x = self.features(x)
         x = torch.flatten(x, start_dim=1)
 
         mu =  self.mu(x)
+        if not sample:
+            self.kl = 0
+            return mu
+
         var = self.var(x)
-        z,_ = self.reparameterize(x)
+        z,_ = self.reparameterize(mu)
         self.kl = self.kl_weight*torch.mean(-0.5*torch.sum(1+var - mu**2 - var.exp(), dim=1), dim=0) 
         
         return z
@@ -104,7 +116,14 @@ class GenConViTVAE(nn.Module):
         self.relu = nn.ReLU()
         self.resize = transforms.Resize((224,224), antialias=True)
 
-    def forward(self, x):
+    def forward(self, x, with_recon=None):
+        """
+        Return (logits, reconstruction). Outside training the reconstruction is
+        only resized to 224x224 when `with_recon=True`, otherwise it is None.
+        """
+        if with_recon is None:
+            with_recon = self.training
+
         z = self.encoder(x)
         x_hat = self.decoder(z)
 
@@ -113,4 +132,4 @@ class GenConViTVAE(nn.Module):
         x = torch.cat((x1,x2), dim=1)
         x = self.fc2(self.relu(self.fc(self.relu(x))))
         
-        return x, self.resize(x_hat)
\ No newline at end of file
+        return x, self.resize(x_hat) if with_recon else None
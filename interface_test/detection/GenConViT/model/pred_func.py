@@ -10,53 +10,58 @@ from detection.GenConViT.dataset.loader import normalize_data
 from detection.GenConViT.model.config import load_config
 from detection.GenConViT.model.genconvit import GenConViT
 from decord import VideoReader, cpu
+from detection import runtime
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
 
 
-def load_genconvit(config, net, ed_weight, vae_weight, fp16):
+def load_genconvit(config, net, ed_weight, vae_weight, fp16, student_weight=None):
     model = GenConViT(
         config,
         ed= ed_weight,
         vae= vae_weight, 
         net=net,
-        fp16=fp16
+        fp16=fp16,
+        device=device,
+        student=student_weight,
     )
 
-    model.to(device)
-    model.eval()
-    if fp16:
-        model.half()
-
+    # device, eval mode and fp16 are applied by the registry to the shared submodels
     return model
 
 
-def face_rec(frames, p=None, klass=None):
+def face_rec(frames, p=None, klass=None, verbose=True):
     temp_face = np.zeros((len(frames), 224, 224, 3), dtype=np.uint8)
     count = 0
     mod = "cnn" if dlib.DLIB_USE_CUDA else "hog"
 
-    for _, frame in tqdm(enumerate(frames), total=len(frames)):
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-        face_locations = face_recognition.face_locations(
-            frame, number_of_times_to_upsample=0, model=mod
-        )
+    for _, frame in tqdm(enumerate(frames), total=len(frames), disable=not verbose):
+        for face_image in frame_faces(frame, mod, len(frames) - count):
+            temp_face[count] = face_image
+            count += 1
 
-        for face_location in face_locations:
-            if count < len(frames):
-                top, right, bottom, left = face_location
-                face_image = frame[top:bottom, left:right]
-                face_image = cv2.resize(
-                    face_image, (224, 224), interpolation=cv2.INTER_AREA
-                )
-                face_image = cv2.cvtColor(face_image, cv2.COLOR_BGR2RGB)
+    return ([], 0) if count == 0 else (temp_face[:count], count)
 
-                temp_face[count] = face_image
-                count += 1
-            else:
-                break
 
-    return ([], 0) if count == 0 else (temp_face[:count], count)
+def frame_faces(frame, mod, limit):
+    """224x224 RGB crops of the faces found in one RGB frame, at most `limit`."""
+    faces = []
+    if limit <= 0:
+        return faces
+    frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+    face_locations = face_recognition.face_locations(
+        frame, number_of_times_to_upsample=0, model=mod
+    )
+
+    for face_location in face_locations[:limit]:
+        top, right, bottom, left = face_location
+        face_image = frame[top:bottom, left:right]
+        face_image = cv2.resize(
+            face_image, (224, 224), interpolation=cv2.INTER_AREA
+        )
+        faces.append(cv2.cvtColor(face_image, cv2.COLOR_BGR2RGB))
+
+    return faces
 
 
 def preprocess_frame(frame):
@@ -71,7 +76,8 @@ def preprocess_frame(frame):
 
 def pred_vid(df, model):
     with torch.no_grad():
-        return max_prediction_value(torch.sigmoid(model(df).squeeze()))
+        # no squeeze: with a single face the (1, 2) output must stay 2-d
+        return max_prediction_value(torch.sigmoid(model(df).float()))
 
 
 def max_prediction_value(y_pred):
@@ -85,24 +91,121 @@ def max_prediction_value(y_pred):
     )
 
 
+def score_faces(faces, model, fp16=False):
+    """Sigmoid outputs (n, 2) for n face crops, ED and VAE averaged for genconvit."""
+    df = preprocess_frame(np.stack(faces))
+    if fp16:
+        df = df.half()
+    with torch.no_grad():
+        probs = torch.sigmoid(model(df).float()).cpu()
+    # genconvit stacks the ED and VAE outputs of the same faces
+    return probs.view(-1, len(faces), probs.shape[-1]).mean(dim=0)
+
+
+def predict_events(vid, model, num_frames=15, fp16=False):
+    """
+    Streaming version of df_face + pred_vid: frames are decoded, searched for
+    faces and scored one at a time, and an event dict is yielded at each step:
+
+        {"event": "frame", "frame": i, "frames": n}
+        {"event": "faces", "frame": i, "count": k}
+        {"event": "score", "frame": i, "face": j, "score": p}
+        {"event": "mean", "faces": j, "pred": y, "score": y_val}
+        {"event": "result", "faces": j, "pred": y, "score": y_val}
+
+    `score` is the fake probability of one face (mean of ED and VAE for
+    genconvit), "mean" carries the running verdict in the pred_vid format.
+    Closing the generator (or breaking out of the loop) stops the work.
+    """
+    vr = VideoReader(vid, ctx=cpu(0), num_threads=runtime.decode_threads())
+    step_size = max(1, len(vr) // num_frames)
+    indices = list(range(0, len(vr), step_size))[:num_frames]
+    mod = "cnn" if dlib.DLIB_USE_CUDA else "hog"
+
+    total = torch.zeros(2)
+    count = 0
+    y, y_val = 0, 0.5
+    for i, index in enumerate(indices):
+        frame = vr[index].asnumpy()
+        yield {"event": "frame", "frame": i, "frames": len(indices)}
+
+        faces = frame_faces(frame, mod, len(indices) - count)
+        yield {"event": "faces", "frame": i, "count": len(faces)}
+        if not faces:
+            continue
+
+        per_face = score_faces(faces, model, fp16)
+        for face_probs in per_face:
+            count += 1
+            yield {"event": "score", "frame": i, "face": count - 1, "score": face_probs[0].item()}
+
+        total += per_face.sum(dim=0)
+        y, y_val = max_prediction_value((total / count).unsqueeze(0))
+        yield {"event": "mean", "faces": count, "pred": y, "score": y_val}
+
+    yield {"event": "result", "faces": count, "pred": y, "score": y_val}
+
+
 def real_or_fake(prediction):
     return {0: "REAL", 1: "FAKE"}[prediction ^ 1]
 
 
 def extract_frames(video_file, frames_nums=15):
-    vr = VideoReader(video_file, ctx=cpu(0))
+    vr = VideoReader(video_file, ctx=cpu(0), num_threads=runtime.decode_threads())
     step_size = max(1, len(vr) // frames_nums)  # Calculate the step size between frames
     return vr.get_batch(
         list(range(0, len(vr), step_size))[:frames_nums]
     ).asnumpy()  # seek frames with step_size
 
 
+def window_indices(total_frames, fps, window_seconds, frames_per_window):
+    """Split a video into fixed windows: [(start, end, sampled frame indices), ...]."""
+    window_len = max(1, int(round(window_seconds * fps)))
+    windows = []
+    for start in range(0, total_frames, window_len):
+        end = min(start + window_len, total_frames)
+        idx = np.linspace(start, end - 1, min(frames_per_window, end - start))
+        windows.append((start, end, sorted(set(idx.round().astype(int).tolist()))))
+    return windows
+
+
+_window_reader = None  # (video_file, VideoReader), one per worker process
+
+
+def window_faces(task):
+    """Worker: decode the sampled frames of one window and return (index, faces)."""
+    global _window_reader
+    video_file, index, frame_indices = task
+    if _window_reader is None or _window_reader[0] != video_file:
+        _window_reader = (video_file, VideoReader(video_file, ctx=cpu(0), num_threads=runtime.decode_threads()))
+    frames = _window_reader[1].get_batch(frame_indices).asnumpy()
+    faces, count = face_rec(frames, verbose=False)
+    return index, faces
+
+
 def df_face(vid, num_frames, net):
     img = extract_frames(vid, num_frames)
     face, count = face_rec(img)
     return preprocess_frame(face) if count > 0 else []
 
 
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def is_image(path):
+    return os.path.isfile(path) and path.lower().endswith(IMAGE_EXTS)
+
+
+def image_faces(path, max_faces=4):
+    """Worker: decode a still image with OpenCV (no VideoReader) and return (path, faces)."""
+    frame = cv2.imread(path)
+    if frame is None:
+        return path, []
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    mod = "cnn" if dlib.DLIB_USE_CUDA else "hog"
+    return path, frame_faces(frame, mod, max_faces)
+
+
 def is_video(vid):
     print('IS FILE', os.path.isfile(vid))
     return os.path.isfile(vid) and vid.endswith(
@@ -0,0 +1,23 @@
+import torch.nn as nn
+import timm
+
+
+class GenConViTStudent(nn.Module):
+    """
+    Lightweight detector distilled from the GenConViT ED+VAE ensemble.
+
+    A single mobile-class timm backbone with a 2-way head; it takes the same
+    normalized 224x224 face crops and returns logits with the same layout as
+    the teacher, so pred_vid can use it unchanged.
+    """
+
+    def __init__(self, config, pretrained=True):
+        super(GenConViTStudent, self).__init__()
+        self.backbone = timm.create_model(
+            config['student']['backbone'],
+            pretrained=pretrained,
+            num_classes=config['num_classes'],
+        )
+
+    def forward(self, x):
+        return self.backbone(x)
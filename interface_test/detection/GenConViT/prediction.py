@@ -1,23 +1,27 @@
 import os
 import argparse
 import json
+import multiprocessing as mp
+from collections import deque
 from time import perf_counter
 from datetime import datetime
 from detection.GenConViT.model.pred_func import *
 from detection.GenConViT.model.config import load_config
+from detection import runtime
 
 config = load_config()
 print('CONFIG')
 print(config)
 def vids(
-    ed_weight, vae_weight, root_dir="sample_prediction_data", dataset=None, num_frames=15, net=None, fp16=False
+    ed_weight, vae_weight, root_dir="sample_prediction_data", dataset=None, num_frames=15, net=None, fp16=False, student_weight=None,
+    callback=None,
 ):
     result = set_result()
     r = 0
     f = 0
     count = 0
     
-    model = load_genconvit(config, net, ed_weight, vae_weight, fp16)
+    model = load_genconvit(config, net, ed_weight, vae_weight, fp16, student_weight)
 
     for filename in os.listdir(root_dir):
         curr_vid = os.path.join(root_dir, filename)
@@ -33,6 +37,7 @@ def vids(
                     net,
                     "uncategorized",
                     count,
+                    callback=callback,
                 )
                 f, r = (f + 1, r) if "FAKE" == real_or_fake(pred[0]) else (f, r + 1)
                 print(
@@ -47,8 +52,58 @@ def vids(
     return result
 
 
+def images(
+    ed_weight, vae_weight, root_dir="sample_prediction_data", dataset=None, num_frames=15, net=None, fp16=False, student_weight=None,
+    batch_size=64, workers=None,
+):
+    """
+    Score still images (a file or a directory) without decord. Images are
+    decoded and searched for faces by a pool of worker processes, and the
+    crops of many images are classified together in batches of `batch_size`.
+    """
+    result = set_result()
+    model = load_genconvit(config, net, ed_weight, vae_weight, fp16, student_weight)
+    paths = (
+        [os.path.join(root_dir, f) for f in sorted(os.listdir(root_dir))]
+        if os.path.isdir(root_dir)
+        else [root_dir]
+    )
+    paths = [p for p in paths if is_image(p)]
+    print(f"{len(paths)} images")
+
+    pending = []  # (path, faces) waiting for a full batch
+
+    def flush():
+        faces = [face for _, crops in pending for face in crops]
+        probs = score_faces(faces, model, fp16) if faces else None
+        start = 0
+        for path, crops in pending:
+            if crops:
+                y, y_val = max_prediction_value(probs[start:start + len(crops)])
+                start += len(crops)
+            else:
+                y, y_val = 0, 0.5
+            store_result(result, os.path.basename(path), y, y_val, "image")
+        pending.clear()
+
+    count = 0
+    start_time = perf_counter()
+    with mp.Pool(workers or min(8, os.cpu_count())) as pool:
+        for path, crops in pool.imap(image_faces, paths, chunksize=16):
+            pending.append((path, crops))
+            count += len(crops)
+            if count >= batch_size:
+                flush()
+                count = 0
+        flush()
+
+    elapsed = perf_counter() - start_time
+    print(f"{len(paths)} images in {elapsed:.1f}s ({len(paths) / max(elapsed, 1e-9):.1f} images/s)")
+    return result
+
+
 def faceforensics(
-    ed_weight, vae_weight, root_dir="FaceForensics\\data", dataset=None, num_frames=15, net=None, fp16=False
+    ed_weight, vae_weight, root_dir="FaceForensics\\data", dataset=None, num_frames=15, net=None, fp16=False, student_weight=None
 ):
     vid_type = ["original_sequences", "manipulated_sequences"]
     result = set_result()
@@ -67,7 +122,7 @@ def faceforensics(
 
     count = 0
     accuracy = 0
-    model = load_genconvit(config, net, ed_weight, vae_weight, fp16)
+    model = load_genconvit(config, net, ed_weight, vae_weight, fp16, student_weight)
 
     for v_t in vid_type:
         for dirpath, dirnames, filenames in os.walk(os.path.join(root_dir, v_t)):
@@ -104,10 +159,10 @@ def faceforensics(
     return result
 
 
-def timit(ed_weight, vae_weight, root_dir="DeepfakeTIMIT", dataset=None, num_frames=15, net=None, fp16=False):
+def timit(ed_weight, vae_weight, root_dir="DeepfakeTIMIT", dataset=None, num_frames=15, net=None, fp16=False, student_weight=None):
     keywords = ["higher_quality", "lower_quality"]
     result = set_result()
-    model = load_genconvit(config, net, ed_weight, vae_weight, fp16)
+    model = load_genconvit(config, net, ed_weight, vae_weight, fp16, student_weight)
     count = 0
     accuracy = 0
     i = 0
@@ -151,6 +206,7 @@ def dfdc(
     num_frames=15,
     net=None,
     fp16=False,
+    student_weight=None,
 ):
     result = set_result()
     if os.path.isfile(os.path.join("json_file", "dfdc_files.json")):
@@ -160,7 +216,7 @@ def dfdc(
     if os.path.isfile(os.path.join(root_dir, "metadata.json")):
         with open(os.path.join(root_dir, "metadata.json")) as data_file:
             dfdc_meta = json.load(data_file)
-    model = load_genconvit(config, net, ed_weight, vae_weight, fp16)
+    model = load_genconvit(config, net, ed_weight, vae_weight, fp16, student_weight)
     count = 0
     accuracy = 0
     for dfdc in dfdc_data:
@@ -189,14 +245,14 @@ def dfdc(
     return result
 
 
-def celeb(ed_weight, vae_weight, root_dir="Celeb-DF-v2", dataset=None, num_frames=15, net=None, fp16=False):
+def celeb(ed_weight, vae_weight, root_dir="Celeb-DF-v2", dataset=None, num_frames=15, net=None, fp16=False, student_weight=None):
     with open(os.path.join("json_file", "celeb_test.json"), "r") as f:
         cfl = json.load(f)
     result = set_result()
     ky = ["Celeb-real", "Celeb-synthesis"]
     count = 0
     accuracy = 0
-    model = load_genconvit(config, net, ed_weight, vae_weight, fp16)
+    model = load_genconvit(config, net, ed_weight, vae_weight, fp16, student_weight)
 
     for ck in cfl:
         ck_ = ck.split("/")
@@ -240,18 +296,22 @@ def predict(
     accuracy=-1,
     correct_label="unknown",
     compression=None,
+    callback=None,
 ):
     count += 1
     print(f"\n\n{str(count)} Loading... {vid}")
 
-    df = df_face(vid, num_frames, net)  # extract face from the frames
-    if fp16:
-        df.half()
-    y, y_val = (
-        pred_vid(df, model)
-        if len(df) >= 1
-        else (torch.tensor(0).item(), torch.tensor(0.5).item())
-    )
+    if callback is not None:
+        y, y_val = stream_predict(vid, model, num_frames, fp16, callback)
+    else:
+        df = df_face(vid, num_frames, net)  # extract face from the frames
+        if fp16:
+            df.half()
+        y, y_val = (
+            pred_vid(df, model)
+            if len(df) >= 1
+            else (torch.tensor(0).item(), torch.tensor(0.5).item())
+        )
     result = store_result(
         result, os.path.basename(vid), y, y_val, klass, correct_label, compression
     )
@@ -266,6 +326,80 @@ def predict(
     return result, accuracy, count, [y, y_val]
 
 
+def stream_predict(vid, model, num_frames, fp16, callback):
+    """
+    Run predict_events and hand every event to `callback`. Returning False
+    from the callback stops the video early with the running verdict.
+    """
+    y, y_val = 0, 0.5
+    events = predict_events(vid, model, num_frames, fp16)
+    for event in events:
+        if event["event"] in ("mean", "result"):
+            y, y_val = event["pred"], event["score"]
+        if callback(event) is False:
+            events.close()
+            break
+    return y, y_val
+
+
+def segments(
+    vid, model, fp16, window=10.0, frames_per_window=4, workers=None
+):
+    """
+    Score `vid` in fixed windows of `window` seconds, `frames_per_window` frames
+    each. Frames are decoded and faces detected by a pool of worker processes;
+    at most two windows per worker are in flight, so memory depends on the
+    window size and not on the video length.
+    """
+    vr = VideoReader(vid, ctx=cpu(0))
+    fps = vr.get_avg_fps()
+    windows = window_indices(len(vr), fps, window, frames_per_window)
+    del vr
+    print(f"\n{vid}: {len(windows)} windows of {window}s ({fps:.2f} fps)")
+
+    timeline = []
+
+    def score(index, faces):
+        start, end, _ = windows[index]
+        entry = {
+            "window": index,
+            "start": round(start / fps, 3),
+            "end": round(end / fps, 3),
+            "faces": len(faces),
+            "pred": None,
+            "pred_label": None,
+        }
+        if len(faces):
+            # a window may hold a single face: score_faces keeps the (n, 2) shape
+            y, y_val = max_prediction_value(score_faces(faces, model, fp16))
+            entry["pred"] = y_val
+            entry["pred_label"] = real_or_fake(y)
+            print(f"[{entry['start']:.1f}s - {entry['end']:.1f}s] {y_val:.4f} {entry['pred_label']}")
+        timeline.append(entry)
+
+    workers = workers or min(4, os.cpu_count())
+    with mp.Pool(workers) as pool:
+        pending = deque()
+        for i, (_, _, idx) in enumerate(windows):
+            if len(pending) >= 2 * workers:
+                score(*pending.popleft().get())
+            pending.append(pool.apply_async(window_faces, ((vid, i, idx),)))
+        while pending:
+            score(*pending.popleft().get())
+
+    scored = [w for w in timeline if w["pred"] is not None]
+    fake = [w["window"] for w in scored if w["pred_label"] == "FAKE"]
+    aggregate = {
+        "windows": len(timeline),
+        "scored_windows": len(scored),
+        "fake_windows": fake,
+        "max_pred": max((w["pred"] for w in scored), default=None),
+        "mean_pred": sum(w["pred"] for w in scored) / len(scored) if scored else None,
+        "pred_label": ("FAKE" if fake else "REAL") if scored else None,
+    }
+    return {"video": os.path.basename(vid), "window": window, "timeline": timeline, "aggregate": aggregate}
+
+
 def gen_parser():
     parser = argparse.ArgumentParser("GenConViT prediction")
     parser.add_argument("--p", type=str, help="video or image path")
@@ -273,7 +407,7 @@ def gen_parser():
         "--f", type=int, help="number of frames to process for prediction"
     )
     parser.add_argument(
-        "--d", type=str, help="dataset type, dfdc, faceforensics, timit, celeb"
+        "--d", type=str, help="dataset type, dfdc, faceforensics, timit, celeb, images (still images)"
     )
     parser.add_argument(
         "--s", help="model size type: tiny, large.",
@@ -285,12 +419,23 @@ def gen_parser():
         "--v", '--value', nargs='?', const='genconvit_vae_inference', default='genconvit_vae_inference', help="weight for vae.",
     )
     
+    parser.add_argument(
+        "--student", nargs='?', const='genconvit_student_inference', help="weight for the distilled student (replaces ed/vae).",
+    )
     parser.add_argument("--fp16", type=str, help="half precision support")
+    parser.add_argument(
+        "--window", type=float, help="segment mode: score fixed windows of this many seconds (--f frames each, default 4)",
+    )
+    parser.add_argument("--w", type=int, help="segment mode worker processes (default: min(4, cpu count))")
+    parser.add_argument(
+        "--runtime", type=str, help="thread layout: auto (saved by a previous tune, else default), tune, off, or torch=4,interop=1,decode=2",
+    )
 
     args = parser.parse_args()
+    runtime.configure(args.runtime)
     path = args.p
-    num_frames = args.f if args.f else 15
-    dataset = args.d if args.d else "other"
+    num_frames = args.f if args.f else (4 if args.window else 15)
+    dataset = args.d if args.d else ("images" if path and is_image(path) else "other")
     fp16 = True if args.fp16 else False
 
     net = 'genconvit'
@@ -306,6 +451,10 @@ def gen_parser():
     elif args.v:
         net = 'vae'
         vae_weight = args.v
+    student_weight = None
+    if args.student:
+        net = 'student'
+        student_weight = args.student
     
         
     print(f'\nUsing {net}\n')  
@@ -317,16 +466,38 @@ def gen_parser():
             config["model"]["embedder"] = f"swin_{args.s}_patch4_window7_224"
             config["model"]["type"] = args.s
     
-    return path, dataset, num_frames, net, fp16, ed_weight, vae_weight
+    return path, dataset, num_frames, net, fp16, ed_weight, vae_weight, student_weight, args
+
+
+def long_videos(ed_weight, vae_weight, path, num_frames, net, fp16, student_weight, window, workers=None):
+    model = load_genconvit(config, net, ed_weight, vae_weight, fp16, student_weight)
+    videos = (
+        [os.path.join(path, f) for f in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+    )
+    return [
+        segments(vid, model, fp16, window, num_frames, workers)
+        for vid in videos
+        if is_video(vid)
+    ]
 
 
 def main():
     start_time = perf_counter()
-    path, dataset, num_frames, net, fp16, ed_weight, vae_weight = gen_parser()
+    path, dataset, num_frames, net, fp16, ed_weight, vae_weight, student_weight, args = gen_parser()
+    if args.window:
+        result = long_videos(ed_weight, vae_weight, path, num_frames, net, fp16, student_weight, args.window, args.w)
+        curr_time = datetime.now().strftime("%B_%d_%Y_%H_%M_%S")
+        file_path = os.path.join("result", f"segments_{net}_{curr_time}.json")
+        with open(file_path, "w") as f:
+            json.dump(result, f, indent=1)
+        print(f"\nTimeline saved to {file_path}")
+        print("\n\n--- %s seconds ---" % (perf_counter() - start_time))
+        return
+
     result = (
-        globals()[dataset](ed_weight, vae_weight, path, dataset, num_frames, net, fp16)
-        if dataset in ["dfdc", "faceforensics", "timit", "celeb"]
-        else vids(ed_weight, vae_weight, path, dataset, num_frames, net, fp16)
+        globals()[dataset](ed_weight, vae_weight, path, dataset, num_frames, net, fp16, student_weight)
+        if dataset in ["dfdc", "faceforensics", "timit", "celeb", "images"]
+        else vids(ed_weight, vae_weight, path, dataset, num_frames, net, fp16, student_weight)
     )
 
     curr_time = datetime.now().strftime("%B_%d_%Y_%H_%M_%S")
@@ -0,0 +1,18 @@
+import os
+import sys
+import pytest
+
+# the training code imports its packages as top-level modules (train.py is run from here),
+# the inference and interface code as detection.* / top-level modules of interface_test
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INTERFACE_ROOT = os.path.dirname(os.path.dirname(ROOT))
+for path in (INTERFACE_ROOT, ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def image_folder(tmp_path):
+    from synthetic import write_image_folder
+
+    return lambda counts: write_image_folder(tmp_path / "data", counts)
@@ -0,0 +1,45 @@
+"""Synthetic data and model for the training tests (importable from spawned processes)."""
+
+import os
+import random
+
+
+def write_image_folder(root, counts, size=16, seed=0):
+    """
+    Tiny ImageFolder tree (fake/ and real/ per split): fake faces are bright
+    noise, real ones dark noise, so a few steps are enough to separate them.
+    counts: {split: images per class}
+    """
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    for split, count in counts.items():
+        for label, low in (("fake", 150), ("real", 0)):
+            folder = os.path.join(root, split, label)
+            os.makedirs(folder, exist_ok=True)
+            for i in range(count):
+                pixels = rng.integers(low, low + 100, size=(size, size, 3), dtype=np.uint8)
+                Image.fromarray(pixels).save(os.path.join(folder, f"{i:03d}.png"))
+    return str(root)
+
+
+def tiny_model():
+    import torch.nn as nn
+
+    return nn.Sequential(
+        nn.Conv2d(3, 8, 3, padding=1),
+        nn.ReLU(),
+        nn.AdaptiveAvgPool2d(1),
+        nn.Flatten(),
+        nn.Linear(8, 2),
+    )
+
+
+def seed_everything(seed):
+    import numpy as np
+    import torch
+
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
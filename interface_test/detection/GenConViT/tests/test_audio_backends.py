@@ -0,0 +1,34 @@
+"""Exported audio model (ONNX, TFLite) against the Keras reference."""
+
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+import audio_backends
+
+# same default as `python audio_backends.py check --tol`
+TOLERANCE = 1e-4
+
+
+@pytest.fixture
+def keras_model(tmp_path):
+    """Small stand-in for final_model.h5 with the same input and output layout."""
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=audio_backends.INPUT_SHAPE),
+        tf.keras.layers.Conv2D(4, 3, strides=4, activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(1, activation="sigmoid"),
+    ])
+    path = str(tmp_path / "final_model.h5")
+    model.save(path)
+    return path
+
+
+@pytest.mark.parametrize("fmt, runtimes", [("onnx", ("tf2onnx", "onnxruntime")), ("tflite", ())])
+def test_exported_model_matches_keras(keras_model, fmt, runtimes):
+    for module in runtimes:
+        pytest.importorskip(module)
+    exported = audio_backends.convert(keras_model, fmt)
+    assert exported == audio_backends.exported_path(keras_model, fmt)
+    assert audio_backends.parity(keras_model, fmt, exported) <= TOLERANCE
@@ -0,0 +1,26 @@
+"""Vectorized log-mel frontend of the audio detector against the librosa reference."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+pytest.importorskip("librosa")
+
+import audio_frontend
+
+# same default as `python audio_frontend.py --tol`
+TOLERANCE_DB = 0.05
+
+
+def test_log_mel_matches_librosa():
+    max_diff, _ = audio_frontend.check_parity(audio_frontend.MelFrontend())
+    assert max_diff <= TOLERANCE_DB
+
+
+def test_model_input_is_three_channel_log_mel():
+    frontend = audio_frontend.MelFrontend()
+    batch = audio_frontend.test_windows(2)
+    model_input = frontend.model_input(batch)
+    assert model_input.shape == (2, audio_frontend.N_MELS, 224, 3)
+    for channel in range(3):
+        np.testing.assert_allclose(model_input[..., channel], frontend.log_mel(batch))
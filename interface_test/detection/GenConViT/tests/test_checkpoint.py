@@ -0,0 +1,49 @@
+"""Mid-epoch checkpoints: the resumed epoch continues with the samples not trained on yet."""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+pytest.importorskip("albumentations")
+
+from dataset.loader import ResumableSampler
+from train.checkpoint import CheckpointManager
+from synthetic import tiny_model
+
+
+def test_sampler_skips_done_samples():
+    dataset = list(range(20))
+    sampler = ResumableSampler(dataset)
+    sampler.set_epoch(3)
+    order = list(sampler)
+    assert sorted(order) == dataset
+
+    resumed = ResumableSampler(dataset)
+    resumed.set_epoch(3)
+    resumed.skip(8)
+    assert len(resumed) == 12
+    assert list(resumed) == order[8:]
+
+    # the skip only applies to the resumed epoch
+    resumed.set_epoch(4)
+    assert len(resumed) == 20
+
+
+def test_mid_epoch_checkpoint_resumes_position(tmp_path):
+    model = tiny_model()
+    optimizer = torch.optim.Adam(model.parameters())
+    scheduler = torch.optim.lr_scheduler.StepLR(optimizer, step_size=15)
+
+    checkpoints = CheckpointManager(str(tmp_path), every_minutes=1e-9)
+    checkpoints.step(0, model, optimizer, scheduler, 1.0, [[], [], [], []])
+    assert checkpoints.due()
+    checkpoints.save_position(1, 64, model, optimizer, scheduler, [[0.5], [], [], []])
+    checkpoints.wait()
+    # sorted between the end of epoch 0 and the end of epoch 1
+    assert checkpoints.latest().endswith("epoch_0001_00000064.pth")
+
+    start_epoch, history, position = CheckpointManager(str(tmp_path)).resume(
+        str(tmp_path), model, optimizer, scheduler
+    )
+    assert (start_epoch, position) == (1, 64)
+    assert history[0] == [0.5]
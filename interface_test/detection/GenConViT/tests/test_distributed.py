@@ -0,0 +1,110 @@
+"""Two-process CPU DistributedDataParallel run (gloo) on a tiny synthetic ImageFolder."""
+
+import os
+import json
+import socket
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+pytest.importorskip("albumentations")
+
+from torch import nn
+from torch.optim import lr_scheduler
+
+from dataset.loader import load_data
+from train.checkpoint import CheckpointManager
+from train.distributed import (
+    all_reduce_sum,
+    cleanup,
+    get_rank,
+    get_world_size,
+    is_distributed,
+    is_main_process,
+    launch,
+    setup,
+    unwrap,
+)
+from train.train_ed import train, valid
+from synthetic import seed_everything, tiny_model
+
+WORLD_SIZE = 2
+EPOCHS = 2
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def ddp_worker(data_dir, out_dir):
+    device = setup()
+    rank = get_rank()
+    seed_everything(0)
+    dataloaders, dataset_sizes = load_data(data_dir, 4, 0, is_distributed())
+
+    # every validation image is evaluated by exactly one process
+    (valid_seen,) = all_reduce_sum([len(dataloaders["validation"].dataset)], device)
+
+    model = nn.parallel.DistributedDataParallel(tiny_model())
+    optimizer = torch.optim.Adam(model.parameters(), lr=1e-2)
+    scheduler = lr_scheduler.StepLR(optimizer, step_size=15, gamma=0.1)
+    criterion = nn.CrossEntropyLoss()
+    checkpoints = CheckpointManager(
+        os.path.join(out_dir, f"checkpoints_rank{rank}"), enabled=is_main_process()
+    )
+
+    train_loss, train_acc, valid_loss, valid_acc = [], [], [], []
+    for epoch in range(EPOCHS):
+        dataloaders["train"].sampler.set_epoch(epoch)
+        train_loss, train_acc, _ = train(
+            model, device, dataloaders["train"], criterion, optimizer, epoch, train_loss, train_acc
+        )
+        valid_loss, valid_acc = valid(
+            model, device, dataloaders["validation"], criterion, epoch, valid_loss, valid_acc
+        )
+        scheduler.step()
+        checkpoints.step(
+            epoch, unwrap(model), optimizer, scheduler, valid_loss[-1],
+            [train_loss, train_acc, valid_loss, valid_acc],
+        )
+    checkpoints.wait()
+
+    result = {
+        "world_size": get_world_size(),
+        "valid_seen": valid_seen,
+        "valid_size": dataset_sizes["valid"],
+        "train_acc": train_acc[-1],
+        "checksum": sum(p.double().sum().item() for p in unwrap(model).parameters()),
+    }
+    with open(os.path.join(out_dir, f"result_rank{rank}.json"), "w") as f:
+        json.dump(result, f)
+    cleanup()
+
+
+def test_two_process_ddp_training(image_folder, tmp_path):
+    # odd validation size: a padded sampler would count one image twice
+    data_dir = image_folder({"train": 8, "valid": 5, "test": 2})
+    out_dir = str(tmp_path / "run")
+    os.makedirs(out_dir)
+
+    launch(ddp_worker, (data_dir, out_dir), nproc=WORLD_SIZE, master_port=free_port())
+
+    results = []
+    for rank in range(WORLD_SIZE):
+        with open(os.path.join(out_dir, f"result_rank{rank}.json")) as f:
+            results.append(json.load(f))
+
+    assert all(r["world_size"] == WORLD_SIZE for r in results)
+    assert all(r["valid_seen"] == r["valid_size"] == 10 for r in results)
+    # all-reduced metrics and DDP-synchronised weights are identical on every rank
+    assert results[0]["train_acc"] == results[1]["train_acc"]
+    assert results[0]["checksum"] == pytest.approx(results[1]["checksum"])
+
+    # only rank 0 writes checkpoints
+    rank0 = os.path.join(out_dir, "checkpoints_rank0")
+    assert sorted(os.listdir(rank0)) == ["best.pth", "epoch_0001.pth", "epoch_0002.pth"]
+    assert not os.path.exists(os.path.join(out_dir, "checkpoints_rank1"))
+    checkpoint = torch.load(os.path.join(rank0, f"epoch_{EPOCHS:04d}.pth"), map_location="cpu")
+    assert checkpoint["epoch"] == EPOCHS
@@ -0,0 +1,61 @@
+"""--fast (bf16 autocast + channels_last on CPU) against the plain fp32 loop."""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+pytest.importorskip("albumentations")
+
+from torch import nn
+
+from dataset.loader import load_data
+from train.checkpoint import CheckpointManager
+from train.fast import FastTraining
+from train.train_ed import train, valid
+from synthetic import seed_everything, tiny_model
+
+SEED = 0
+# accuracy points allowed between fp32 and mixed precision after one epoch
+TOLERANCE = 0.1
+
+
+def one_epoch(data_dir, fast_mode, accumulation=1):
+    device = torch.device("cpu")
+    seed_everything(SEED)
+    dataloaders, _ = load_data(data_dir, 4, 0)
+    model = tiny_model()
+    fast = FastTraining(device, enabled=fast_mode, accumulation=accumulation)
+    fast.prepare_model(model)
+    optimizer = torch.optim.Adam(model.parameters(), lr=1e-2)
+    criterion = nn.CrossEntropyLoss()
+
+    train(model, device, dataloaders["train"], criterion, optimizer, 0, [], [], fast=fast)
+    _, valid_acc = valid(model, device, dataloaders["validation"], criterion, 0, [], [], fast=fast)
+    return valid_acc[-1]
+
+
+def test_fast_mode_matches_fp32_accuracy(image_folder):
+    data_dir = image_folder({"train": 32, "valid": 10, "test": 2})
+
+    fp32 = one_epoch(data_dir, fast_mode=False)
+    assert one_epoch(data_dir, fast_mode=False) == fp32  # fixed seed: reproducible
+    assert abs(one_epoch(data_dir, fast_mode=True) - fp32) <= TOLERANCE
+    assert abs(one_epoch(data_dir, fast_mode=True, accumulation=2) - fp32) <= TOLERANCE
+
+
+def test_scaler_state_round_trip(tmp_path):
+    # the CPU scaler is disabled: its empty state must not break resuming
+    model = tiny_model()
+    optimizer = torch.optim.Adam(model.parameters())
+    scheduler = torch.optim.lr_scheduler.StepLR(optimizer, step_size=15)
+    fast = FastTraining(torch.device("cpu"), enabled=True)
+
+    checkpoints = CheckpointManager(str(tmp_path))
+    checkpoints.step(0, model, optimizer, scheduler, 1.0, [[], [], [], []], fast.scaler)
+    checkpoints.wait()
+    start_epoch, history, position = CheckpointManager(str(tmp_path)).resume(
+        str(tmp_path), model, optimizer, scheduler, fast.scaler
+    )
+    assert (start_epoch, position) == (1, 0)
+    assert history == [[], [], [], []]
+    assert torch.load(checkpoints.latest(), map_location="cpu")["scaler"] == {}
@@ -0,0 +1,46 @@
+"""Video scoring when only a few faces are found (one face per window, per video)."""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+np = pytest.importorskip("numpy")
+for module in ("cv2", "dlib", "face_recognition", "decord", "torchvision"):
+    pytest.importorskip(module)
+
+from detection.GenConViT.model import pred_func
+from synthetic import seed_everything, tiny_model
+
+
+class Ensemble(torch.nn.Module):
+    """Stacks two heads along the batch, like GenConViT(net='genconvit')."""
+
+    def __init__(self):
+        super().__init__()
+        self.ed, self.vae = tiny_model(), tiny_model()
+
+    def forward(self, x):
+        return torch.cat((self.ed(x), self.vae(x)), dim=0)
+
+
+def faces(n):
+    return np.random.default_rng(0).integers(0, 255, size=(n, 224, 224, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("make_model", [tiny_model, Ensemble])
+def test_single_face_window(make_model):
+    seed_everything(0)
+    model = make_model().to(pred_func.device).eval()
+
+    y, y_val = pred_func.max_prediction_value(pred_func.score_faces(faces(1), model))
+    assert y in (0, 1)
+    assert 0.0 <= y_val <= 1.0
+    # pred_vid (per-video path) must agree and not squeeze the single face away
+    assert pred_func.pred_vid(pred_func.preprocess_frame(faces(1)), model) == pytest.approx((y, y_val))
+
+
+def test_one_face_scores_like_a_batch_of_one():
+    seed_everything(0)
+    model = tiny_model().to(pred_func.device).eval()
+    probs = pred_func.score_faces(faces(3), model)
+    assert probs.shape == (3, 2)
+    assert torch.allclose(pred_func.score_faces(faces(3)[:1], model), probs[:1], atol=1e-6)
@@ -7,42 +7,59 @@ from torch.optim import lr_scheduler
 import time
 from time import perf_counter
 import pickle
+import functools
 from model.config import load_config
 from model.genconvit_ed import GenConViTED
 from model.genconvit_vae import GenConViTVAE
-from dataset.loader import load_data, load_checkpoint
+from model.student import GenConViTStudent
+from dataset.loader import load_data
+from train.distributed import setup, cleanup, is_distributed, is_main_process, unwrap, launch
+from train.checkpoint import CheckpointManager
+from train.fast import FastTraining
 import optparse
 
 config = load_config()
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 
-def load_pretrained(pretrained_model_filename):
-    assert os.path.isfile(
-        pretrained_model_filename
-    ), "Saved model file does not exist. Exiting."
-
-    model, optimizer, start_epoch, min_loss = load_checkpoint(
-        model, optimizer, filename=pretrained_model_filename
-    )
-    # now individually transfer the optimizer parts...
-    for state in optimizer.state.values():
-        for k, v in state.items():
-            if isinstance(v, torch.Tensor):
-                state[k] = v.to(device)
-    return model, optimizer, start_epoch, min_loss
-
-
 def train_model(
-    dir_path, mod, num_epochs, pretrained_model_filename, test_model, batch_size
+    dir_path,
+    mod,
+    num_epochs,
+    pretrained_model_filename,
+    test_model,
+    batch_size,
+    num_workers=None,
+    save_every=1,
+    save_minutes=0,
+    keep=3,
+    fast_mode=False,
+    accumulate=False,
 ):
+    global device
+    device = setup()
+    distributed = is_distributed()
+
     print("Loading data...")
-    dataloaders, dataset_sizes = load_data(dir_path, batch_size)
+    dataloaders, dataset_sizes = load_data(dir_path, batch_size, num_workers, distributed)
     print("Done.")
 
+    teacher = None
     if mod == "ed":
         from train.train_ed import train, valid
         model = GenConViTED(config)
+    elif mod == "student":
+        from train.train_distill import train, valid, Teacher
+        model = GenConViTStudent(config)
+        teacher = Teacher(
+            config, config["student"]["teacher_ed"], config["student"]["teacher_vae"], device
+        )
+        train = functools.partial(
+            train,
+            teacher=teacher,
+            temperature=float(config["student"]["temperature"]),
+            alpha=float(config["student"]["alpha"]),
+        )
     else:
         from train.train_vae import train, valid
         model = GenConViTVAE(config)
@@ -58,17 +75,64 @@ def train_model(
     min_val_loss = int(config["min_val_loss"])
     scheduler = lr_scheduler.StepLR(optimizer, step_size=15, gamma=0.1)
 
-    if pretrained_model_filename:
-        model, optimizer, start_epoch, min_loss = load_pretrained(
-            pretrained_model_filename
-        )
+    checkpoints = CheckpointManager(
+        os.path.join("weight", "checkpoints", f"genconvit_{mod}"),
+        every_epochs=save_every,
+        every_minutes=save_minutes,
+        keep=keep,
+        enabled=is_main_process(),
+    )
+
+    # --accumulate: sum gradients until the config batch size is reached
+    accumulation = max(1, int(config["batch_size"]) // batch_size) if accumulate else 1
+    fast = FastTraining(device, enabled=fast_mode, accumulation=accumulation)
+    if fast_mode or accumulation > 1:
+        print(f"Fast training: amp={fast_mode} ({fast.dtype}), accumulation={accumulation}")
 
     model.to(device)
+    fast.prepare_model(model)
     torch.manual_seed(1)
     train_loss, train_acc, valid_loss, valid_acc = [], [], [], []
-    since = time.time()
+    start_epoch = 0
+    start_position = 0
 
-    for epoch in range(0, num_epochs):
+    if pretrained_model_filename:
+        # restores weights, optimizer, scheduler, GradScaler, RNG states and loss histories
+        start_epoch, history, start_position = checkpoints.resume(
+            pretrained_model_filename, model, optimizer, scheduler, fast.scaler
+        )
+        if history is not None:
+            train_loss, train_acc, valid_loss, valid_acc = history
+
+    if distributed:
+        model = nn.parallel.DistributedDataParallel(
+            model,
+            device_ids=[device.index] if device.type == "cuda" else None,
+            find_unused_parameters=True,
+        )
+    since = time.time()
+    epoch_loss = checkpoints.best_loss
+    sampler = dataloaders["train"].sampler
+
+    def save_position(batches):
+        # --save_minutes also applies inside an epoch: save the samples done so far
+        if checkpoints.due():
+            checkpoints.save_position(
+                epoch,
+                sampler.start + batches * dataloaders["train"].batch_size,
+                unwrap(model),
+                optimizer,
+                scheduler,
+                [train_loss, train_acc, valid_loss, valid_acc],
+                fast.scaler,
+            )
+
+    for epoch in range(start_epoch, num_epochs):
+        # the shuffled order only depends on the epoch, so a mid-epoch
+        # checkpoint resumes by skipping the samples it already trained on
+        sampler.set_epoch(epoch)
+        if epoch == start_epoch and start_position:
+            sampler.skip(start_position)
         train_loss, train_acc, epoch_loss = train(
             model,
             device,
@@ -79,6 +143,8 @@ def train_model(
             train_loss,
             train_acc,
             mse,
+            fast,
+            on_step=save_position,
         )
         valid_loss, valid_acc = valid(
             model,
@@ -89,10 +155,26 @@ def train_model(
             valid_loss,
             valid_acc,
             mse,
+            fast,
         )
         scheduler.step()
+        checkpoints.step(
+            epoch,
+            unwrap(model),
+            optimizer,
+            scheduler,
+            valid_loss[-1],
+            [train_loss, train_acc, valid_loss, valid_acc],
+            fast.scaler,
+        )
 
+    checkpoints.wait()
     time_elapsed = time.time() - since
+    main_process = is_main_process()
+    cleanup()
+    if not main_process:
+        return
+    model = unwrap(model)
 
     print(
         "Training complete in {:.0f}m {:.0f}s".format(
@@ -124,6 +206,17 @@ def train_model(
 
     if test_model:
         test(model, dataloaders, dataset_sizes, mod, weight)
+        if teacher is not None:
+            compare(teacher, model, dataloaders["test"])
+
+
+def compare(teacher, student, loader):
+    from train.train_distill import speed_accuracy
+
+    print("\nTeacher vs student on the test set:\n")
+    t_acc, t_fps = speed_accuracy(teacher, loader, device, "teacher")
+    s_acc, s_fps = speed_accuracy(student, loader, device, "student")
+    print(f"\nStudent: {100.0 * (s_acc - t_acc):+.2f} accuracy points, {s_fps / t_fps:.1f}x frames/s")
 
 
 def test(model, dataloaders, dataset_sizes, mod, weight):
@@ -138,10 +231,10 @@ def test(model, dataloaders, dataset_sizes, mod, weight):
     for inputs, labels in dataloaders["test"]:
         inputs = inputs.to(device)
         labels = labels.to(device)
-        if mod == "ed":
-            output = model(inputs).to(device).float()
-        else:
+        if mod == "vae":
             output = model(inputs)[0].to(device).float()
+        else:
+            output = model(inputs).to(device).float()
 
         _, prediction = torch.max(output, 1)
 
@@ -173,33 +266,103 @@ def gen_parser():
         "-m",
         "--model",
         dest="model",
-        help="model ed or model vae, model variant: genconvit (A) ed or genconvit (B) vae.",
+        help="model ed or model vae, model variant: genconvit (A) ed or genconvit (B) vae; "
+        "student distills the ed+vae ensemble into config['student']['backbone'].",
     )
     parser.add_option(
         "-p",
         "--pretrained",
         dest="pretrained",
-        help="Saved model file name. If you want to continue from the previous trained model.",
+        help="Checkpoint file (or checkpoint directory, latest is used) to resume training from.",
+    )
+    parser.add_option(
+        "--save_every", type=int, default=1, dest="save_every", help="Checkpoint every N epochs."
+    )
+    parser.add_option(
+        "--save_minutes",
+        type=float,
+        default=0,
+        dest="save_minutes",
+        help="Also checkpoint when this many minutes passed since the last one, mid-epoch included (0: off).",
+    )
+    parser.add_option(
+        "--fast",
+        action="store_true",
+        default=False,
+        dest="fast",
+        help="Mixed precision (bf16 on CPU, fp16 + GradScaler on GPU) and channels_last.",
+    )
+    parser.add_option(
+        "--accumulate",
+        action="store_true",
+        default=False,
+        dest="accumulate",
+        help="Accumulate gradients so that -b batches add up to the config batch_size.",
+    )
+    parser.add_option(
+        "--keep", type=int, default=3, dest="keep", help="Number of periodic checkpoints to keep."
     )
     parser.add_option("-t", "--test", dest="test", help="run test on test dataset.")
     parser.add_option("-b", "--batch_size", dest="batch_size", help="batch size.")
+    parser.add_option(
+        "-n",
+        "--nproc",
+        type=int,
+        default=1,
+        dest="nproc",
+        help="Training processes on this node (DistributedDataParallel when > 1).",
+    )
+    parser.add_option("--nnodes", type=int, default=1, dest="nnodes", help="Number of nodes.")
+    parser.add_option("--node_rank", type=int, default=0, dest="node_rank", help="Rank of this node.")
+    parser.add_option(
+        "--master_addr", default="127.0.0.1", dest="master_addr", help="Rendezvous address (node 0)."
+    )
+    parser.add_option("--master_port", type=int, default=29500, dest="master_port", help="Rendezvous port.")
+    parser.add_option(
+        "-w",
+        "--workers",
+        type=int,
+        dest="workers",
+        help="DataLoader worker processes (default: min(8, cpu count)).",
+    )
 
     (options, _) = parser.parse_args()
 
     dir_path = options.dir
     epoch = options.epoch
-    mod = "ed" if options.model == "ed" else "vae"
+    mod = options.model if options.model in ("ed", "student") else "vae"
     test_model = "y" if options.test else None
     pretrained_model_filename = options.pretrained if options.pretrained else None
     batch_size = options.batch_size if options.batch_size else config["batch_size"]
 
-    return dir_path, mod, epoch, pretrained_model_filename, test_model, int(batch_size)
+    return dir_path, mod, epoch, pretrained_model_filename, test_model, int(batch_size), options.workers, options
 
 
 def main():
     start_time = perf_counter()
-    path, mod, epoch, pretrained_model_filename, test_model, batch_size = gen_parser()
-    train_model(path, mod, epoch, pretrained_model_filename, test_model, batch_size)
+    path, mod, epoch, pretrained_model_filename, test_model, batch_size, workers, options = gen_parser()
+    launch(
+        train_model,
+        (
+            path,
+            mod,
+            epoch,
+            pretrained_model_filename,
+            test_model,
+            batch_size,
+            workers,
+            options.save_every,
+            options.save_minutes,
+            options.keep,
+            options.fast,
+            options.accumulate,
+        ),
+        nproc=options.nproc,
+        nnodes=options.nnodes,
+        node_rank=options.node_rank,
+        master_addr=options.master_addr,
+        master_port=options.master_port,
+    )
     end_time = perf_counter()
     print("\n\n--- %s seconds ---" % (end_time - start_time))
 
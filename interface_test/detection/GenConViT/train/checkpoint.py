@@ -0,0 +1,175 @@
+import os
+import glob
+import time
+import random
+import threading
+import numpy as np
+import torch
+
+
+def to_cpu(obj):
+    """Detached CPU copy of a (nested) state dict, safe to write while training goes on."""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {k: to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(to_cpu(v) for v in obj)
+    return obj
+
+
+def rng_state():
+    state = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+class CheckpointManager:
+    """
+    Periodic, best-model and resumable checkpoints for train.py.
+
+    A checkpoint is written every `every_epochs` epochs or once `every_minutes`
+    have passed since the previous one, whichever comes first, and whenever
+    the validation loss improves (best.pth). The minute trigger is also checked
+    between optimizer steps (due() / save_position()), so long epochs on
+    preemptible machines keep their in-epoch progress. Only the last `keep` periodic
+    checkpoints are kept. Files are written by a background thread from a CPU
+    snapshot, so the training loop only pays for the copy.
+
+    Checkpoints keep the keys read by dataset.loader.load_checkpoint
+    (epoch, state_dict, optimizer, min_loss) and add the scheduler, the
+    mixed-precision GradScaler, RNG states and loss histories, so a run
+    resumes exactly where it stopped.
+    """
+
+    def __init__(self, directory, every_epochs=1, every_minutes=0, keep=3, enabled=True):
+        self.directory = directory
+        self.every_epochs = every_epochs
+        self.every_minutes = every_minutes
+        self.keep = max(1, keep)
+        self.enabled = enabled
+        self.best_loss = float("inf")
+        self.last_save = time.time()
+        self._thread = None
+        if enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    def checkpoints(self):
+        return sorted(glob.glob(os.path.join(self.directory, "epoch_*.pth")))
+
+    def latest(self):
+        checkpoints = self.checkpoints()
+        return checkpoints[-1] if checkpoints else None
+
+    def due(self):
+        """True once `every_minutes` have passed since the last periodic checkpoint."""
+        return bool(self.every_minutes) and time.time() - self.last_save >= self.every_minutes * 60
+
+    def step(self, epoch, model, optimizer, scheduler, valid_epoch_loss, history, scaler=None):
+        """Call once per finished epoch (0-based); `scaler` is the --fast GradScaler."""
+        is_best = valid_epoch_loss < self.best_loss
+        if is_best:
+            self.best_loss = valid_epoch_loss
+        periodic = (self.every_epochs and (epoch + 1) % self.every_epochs == 0) or self.due()
+        if not self.enabled or not (periodic or is_best):
+            return
+
+        # next epoch to run
+        state = self._state(epoch + 1, model, optimizer, scheduler, history, scaler)
+
+        paths = []
+        if periodic:
+            paths.append(os.path.join(self.directory, f"epoch_{epoch + 1:04d}.pth"))
+            self.last_save = time.time()
+        if is_best:
+            paths.append(os.path.join(self.directory, "best.pth"))
+        self._save(state, paths)
+
+    def save_position(self, epoch, position, model, optimizer, scheduler, history, scaler=None):
+        """
+        Mid-epoch checkpoint, called from the batch loop when due(): the first
+        `position` samples of epoch `epoch` (0-based) are done on each process,
+        and resuming trains on the rest of that epoch. The name sorts between
+        the checkpoints of the previous and of this epoch.
+        """
+        self.last_save = time.time()
+        if not self.enabled:
+            return
+        state = self._state(epoch, model, optimizer, scheduler, history, scaler)
+        state["position"] = position
+        self._save(state, [os.path.join(self.directory, f"epoch_{epoch:04d}_{position:08d}.pth")])
+
+    def _state(self, epoch, model, optimizer, scheduler, history, scaler):
+        state = to_cpu(
+            {
+                "epoch": epoch,
+                "state_dict": model.state_dict(),
+                "optimizer": optimizer.state_dict(),
+                "scheduler": scheduler.state_dict(),
+                "min_loss": self.best_loss,
+                "history": history,
+                "scaler": scaler.state_dict() if scaler is not None else {},
+            }
+        )
+        state["rng"] = rng_state()
+        return state
+
+    def _save(self, state, paths):
+        self.wait()
+        self._thread = threading.Thread(target=self._write, args=(state, paths), daemon=True)
+        self._thread.start()
+
+    def _write(self, state, paths):
+        for path in paths:
+            tmp_path = f"{path}.tmp"
+            torch.save(state, tmp_path)
+            os.replace(tmp_path, path)
+            print(f"=> saved checkpoint '{path}' (epoch {state['epoch']}, sample {state.get('position', 0)})")
+        for old in self.checkpoints()[: -self.keep]:
+            os.remove(old)
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def resume(self, filename, model, optimizer, scheduler, scaler=None):
+        """
+        Restore a checkpoint file (or the latest one in a directory).
+        Returns (start_epoch, history, position): position is the number of
+        samples of start_epoch already done (mid-epoch checkpoints, 0 otherwise)
+        and history is None for older checkpoints.
+        """
+        if os.path.isdir(filename):
+            filename = CheckpointManager(filename, enabled=False).latest()
+        assert filename and os.path.isfile(filename), "Saved model file does not exist. Exiting."
+
+        print("=> loading checkpoint '{}'".format(filename))
+        # RNG states must stay on the CPU; load_state_dict moves the rest to the model's device
+        checkpoint = torch.load(filename, map_location="cpu")
+        model.load_state_dict(checkpoint["state_dict"])
+        optimizer.load_state_dict(checkpoint["optimizer"])
+        if "scheduler" in checkpoint:
+            scheduler.load_state_dict(checkpoint["scheduler"])
+        # empty when saved without --fast (or on CPU), where the scaler is disabled
+        if scaler is not None and scaler.is_enabled() and checkpoint.get("scaler"):
+            scaler.load_state_dict(checkpoint["scaler"])
+        self.best_loss = checkpoint.get("min_loss", self.best_loss)
+        if "rng" in checkpoint:
+            set_rng_state(checkpoint["rng"])
+        position = checkpoint.get("position", 0)
+        print("=> loaded checkpoint '{}' (epoch {}, sample {})".format(filename, checkpoint["epoch"], position))
+        return checkpoint["epoch"], checkpoint.get("history"), position
@@ -0,0 +1,96 @@
+import os
+import sys
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+
+def is_distributed():
+    return dist.is_available() and dist.is_initialized()
+
+
+def get_rank():
+    return dist.get_rank() if is_distributed() else 0
+
+
+def get_world_size():
+    return dist.get_world_size() if is_distributed() else 1
+
+
+def is_main_process():
+    return get_rank() == 0
+
+
+def setup(backend=None):
+    """
+    Join the process group described by the torchrun-style environment
+    (RANK, WORLD_SIZE, LOCAL_RANK, MASTER_ADDR, MASTER_PORT) and return the
+    device this process trains on. Without WORLD_SIZE > 1 nothing is
+    initialised and training stays single-process.
+    """
+    world_size = int(os.environ.get("WORLD_SIZE", 1))
+    local_rank = int(os.environ.get("LOCAL_RANK", 0))
+    use_cuda = torch.cuda.is_available()
+
+    if world_size > 1 and not is_distributed():
+        if backend is None:
+            backend = "nccl" if use_cuda and dist.is_nccl_available() else "gloo"
+        dist.init_process_group(backend=backend, init_method="env://")
+        if not is_main_process():
+            # logging is rank-0 only
+            sys.stdout = open(os.devnull, "w")
+
+    if use_cuda:
+        torch.cuda.set_device(local_rank % torch.cuda.device_count())
+        return torch.device("cuda", torch.cuda.current_device())
+    return torch.device("cpu")
+
+
+def cleanup():
+    if is_distributed():
+        dist.barrier()
+        dist.destroy_process_group()
+
+
+def all_reduce_sum(values, device):
+    """Sum a list of numbers over every process; returns a list of floats."""
+    if not is_distributed():
+        return [float(v) for v in values]
+    tensor = torch.tensor([float(v) for v in values], dtype=torch.float64, device=device)
+    dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+    return tensor.tolist()
+
+
+def unwrap(model):
+    return model.module if hasattr(model, "module") else model
+
+
+def _worker(local_rank, fn, args, nproc, nnodes, node_rank, master_addr, master_port):
+    os.environ.update(
+        {
+            "MASTER_ADDR": master_addr,
+            "MASTER_PORT": str(master_port),
+            "WORLD_SIZE": str(nproc * nnodes),
+            "RANK": str(node_rank * nproc + local_rank),
+            "LOCAL_RANK": str(local_rank),
+            "LOCAL_WORLD_SIZE": str(nproc),
+        }
+    )
+    fn(*args)
+
+
+def launch(fn, args, nproc=1, nnodes=1, node_rank=0, master_addr="127.0.0.1", master_port=29500):
+    """
+    Run `fn(*args)` in `nproc` processes on this node. For multi-node runs,
+    start the same command on every node with its own `node_rank` and the
+    rendezvous address of node 0.
+    """
+    if nproc * nnodes <= 1:
+        fn(*args)
+        return
+    mp.spawn(
+        _worker,
+        args=(fn, args, nproc, nnodes, node_rank, master_addr, master_port),
+        nprocs=nproc,
+        join=True,
+    )
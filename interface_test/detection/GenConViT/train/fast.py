@@ -0,0 +1,67 @@
+import contextlib
+import torch
+
+
+def grad_scaler(enabled):
+    # torch.amp.GradScaler("cuda") replaces torch.cuda.amp.GradScaler from torch 2.3 on
+    if hasattr(torch.amp, "GradScaler"):
+        return torch.amp.GradScaler("cuda", enabled=enabled)
+    return torch.cuda.amp.GradScaler(enabled=enabled)
+
+
+class FastTraining:
+    """
+    Mixed-precision / channels_last settings shared by train_ed and train_vae.
+
+    When enabled, forward passes run under autocast (bf16 on CPU, fp16 with a
+    GradScaler on CUDA) and image batches use the channels_last memory format.
+    `accumulation` micro-batches are summed before each optimizer step, which
+    emulates a larger batch size on small machines. Disabled, it reproduces
+    the plain fp32 loop.
+    """
+
+    def __init__(self, device, enabled=False, accumulation=1):
+        self.device = device
+        self.enabled = enabled
+        self.accumulation = max(1, accumulation)
+        self.use_cuda = device.type == "cuda"
+        self.dtype = torch.float16 if self.use_cuda else torch.bfloat16
+        self.scaler = grad_scaler(enabled and self.use_cuda)
+
+    def prepare_model(self, model):
+        if self.enabled:
+            model.to(memory_format=torch.channels_last)
+        return model
+
+    def batch(self, images, targets):
+        images = images.to(self.device, non_blocking=True)
+        targets = targets.to(self.device, non_blocking=True)
+        if self.enabled:
+            images = images.contiguous(memory_format=torch.channels_last)
+        return images, targets
+
+    def autocast(self):
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return torch.autocast(device_type=self.device.type, dtype=self.dtype)
+
+    def is_step(self, batch_idx, num_batches):
+        """True for the micro-batch that steps the optimizer."""
+        return (batch_idx + 1) % self.accumulation == 0 or batch_idx + 1 == num_batches
+
+    def sync(self, model, batch_idx, num_batches):
+        """
+        Context for the forward and backward pass of a micro-batch: under DDP,
+        gradients are only all-reduced on the micro-batch that steps.
+        """
+        if self.is_step(batch_idx, num_batches) or not hasattr(model, "no_sync"):
+            return contextlib.nullcontext()
+        return model.no_sync()
+
+    def backward(self, loss, optimizer, batch_idx, num_batches):
+        """Backward pass; steps the optimizer every `accumulation` batches and on the last one."""
+        self.scaler.scale(loss / self.accumulation).backward()
+        if self.is_step(batch_idx, num_batches):
+            self.scaler.step(optimizer)
+            self.scaler.update()
+            optimizer.zero_grad()
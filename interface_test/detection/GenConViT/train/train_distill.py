@@ -0,0 +1,214 @@
+import os
+import time
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from model.genconvit_ed import GenConViTED
+from model.genconvit_vae import GenConViTVAE
+from train.distributed import all_reduce_sum
+from train.fast import FastTraining
+
+
+class Teacher(nn.Module):
+    """Frozen ED+VAE ensemble; same output layout as GenConViT(net='genconvit')."""
+
+    def __init__(self, config, ed_weight, vae_weight, device):
+        super(Teacher, self).__init__()
+        self.model_ed = load_frozen(GenConViTED(config), ed_weight, device)
+        self.model_vae = load_frozen(GenConViTVAE(config), vae_weight, device)
+
+    def forward(self, x):
+        x1 = self.model_ed(x)
+        x2, _ = self.model_vae(x)
+        return torch.cat((x1, x2), dim=0)
+
+
+def load_frozen(model, weight, device):
+    checkpoint = torch.load(os.path.join("weight", f"{weight}.pth"), map_location="cpu")
+    model.load_state_dict(checkpoint.get("state_dict", checkpoint))
+    model.to(device)
+    model.eval()
+    model.requires_grad_(False)
+    return model
+
+
+def teacher_probs(teacher, images, temperature=1.0):
+    """
+    Soft sigmoid outputs of the GenConViT ensemble, averaged over ED and VAE.
+    GenConViT (net='genconvit') stacks the ED and VAE logits along the batch.
+    """
+    with torch.no_grad():
+        logits = teacher(images).float()
+        probs = torch.sigmoid(logits / temperature)
+        if len(probs) != len(images):
+            probs = probs.view(-1, len(images), probs.shape[-1]).mean(dim=0)
+    return probs
+
+
+def distillation_loss(output, soft_targets, targets, criterion, temperature, alpha):
+    soft = F.binary_cross_entropy_with_logits(output.float() / temperature, soft_targets)
+    hard = criterion(output, targets)
+    return alpha * soft * temperature ** 2 + (1 - alpha) * hard
+
+
+def train(
+    model,
+    device,
+    train_loader,
+    criterion,
+    optimizer,
+    epoch,
+    train_loss,
+    train_acc,
+    mse=None,
+    fast=None,
+    on_step=None,
+    teacher=None,
+    temperature=2.0,
+    alpha=0.7,
+):
+    if fast is None:
+        fast = FastTraining(device)
+    model.train()
+    optimizer.zero_grad()
+    since = time.perf_counter()
+    seen = 0
+
+    curr_loss = 0
+    t_pred = 0
+    for batch_idx, (images, targets) in enumerate(train_loader):
+        images, targets = fast.batch(images, targets)
+        with fast.sync(model, batch_idx, len(train_loader)):
+            with fast.autocast():
+                soft_targets = teacher_probs(teacher, images, temperature)
+                output = model(images)
+                loss = distillation_loss(output, soft_targets, targets, criterion, temperature, alpha)
+
+            fast.backward(loss, optimizer, batch_idx, len(train_loader))
+        if on_step is not None and fast.is_step(batch_idx, len(train_loader)):
+            # mid-epoch checkpoint hook, never between accumulated micro-batches
+            on_step(batch_idx + 1)
+        seen += len(images)
+
+        curr_loss += loss.sum().item()
+        _, preds = torch.max(output, 1)
+        t_pred += torch.sum(preds == targets.data).item()
+
+        if batch_idx % 10 == 0:
+            print(
+                "Train Epoch: {} [{}/{} ({:.0f}%)]\tLoss: {:.6f}".format(
+                    epoch,
+                    batch_idx * len(images),
+                    len(train_loader.dataset),
+                    100.0 * batch_idx / len(train_loader),
+                    loss.item(),
+                )
+            )
+
+            train_loss.append(loss.sum().item() / len(images))
+            train_acc.append(preds.sum().item() / len(images))
+    # totals over every process when training is distributed
+    curr_loss, t_pred, seen = all_reduce_sum([curr_loss, t_pred, seen], device)
+    t_pred, seen = int(t_pred), int(seen)
+    epoch_loss = curr_loss / seen
+    epoch_acc = t_pred / seen
+
+    train_loss.append(epoch_loss)
+    train_acc.append(epoch_acc)
+
+    elapsed = time.perf_counter() - since
+    print(f"Train throughput: {seen / elapsed:.1f} images/s ({seen} images in {elapsed:.1f}s)")
+
+    print(
+        "\nTrain set: Average loss: {:.4f}, Accuracy: {}/{} ({:.0f}%)\n".format(
+            epoch_loss,
+            t_pred,
+            seen,
+            100.0 * epoch_acc,
+        )
+    )
+
+    return train_loss, train_acc, epoch_loss
+
+
+def valid(
+    model, device, test_loader, criterion, epoch, valid_loss, valid_acc, mse=None, fast=None
+):
+    # the student is validated on the hard labels only
+    if fast is None:
+        fast = FastTraining(device)
+    model.eval()
+    test_loss = 0
+    correct = 0
+    seen = 0
+
+    with torch.no_grad():
+        for batch_idx, (images, targets) in enumerate(test_loader):
+            images, targets = fast.batch(images, targets)
+            with fast.autocast():
+                output = model(images)
+                loss = criterion(output, targets)
+
+            test_loss += loss.sum().item()
+
+            _, preds = torch.max(output, 1)
+            correct += torch.sum(preds == targets.data).item()
+            seen += len(images)
+
+            if batch_idx % 10 == 0:
+                print(
+                    "Valid Epoch: {} [{}/{} ({:.0f}%)]\tLoss: {:.6f}".format(
+                        epoch,
+                        batch_idx * len(images),
+                        len(test_loader.dataset),
+                        100.0 * batch_idx / len(test_loader),
+                        loss.item(),
+                    )
+                )
+
+                valid_loss.append(loss.sum().item() / len(images))
+                valid_acc.append(preds.sum().item() / len(images))
+
+    test_loss, correct, seen = all_reduce_sum([test_loss, correct, seen], device)
+    correct, seen = int(correct), int(seen)
+    epoch_loss = test_loss / seen
+    epoch_acc = correct / seen
+
+    valid_loss.append(epoch_loss)
+    valid_acc.append(epoch_acc)
+
+    print(
+        "Valid Set: Average loss: {:.4f}, Accuracy: {}/{} ({:.0f}%)\n".format(
+            epoch_loss,
+            correct,
+            seen,
+            100.0 * epoch_acc,
+        )
+    )
+
+    return valid_loss, valid_acc
+
+
+def speed_accuracy(model, loader, device, name):
+    """Accuracy and images/second of `model` (student or ensemble teacher) on `loader`."""
+    model.eval()
+    correct = 0
+    seen = 0
+    elapsed = 0.0
+    with torch.no_grad():
+        for images, targets in loader:
+            images, targets = images.to(device), targets.to(device)
+            if device.type == "cuda":
+                torch.cuda.synchronize()
+            start = time.perf_counter()
+            probs = teacher_probs(model, images)
+            if device.type == "cuda":
+                torch.cuda.synchronize()
+            elapsed += time.perf_counter() - start
+            correct += torch.sum(probs.argmax(dim=1) == targets).item()
+            seen += len(images)
+
+    accuracy = correct / max(seen, 1)
+    fps = seen / max(elapsed, 1e-9)
+    print(f"{name:<10} accuracy {100.0 * accuracy:6.2f}%  {fps:8.1f} frames/s")
+    return accuracy, fps
@@ -1,4 +1,7 @@
+import time
 import torch
+from train.distributed import all_reduce_sum
+from train.fast import FastTraining
 
 
 def train(
@@ -11,19 +14,30 @@ def train(
     train_loss,
     train_acc,
     mse=None,
+    fast=None,
+    on_step=None,
 ):
+    if fast is None:
+        fast = FastTraining(device)
     model.train()
+    optimizer.zero_grad()
+    since = time.perf_counter()
+    seen = 0
 
     curr_loss = 0
     t_pred = 0
     for batch_idx, (images, targets) in enumerate(train_loader):
-        images, targets = images.to(device), targets.to(device)
-        optimizer.zero_grad()
-        output = model(images).squeeze()
-        loss = criterion(output, targets)
-
-        loss.backward()
-        optimizer.step()
+        images, targets = fast.batch(images, targets)
+        with fast.sync(model, batch_idx, len(train_loader)):
+            with fast.autocast():
+                output = model(images).squeeze()
+                loss = criterion(output, targets)
+
+            fast.backward(loss, optimizer, batch_idx, len(train_loader))
+        if on_step is not None and fast.is_step(batch_idx, len(train_loader)):
+            # mid-epoch checkpoint hook, never between accumulated micro-batches
+            on_step(batch_idx + 1)
+        seen += len(images)
 
         curr_loss += loss.sum().item()
         _, preds = torch.max(output, 1)
@@ -42,18 +56,24 @@ def train(
 
             train_loss.append(loss.sum().item() / len(images))
             train_acc.append(preds.sum().item() / len(images))
-    epoch_loss = curr_loss / len(train_loader.dataset)
-    epoch_acc = t_pred / len(train_loader.dataset)
+    # totals over every process when training is distributed
+    curr_loss, t_pred, seen = all_reduce_sum([curr_loss, t_pred, seen], device)
+    t_pred, seen = int(t_pred), int(seen)
+    epoch_loss = curr_loss / seen
+    epoch_acc = t_pred / seen
 
     train_loss.append(epoch_loss)
     train_acc.append(epoch_acc)
 
+    elapsed = time.perf_counter() - since
+    print(f"Train throughput: {seen / elapsed:.1f} images/s ({seen} images in {elapsed:.1f}s)")
+
     print(
         "\nTrain set: Average loss: {:.4f}, Accuracy: {}/{} ({:.0f}%)\n".format(
             epoch_loss,
             t_pred,
-            len(train_loader.dataset),
-            100.0 * t_pred / len(train_loader.dataset),
+            seen,
+            100.0 * epoch_acc,
         )
     )
 
@@ -61,23 +81,28 @@ def train(
 
 
 def valid(
-    model, device, test_loader, criterion, epoch, valid_loss, valid_acc, mse=None
+    model, device, test_loader, criterion, epoch, valid_loss, valid_acc, mse=None, fast=None
 ):
+    if fast is None:
+        fast = FastTraining(device)
     model.eval()
     test_loss = 0
     correct = 0
+    seen = 0
 
     with torch.no_grad():
         for batch_idx, (images, targets) in enumerate(test_loader):
-            images, targets = images.to(device), targets.to(device)
-            output = model(images).squeeze()
+            images, targets = fast.batch(images, targets)
+            with fast.autocast():
+                output = model(images).squeeze()
 
-            loss = criterion(output, targets)
+                loss = criterion(output, targets)
 
             test_loss += loss.sum().item()
 
             _, preds = torch.max(output, 1)
-            correct += torch.sum(preds == targets.data)
+            correct += torch.sum(preds == targets.data).item()
+            seen += len(images)
 
             if batch_idx % 10 == 0:
                 print(
@@ -93,18 +118,21 @@ def valid(
                 valid_loss.append(loss.sum().item() / len(images))
                 valid_acc.append(preds.sum().item() / len(images))
 
-    epoch_loss = test_loss / len(test_loader.dataset)
-    epoch_acc = correct / len(test_loader.dataset)
+    # totals over every process when training is distributed
+    test_loss, correct, seen = all_reduce_sum([test_loss, correct, seen], device)
+    correct, seen = int(correct), int(seen)
+    epoch_loss = test_loss / seen
+    epoch_acc = correct / seen
 
     valid_loss.append(epoch_loss)
-    valid_acc.append(epoch_acc.item())
+    valid_acc.append(epoch_acc)
 
     print(
         "Valid Set: Average loss: {:.4f}, Accuracy: {}/{} ({:.0f}%)\n".format(
             epoch_loss,
             correct,
-            len(test_loader.dataset),
-            100.0 * correct / len(test_loader.dataset),
+            seen,
+            100.0 * epoch_acc,
         )
     )
 
@@ -1,50 +1,45 @@
 # genconvit.py
 import torch
 import torch.nn as nn
-from detection.GenConViT_heatmap.model.genconvit_ed import GenConViTED
-from detection.GenConViT_heatmap.model.genconvit_vae import GenConViTVAE
+import weakref
+from detection.GenConViT.model.genconvit import RegistryModule, acquire_submodel, _release_all
+from detection.model_registry import registry
 
-class GenConViT(nn.Module):
-    def __init__(self, config, ed, vae, net, fp16):
+class GenConViT(RegistryModule):
+    def __init__(self, config, ed, vae, net, fp16, device='cpu'):
         super(GenConViT, self).__init__()
         self.net = net
         self.fp16 = fp16
 
-        # init the ED model
-        self.model_ed = GenConViTED(config)
-        checkpoint_ed = torch.load(f'detection/GenConViT_heatmap/weight/{ed}.pth', map_location='cpu')
-        if 'state_dict' in checkpoint_ed:
-            self.model_ed.load_state_dict(checkpoint_ed['state_dict'])
-        else:
-            self.model_ed.load_state_dict(checkpoint_ed)
-        self.model_ed.eval()
-        if self.fp16:
-            self.model_ed.half()
-
-        # init the VAE model
-        self.model_vae = GenConViTVAE(config)
-        checkpoint_vae = torch.load(f'detection/GenConViT_heatmap/weight/{vae}.pth', map_location='cpu')
-        if 'state_dict' in checkpoint_vae:
-            self.model_vae.load_state_dict(checkpoint_vae['state_dict'])
-        else:
-            self.model_vae.load_state_dict(checkpoint_vae)
-        self.model_vae.eval()
-        if self.fp16:
-            self.model_vae.half()
+        # ED and VAE come from the process-wide registry, so the detection page
+        # and this page share the same resident instances.
+        keys = []
+        try:
+            if self.net != 'vae':
+                key, self.model_ed = acquire_submodel('ed', config, ed, fp16, device)
+                keys.append(key)
+            if self.net != 'ed':
+                key, self.model_vae = acquire_submodel('vae', config, vae, fp16, device)
+                keys.append(key)
+        except FileNotFoundError as e:
+            for key in keys:
+                registry.release(key)
+            raise Exception(str(e))
+        self._finalizer = weakref.finalize(self, _release_all, keys)
 
     def forward(self, x):
         """Return classification logits & some reconstruction depending on net."""
         if self.net == 'ed':
             # Just ED
-            logits, decimg = self.model_ed(x)  # shape [N,2], [N,3,224,224]
+            logits, decimg = self.model_ed.forward_decoded(x)  # shape [N,2], [N,3,224,224]
             return logits, decimg
         elif self.net == 'vae':
             # Just VAE
-            logits, decimg = self.model_vae(x) # shape [N,2], [N,3,224,224]
+            logits, decimg = self.model_vae(x) # shape [N,2], None (the VAE only reconstructs in training)
             return logits, decimg
         else:
             # net='genconvit' => combine ED and VAE
-            logits_ed, dec_ed = self.model_ed(x)
+            logits_ed, dec_ed = self.model_ed.forward_decoded(x)
             logits_vae, dec_vae = self.model_vae(x)
 
             # For classification, average the two logits => shape [N,2]
@@ -10,6 +10,7 @@ from detection.GenConViT_heatmap.dataset.loader import normalize_data
 from detection.GenConViT_heatmap.model.config import load_config
 from detection.GenConViT_heatmap.model.genconvit import GenConViT
 from decord import VideoReader, cpu
+from detection import runtime
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
 
@@ -20,14 +21,11 @@ def load_genconvit(config, net, ed_weight, vae_weight, fp16):
         ed= ed_weight,
         vae= vae_weight, 
         net=net,
-        fp16=fp16
+        fp16=fp16,
+        device=device,
     )
 
-    model.to(device)
-    model.eval()
-    if fp16:
-        model.half()
-
+    # device, eval mode and fp16 are applied by the registry to the shared submodels
     return model
 
 
@@ -109,26 +107,32 @@ def real_or_fake(prediction):
 
 
 def extract_frames(video_file, frames_nums=15):
-    vr = VideoReader(video_file, ctx=cpu(0))
+    vr = VideoReader(video_file, ctx=cpu(0), num_threads=runtime.decode_threads())
     step_size = max(1, len(vr) // frames_nums)  # Calculate the step size between frames
     return vr.get_batch(
         list(range(0, len(vr), step_size))[:frames_nums]
     ).asnumpy()  # seek frames with step_size
 
 
-def df_face(vid, num_frames, net):
+def df_face(vid, num_frames, net, progress=None):
     """
     Extract frames from the video, detect faces, and return:
       - all original frames
       - preprocessed face tensor(s)
       - bounding boxes for each face
       - frame indices for each face
+
+    `progress(stage, done, total)` is called after decoding and after face detection.
     """
     # 1) Extract frames
     frames = extract_frames(vid, num_frames)
+    if progress:
+        progress("decode", 1, 1)
 
     # 2) Detect faces
     face_array, boxes, frame_indices = face_rec(frames)
+    if progress:
+        progress("faces", 1, 1)
 
     # 3) Preprocess if at least one face found
     if len(face_array) > 0:
@@ -10,6 +10,7 @@ import cv2
 from captum.attr import GuidedBackprop
 from detection.GenConViT_heatmap.model.config import load_config
 from detection.GenConViT_heatmap.model.pred_func import load_genconvit, df_face, is_video, set_result, store_result, real_or_fake
+from detection import runtime
 
 class FakeLogitWrapper(nn.Module):
     def __init__(self, original_model, fake_index=1):
@@ -30,10 +31,70 @@ def compute_guided_backprop_saliency(wrapped_model, input_tensor):
     attributions = gbp.attribute(input_tensor, target=None)
     return attributions[0]
 
-def predict(vid_file, model, net, result, num_frames=15, klass="uncategorized", count=0, accuracy=-1, correct_label=None, compression=None, output_dir="heatmaps", frame_callback=None):
+def saliency_to_heatmap(attributions, is_fake):
+    """Turn guided-backprop attributions for one face into a BGR uint8 JET heatmap."""
+    saliency = attributions.sum(dim=0).abs()
+    if is_fake:
+        mean_ = saliency.mean().item()
+        std_ = saliency.std().item()
+        threshold_val = mean_ + 0.5 * std_
+        saliency[saliency < threshold_val] = 0.0
+        saliency *= 3.0
+        sal_np = saliency.cpu().numpy()
+        sal_np = cv2.GaussianBlur(sal_np, (15, 15), 5.0)
+        saliency = torch.from_numpy(sal_np).float().to(saliency.device)
+    smin, smax = saliency.min(), saliency.max()
+    if smax > smin:
+        saliency = (saliency - smin) / (smax - smin)
+    sal_np = saliency.detach().cpu().numpy()
+    return cv2.applyColorMap((sal_np * 255).astype(np.uint8), cv2.COLORMAP_JET)
+
+def composite_frames(frames, heatmaps, boxes, frame_indices, alpha=0.8):
+    """
+    Blend every face heatmap of a source frame in a single pass.
+
+    Faces are grouped by `frame_indices`, so each frame is converted to BGR
+    once and written once, however many faces it holds. The yielded BGR frame
+    is a reused buffer: consume (write/copy) it before advancing the generator.
+
+    Yields:
+        (frame_idx, bgr_frame) for each source frame that contains a face.
+    """
+    by_frame = {}
+    for i, frame_idx in enumerate(frame_indices):
+        if frame_idx < len(frames):
+            by_frame.setdefault(frame_idx, []).append(i)
+    if not by_frame:
+        return
+
+    canvas = np.empty_like(frames[0])
+    heat_buf = np.empty_like(canvas)
+    for frame_idx in sorted(by_frame):
+        frame = frames[frame_idx]
+        if frame.shape != canvas.shape:
+            canvas = np.empty_like(frame)
+            heat_buf = np.empty_like(canvas)
+        cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=canvas)
+        for i in by_frame[frame_idx]:
+            top, right, bottom, left = boxes[i]
+            face_bgr = canvas[top:bottom, left:right]
+            if face_bgr.size == 0:
+                continue
+            face_h, face_w = face_bgr.shape[:2]
+            heat_roi = heat_buf[top:bottom, left:right]
+            cv2.resize(heatmaps[i], (face_w, face_h), dst=heat_roi, interpolation=cv2.INTER_AREA)
+            cv2.addWeighted(face_bgr, alpha, heat_roi, 1 - alpha, 0, dst=face_bgr)
+        yield frame_idx, canvas
+
+def predict(vid_file, model, net, result, num_frames=15, klass="uncategorized", count=0, accuracy=-1, correct_label=None, compression=None, output_dir="heatmaps", frame_callback=None, progress=None):
+    """
+    Score one video and write its heatmap frames. `progress(stage, done, total)`
+    follows the real stages: "decode", "faces", "score", "saliency" (per face)
+    and "frame" (per composited frame written).
+    """
     count += 1
     print(f"\n[{count}] Processing: {vid_file}")
-    frames, df_tensor, boxes, frame_indices = df_face(vid_file, num_frames, net)
+    frames, df_tensor, boxes, frame_indices = df_face(vid_file, num_frames, net, progress)
     if len(df_tensor) == 0:
         y, y_val = 0, 0.5
         store_result(result, os.path.basename(vid_file), y, y_val, klass, correct_label, compression)
@@ -59,6 +120,8 @@ def predict(vid_file, model, net, result, num_frames=15, klass="uncategorized",
     store_result(result, os.path.basename(vid_file), y, y_val, klass, correct_label, compression)
     pred_label = real_or_fake(y)
     print(f"Video => {pred_label} Score={y_val:.3f}")
+    if progress:
+        progress("score", 1, 1)
 
     if accuracy > -1 and correct_label is not None:
         if correct_label == pred_label:
@@ -67,48 +130,27 @@ def predict(vid_file, model, net, result, num_frames=15, klass="uncategorized",
     is_fake = (pred_label == "FAKE")
     wrapped = FakeLogitWrapper(model)
 
+    heatmaps = np.empty((len(df_tensor), 224, 224, 3), dtype=np.uint8)
     for i in range(len(df_tensor)):
         face_in = df_tensor[i].unsqueeze(0)
         face_in.requires_grad_()
         attributions = compute_guided_backprop_saliency(wrapped, face_in)
-        saliency = attributions.sum(dim=0).abs()
-        if is_fake:
-            mean_ = saliency.mean().item()
-            std_ = saliency.std().item()
-            threshold_val = mean_ + 0.5 * std_
-            saliency[saliency < threshold_val] = 0.0
-            saliency *= 3.0
-            sal_np = saliency.cpu().numpy()
-            sal_np = cv2.GaussianBlur(sal_np, (15, 15), 5.0)
-            saliency = torch.from_numpy(sal_np).float().to(saliency.device)
-        smin, smax = saliency.min(), saliency.max()
-        if smax > smin:
-            saliency = (saliency - smin) / (smax - smin)
-        sal_np = saliency.cpu().numpy()
-        heatmap = cv2.applyColorMap((sal_np * 255).astype(np.uint8), cv2.COLORMAP_JET).astype(np.float32)
-        top, right, bottom, left = boxes[i]
-        frame_idx = frame_indices[i]
-        if frame_idx >= len(frames):
-            continue
-        orig_frame_bgr = cv2.cvtColor(frames[frame_idx], cv2.COLOR_RGB2BGR).astype(np.float32)
-        face_bgr = orig_frame_bgr[top:bottom, left:right]
-        if face_bgr.size == 0:
-            continue
-        face_h, face_w = face_bgr.shape[:2]
-        heatmap_resized = cv2.resize(heatmap, (face_w, face_h), interpolation=cv2.INTER_AREA)
-        alpha = 0.8
-        overlay = cv2.addWeighted(face_bgr, alpha, heatmap_resized, 1 - alpha, 0)
-        overlay = np.clip(overlay, 0, 255).astype(np.uint8)
-        orig_frame_bgr[top:bottom, left:right] = overlay
-        final_frame = cv2.cvtColor(orig_frame_bgr, cv2.COLOR_BGR2RGB)
-        out_name = f"gbmap_{os.path.basename(vid_file)}_vid{count}_face{i}.jpg"
+        heatmaps[i] = saliency_to_heatmap(attributions, is_fake)
+        if progress:
+            progress("saliency", i + 1, len(df_tensor))
+
+    n_frames = len(set(frame_indices))
+    for n, (frame_idx, final_frame) in enumerate(composite_frames(frames, heatmaps, boxes, frame_indices), 1):
+        out_name = f"gbmap_{os.path.basename(vid_file)}_vid{count}_frame{frame_idx}.jpg"
         out_path = os.path.join(output_dir, out_name)
-        cv2.imwrite(out_path, final_frame[..., ::-1])
+        cv2.imwrite(out_path, final_frame)
         print(f"Saved => {out_path}")
 
         # Appeler le callback pour afficher l'image dans l'interface
         if frame_callback:
             frame_callback(out_path)
+        if progress:
+            progress("frame", n, n_frames)
 
     return result, accuracy, count, [y, y_val]
 
@@ -141,7 +183,9 @@ def main():
     parser.add_argument("--e", nargs='?', const='genconvit_ed_inference', default='genconvit_ed_inference')
     parser.add_argument("--v", '--value', nargs='?', const='genconvit_vae_inference', default='genconvit_vae_inference')
     parser.add_argument("--fp16", action="store_true")
+    parser.add_argument("--runtime", type=str, help="thread layout: auto, tune, off, or torch=4,interop=1,decode=2")
     args = parser.parse_args()
+    runtime.configure(args.runtime)
     root_dir = args.p
     dataset = args.d
     ed_weight = args.e
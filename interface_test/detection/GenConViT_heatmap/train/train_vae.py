@@ -19,7 +19,7 @@ def train(
     for batch_idx, (images, targets) in enumerate(train_loader):
         images, targets = images.to(device), targets.to(device)
         optimizer.zero_grad()
-        output, recons = model(images)
+        output, recons = model(images, with_recon=True)
         loss_m = criterion(output, targets)
         vae = mse(recons, images)
         loss = loss_m + vae  # +model.encoder.kl
@@ -71,7 +71,7 @@ def valid(model, device, test_loader, criterion, epoch, valid_loss, valid_acc, m
     with torch.no_grad():
         for batch_idx, (images, targets) in enumerate(test_loader):
             images, targets = images.to(device), targets.to(device)
-            output, recons = model(images)
+            output, recons = model(images, with_recon=True)
             loss_m = criterion(output, targets)
             vae = mse(recons, images)
             loss = loss_m + vae  # +model.encoder.kl
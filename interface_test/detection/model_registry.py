@@ -0,0 +1,87 @@
+import os
+import threading
+from collections import OrderedDict
+
+# RAM budget (MB) for models kept resident once nobody holds them anymore.
+DEFAULT_BUDGET_MB = int(os.environ.get("DEEPFAKE_MODEL_BUDGET_MB", 4096))
+
+
+def model_nbytes(model):
+    """Approximate resident size of a torch module (parameters + buffers)."""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of read-only models.
+
+    Models are keyed by (architecture, weights, precision, device) and handed
+    out as shared instances: every caller asking for the same key gets the same
+    object. Each `acquire` must be matched by a `release`. Released models stay
+    resident so switching pages does not reload them, and the least recently
+    used unreferenced models are evicted once the RAM budget is exceeded.
+    Models in use are never evicted.
+    """
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()  # key -> [model, refcount, nbytes]
+        self._lock = threading.RLock()
+
+    def acquire(self, key, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                model = loader()
+                entry = [model, 0, model_nbytes(model)]
+                self._entries[key] = entry
+                print(f"[registry] loaded {key} ({entry[2] / 2**20:.0f} MB)")
+            entry[1] += 1
+            self._entries.move_to_end(key)
+            self._evict()
+            return entry[0]
+
+    def release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry[1] = max(0, entry[1] - 1)
+            self._evict()
+
+    def set_budget(self, budget_mb):
+        with self._lock:
+            self.budget = int(budget_mb * 1024 * 1024)
+            self._evict()
+
+    def clear(self):
+        """Drop every unreferenced model."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e[1] == 0]:
+                del self._entries[key]
+
+    def resident_bytes(self):
+        with self._lock:
+            return sum(e[2] for e in self._entries.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                key: {"refs": e[1], "mb": e[2] / 2**20}
+                for key, e in self._entries.items()
+            }
+
+    def _evict(self):
+        total = sum(e[2] for e in self._entries.values())
+        for key in list(self._entries):
+            if total <= self.budget:
+                break
+            entry = self._entries[key]
+            if entry[1] == 0:
+                total -= entry[2]
+                del self._entries[key]
+                print(f"[registry] evicted {key}")
+
+
+registry = ModelRegistry()
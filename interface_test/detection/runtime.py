@@ -0,0 +1,193 @@
+import os
+import json
+import socket
+import tempfile
+import multiprocessing as mp
+from datetime import datetime
+from time import perf_counter
+import torch
+
+# Best thread layout per host, written by an explicit tune (--runtime tune).
+RUNTIME_FILE = os.environ.get(
+    "DEEPFAKE_RUNTIME_FILE",
+    os.path.join(os.path.expanduser("~"), ".cache", "deepfake_pfe", "runtime.json"),
+)
+
+_current = None
+
+
+def available_cpus():
+    """Cores this process may run on (respects taskset/cgroup affinity)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def candidate_layouts(cpus=None):
+    """
+    Thread layouts to try: how many cores go to torch inference, with how
+    many inter-op threads, and how many threads decord decodes with.
+    The first one is the static default.
+    """
+    cpus = cpus or available_cpus()
+    layouts = []
+    for share, interop in [(1.0, 1), (0.75, 1), (0.5, 1), (0.5, 2), (0.25, 1)]:
+        layout = {
+            "torch_threads": max(1, round(cpus * share)),
+            "interop_threads": interop,
+            "decode_threads": min(4, max(1, cpus // 4)),
+        }
+        if layout not in layouts:
+            layouts.append(layout)
+    return layouts
+
+
+def default_layout():
+    return dict(candidate_layouts()[0])
+
+
+def parse_layout(spec):
+    """'torch=4,interop=1,decode=2' -> layout dict."""
+    names = {"torch": "torch_threads", "interop": "interop_threads", "decode": "decode_threads"}
+    layout = default_layout()
+    for item in spec.split(","):
+        key, value = item.split("=")
+        layout[names[key.strip()]] = int(value)
+    return layout
+
+
+def apply(layout):
+    global _current
+    torch.set_num_threads(layout["torch_threads"])
+    try:
+        torch.set_num_interop_threads(layout["interop_threads"])
+    except RuntimeError:
+        # can only be set before the first inter-op parallel work of the process
+        pass
+    _current = layout
+    return layout
+
+
+def current():
+    return _current
+
+
+def decode_threads():
+    """decord num_threads for VideoReader (0 lets decord decide)."""
+    return _current["decode_threads"] if _current else 0
+
+
+def load(path=RUNTIME_FILE):
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        saved = json.load(f).get(socket.gethostname())
+    if saved is None or saved.get("cpus") != available_cpus():
+        return None
+    return saved["layout"]
+
+
+def save(layout, results, path=RUNTIME_FILE):
+    data = {}
+    if os.path.isfile(path):
+        with open(path) as f:
+            data = json.load(f)
+    data[socket.gethostname()] = {
+        "layout": layout,
+        "cpus": available_cpus(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+    # DEEPFAKE_RUNTIME_FILE may be a bare file name in the working directory
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _trial(layout, video, queue, iterations=10):
+    """Decode, detect faces, then run conv inference, in the order of a detection job (df_face + model)."""
+    import face_recognition
+    from decord import VideoReader, cpu
+
+    apply(layout)
+    net = torch.nn.Sequential(
+        torch.nn.Conv2d(3, 32, 3, 2), torch.nn.ReLU(),
+        torch.nn.Conv2d(32, 64, 3, 2), torch.nn.ReLU(),
+        torch.nn.Conv2d(64, 128, 3, 2), torch.nn.ReLU(),
+        torch.nn.AdaptiveAvgPool2d(1), torch.nn.Flatten(), torch.nn.Linear(128, 2),
+    ).eval()
+    x = torch.randn(8, 3, 224, 224)
+
+    start = perf_counter()
+    vr = VideoReader(video, ctx=cpu(0), num_threads=layout["decode_threads"])
+    frames = vr.get_batch(list(range(0, len(vr), 2))[:32]).asnumpy()
+    for frame in frames:
+        face_recognition.face_locations(frame, number_of_times_to_upsample=0, model="hog")
+    with torch.no_grad():
+        for _ in range(iterations):
+            net(x)
+    queue.put(perf_counter() - start)
+
+
+def tune(layouts=None, save_result=True, verbose=True):
+    """Time every candidate layout in a fresh process and keep the fastest one."""
+    from detection.GenConViT.benchmark import synthetic_video
+
+    layouts = layouts or candidate_layouts()
+    video = synthetic_video(os.path.join(tempfile.mkdtemp(prefix="runtime_"), "tune.mp4"), 640, 360, 3)
+    ctx = mp.get_context("spawn")
+    results = []
+    for layout in layouts:
+        queue = ctx.Queue()
+        process = ctx.Process(target=_trial, args=(layout, video, queue))
+        process.start()
+        process.join()
+        seconds = queue.get() if process.exitcode == 0 else float("inf")
+        results.append({"layout": layout, "seconds": seconds})
+        if verbose:
+            print(f"[runtime] {layout} -> {seconds:.2f}s")
+    os.remove(video)
+
+    best = min(results, key=lambda r: r["seconds"])["layout"]
+    if save_result:
+        save(best, results)
+    if verbose:
+        print(f"[runtime] best layout for {socket.gethostname()}: {best}")
+    return best
+
+
+def configure(mode=None):
+    """
+    Apply the thread layout of this host, once per process.
+
+    mode: 'auto' (layout saved by a previous tune, else a static default),
+    'tune' (benchmark the layouts now and save the best), 'off' (torch
+    defaults) or an explicit 'torch=4,interop=1,decode=2'.
+    Defaults to the DEEPFAKE_RUNTIME environment variable, then 'auto'.
+    Only 'tune' runs the benchmark: it starts one process per layout and
+    takes a while, so it is never triggered implicitly (e.g. by the first
+    detection of the interface).
+    """
+    mode = mode or os.environ.get("DEEPFAKE_RUNTIME", "auto")
+    if _current is not None and mode in ("auto", None):
+        return _current
+    if mode == "off":
+        return None
+    if mode == "tune":
+        layout = tune()
+    elif mode == "auto":
+        layout = load()
+        if layout is None:
+            layout = default_layout()
+            print(
+                f"[runtime] no tuned layout for {socket.gethostname()}, using the default: "
+                "run once with --runtime tune (DEEPFAKE_RUNTIME=tune for the interface) to measure one"
+            )
+    else:
+        layout = parse_layout(mode)
+    print(f"[runtime] {layout}")
+    return apply(layout)
@@ -1,5 +1,4 @@
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
-import time
 import traceback
 
 
@@ -10,10 +9,30 @@ class DetectionWorker(QObject):
     finished = pyqtSignal(dict)  # Signal émis une fois la détection terminée avec les résultats.
     error = pyqtSignal(str)      # Signal émis en cas d'erreur avec un message.
     progress = pyqtSignal(int)   # Signal pour mettre à jour la barre de progression.
+    score = pyqtSignal(float)    # Score moyen "fake" en direct, mis à jour à chaque visage.
 
-    def __init__(self, video_path):
+    def __init__(self, video_path, num_frames=20):
         super().__init__()
         self.video_path = video_path
+        self.num_frames = num_frames
+        self._stopped = False
+        self._frame = (0, 1)  # (frame en cours, nombre de frames)
+
+    def stop(self):
+        """Demande l'arrêt : la détection s'arrête au prochain événement avec le score courant."""
+        self._stopped = True
+
+    def on_event(self, event):
+        """Reçoit les événements de predict_events au fil de l'eau."""
+        if event["event"] == "frame":
+            self._frame = (event["frame"], event["frames"])
+        elif (event["event"] == "faces" and event["count"] == 0) or event["event"] == "mean":
+            # frame terminée : décodée, visages cherchés et scorés
+            frame, frames = self._frame
+            self.stages("frames", frame + 1, frames)
+        if event["event"] == "mean":
+            self.score.emit(event["score"])
+        return not self._stopped
 
     @pyqtSlot()
     def run(self):
@@ -21,38 +40,37 @@ class DetectionWorker(QObject):
         Méthode appelée automatiquement quand le thread démarre.
         """
         try:
-            from detection.GenConViT.prediction import vids
-            from detection.GenConViT.model.pred_func import real_or_fake
-            import os
-
-            # Définir le chemin racine (dossier de la vidéo)
-            root_dir = os.path.dirname(self.video_path)
-
-            # Étape 1 : Chargement des modèles (20% de progression)
-            self.progress.emit(10)
-            time.sleep(0.5)  # Simulez une petite attente pour voir la progression
-            self.progress.emit(20)
-
-            # Étape 2 : Préparation des données (50% de progression)
-            time.sleep(0.5)  # Simulez une autre attente
-            self.progress.emit(50)
-
-            # Étape 3 : Lancement de la détection
-            result = vids(
-                ed_weight="genconvit_ed_inference",
-                vae_weight="genconvit_vae_inference",
-                root_dir=root_dir,
-                dataset=None,
-                num_frames=20,
-                net="genconvit",
-                fp16=False
+            from detection.GenConViT.prediction import predict, config
+            from detection.GenConViT.model.pred_func import load_genconvit, set_result
+            from detection import runtime
+            from progress import StageProgress
+
+            # 10% pour le chargement du modèle, le reste suit les frames traitées
+            self.stages = StageProgress(self.progress.emit, {"load": (0, 10), "frames": (10, 99)})
+
+            # Répartition des threads : celle mesurée par --runtime tune, sinon une répartition par défaut (jamais de mesure ici)
+            runtime.configure()
+
+            # Étape 1 : Chargement des modèles (partagés via le registre, instantané après le premier appel)
+            model = load_genconvit(
+                config, "genconvit", "genconvit_ed_inference", "genconvit_vae_inference", False
+            )
+            self.stages("load")
+
+            # Étape 2 : Détection sur la vidéo sélectionnée, frame par frame
+            result, _, _, _ = predict(
+                self.video_path,
+                model,
+                False,
+                set_result(),
+                self.num_frames,
+                "genconvit",
+                "uncategorized",
+                callback=self.on_event,
             )
-            time.sleep(1)  # Simulez une autre étape pour voir la progression
-            self.progress.emit(90)
 
-            # Étape 4 : Finalisation (100% de progression)
-            time.sleep(0.5)
-            self.progress.emit(100)
+            # Étape 3 : Finalisation (100% de progression)
+            self.stages.done()
 
             # Émettre les résultats une fois terminé
             self.finished.emit(result)
@@ -0,0 +1,191 @@
+"""
+Clients des workers de génération résidents (RVC pour la voix, Roop pour la vidéo).
+
+Chaque worker est un processus Python de longue durée, lancé dans le dossier
+de son projet au premier besoin, qui garde ses modèles en mémoire entre deux
+générations. L'interface lui envoie des tâches par une socket locale
+(multiprocessing.connection), un objet JSON par message, et reçoit des
+événements de progression jusqu'à l'événement final "done" ou "error".
+Les tâches désignent des fichiers à lire et à écrire : seul l'utilisateur qui
+a lancé le worker peut s'y connecter, avec la clé aléatoire que le worker
+tire à chaque démarrage et écrit dans ~/.cache/deepfake_pfe/<worker>-<port>.key
+(lisible par lui seul). Événements :
+    {"event": "progress", "stage": ..., "done": k, "total": n, "elapsed": s, ...}
+ProgressMeter les convertit en pourcentage, images/s et temps restant.
+
+Les chemins des projets viennent de la configuration : generation.json à côté
+de ce fichier (ou DEEPFAKE_GENERATION_CONFIG), puis les variables
+DEEPFAKE_RVC_PATH / DEEPFAKE_ROOP_PATH. Les chemins relatifs partent de
+interface_test/. Exemple de generation.json :
+    {"rvc": {"path": "D:/PFE/generation/Retrieval-based-Voice-Conversion-WebUI"}}
+"""
+
+import os
+import sys
+import json
+import threading
+import subprocess
+from time import sleep, monotonic
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.environ.get("DEEPFAKE_GENERATION_CONFIG", os.path.join(HERE, "generation.json"))
+KEY_DIR = os.path.join(os.path.expanduser("~"), ".cache", "deepfake_pfe")
+
+DEFAULTS = {
+    "python": sys.executable,
+    "rvc": {
+        "path": os.path.join("..", "generation", "Retrieval-based-Voice-Conversion-WebUI"),
+        "script": "rvc_server.py",
+        "port": 47861,
+        "args": [],
+    },
+    "roop": {
+        "path": os.path.join("..", "generation", "Roop_video"),
+        "script": "roop_server.py",
+        "port": 47862,
+        "args": ["--frame-processor", "face_swapper", "face_enhancer", "--execution-provider", "cpu"],
+    },
+}
+
+
+def load_config(path=CONFIG_FILE):
+    config = json.loads(json.dumps(DEFAULTS))
+    if os.path.isfile(path):
+        with open(path) as f:
+            for key, value in json.load(f).items():
+                if isinstance(value, dict):
+                    config.setdefault(key, {}).update(value)
+                else:
+                    config[key] = value
+    for name in [k for k, v in config.items() if isinstance(v, dict)]:
+        env = os.environ.get(f"DEEPFAKE_{name.upper()}_PATH")
+        if env:
+            config[name]["path"] = env
+        config[name]["path"] = os.path.normpath(os.path.join(HERE, config[name]["path"]))
+    return config
+
+
+class ServiceClient:
+    """
+    Client d'un worker de génération. Le worker est démarré s'il ne répond pas,
+    puis reste ouvert après la fermeture du client pour les tâches suivantes.
+    """
+
+    # workers lancés par ce processus (adresse -> Popen), partagés entre clients
+    processes = {}
+    lock = threading.Lock()
+
+    def __init__(self, name, config=None):
+        self.config = config or load_config()
+        self.python = self.config["python"]
+        self.service = self.config[name]
+        self.name = name
+        self.address = ("127.0.0.1", self.service["port"])
+        self.key_file = os.path.join(KEY_DIR, f"{name}-{self.service['port']}.key")
+
+    def _connect(self):
+        try:
+            with open(self.key_file) as f:
+                authkey = f.read().strip()
+        except FileNotFoundError:
+            # pas encore de clé : aucun worker n'a été lancé
+            raise ConnectionRefusedError(self.key_file)
+        return Client(self.address, authkey=authkey.encode())
+
+    def start(self):
+        script = os.path.join(self.service["path"], self.service["script"])
+        if not os.path.isfile(script):
+            raise FileNotFoundError(f"Worker {self.name} introuvable : {script} (voir {CONFIG_FILE})")
+        command = [
+            self.python, "-u", self.service["script"],
+            "--port", str(self.service["port"]),
+            "--key-file", self.key_file,
+        ]
+        print(f"[{self.name}] démarrage du worker : {' '.join(command)}")
+        return subprocess.Popen(command + self.service.get("args", []), cwd=self.service["path"])
+
+    def connect(self, timeout=600):
+        """
+        Connexion au worker, lancé au besoin. Le worker ouvre son port avant de
+        charger ses modèles : pendant ce chargement (plusieurs minutes), la
+        connexion attend dans l'échange de clé. Avant l'ouverture du port, le
+        worker déjà lancé par ce processus est réutilisé au lieu d'en démarrer
+        un second.
+        """
+        deadline = monotonic() + timeout
+        waited = False
+        while True:
+            try:
+                return self._connect()
+            except (ConnectionRefusedError, AuthenticationError):
+                # port pas encore ouvert, ou clé pas encore écrite par le worker
+                pass
+            with self.lock:
+                process = self.processes.get(self.address)
+                if process is not None and process.poll() is not None:
+                    del self.processes[self.address]
+                    if waited:
+                        raise RuntimeError(
+                            f"Le worker {self.name} s'est arrêté (code {process.returncode}, port {self.address[1]} occupé ?)"
+                        )
+                    process = None
+                if process is None:
+                    self.processes[self.address] = self.start()
+            if monotonic() > deadline:
+                raise TimeoutError(f"Le worker {self.name} ne répond pas après {timeout}s")
+            waited = True
+            sleep(0.5)
+
+    def submit(self, job, on_event=None):
+        """Envoie une tâche et transmet chaque événement à `on_event` ; retourne l'événement final."""
+        with self.connect() as conn:
+            conn.send_bytes(json.dumps(job).encode())
+            while True:
+                event = json.loads(conn.recv_bytes())
+                if event["event"] in ("done", "error"):
+                    return event
+                if on_event:
+                    on_event(event)
+
+
+# unité d'un événement -> (libellé, libellé du débit)
+UNITS = {"frame": ("images", "img/s"), "segment": ("segments", "seg/s")}
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+class ProgressMeter:
+    """
+    Pourcentage et texte de barre de progression à partir des événements
+    "progress" d'un worker. Chaque étape occupe une plage de la barre ; une
+    étape découpée en `steps` sous-étapes (un processeur Roop par sous-étape)
+    partage sa plage entre elles. Le débit et le temps restant sont calculés
+    sur l'étape en cours, à partir de done/total et du temps écoulé.
+    """
+
+    def __init__(self, stages, labels=None):
+        self.stages = stages  # {étape: (début %, fin %)}
+        self.labels = labels or {}
+        self.value = 0
+
+    def update(self, event):
+        start, end = self.stages.get(event["stage"], (self.value, self.value))
+        steps = event.get("steps") or 1
+        span = (end - start) / steps
+        start += span * (event.get("step") or 0)
+        done, total = event["done"], event["total"] or 1
+        # la barre ne recule jamais (événements de plusieurs threads)
+        self.value = max(self.value, int(start + span * min(1.0, done / total)))
+
+        name = event.get("name") or event["stage"]
+        text = f"{self.labels.get(name, name)} — {self.value}%"
+        unit = UNITS.get(event.get("unit"))
+        if unit and done and event.get("elapsed"):
+            rate = done / event["elapsed"]
+            text += f" — {done}/{total} {unit[0]} — {rate:.1f} {unit[1]} — reste {format_duration((total - done) / rate)}"
+        return self.value, text
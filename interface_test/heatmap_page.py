@@ -5,7 +5,6 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QPixmap, QIcon
 import os
-import time
 import traceback
 import datetime
 
@@ -22,33 +21,47 @@ class HeatmapWorker(QThread):
 
     def run(self):
         try:
-            from detection.GenConViT_heatmap.prediction import vids
-
-            self.progress.emit(10)
-            time.sleep(0.5)
-            self.progress.emit(40)
-
-            root_dir = os.path.dirname(self.video_path)
+            from detection.GenConViT_heatmap.prediction import predict
+            from detection.GenConViT_heatmap.model.config import load_config
+            from detection.GenConViT_heatmap.model.pred_func import load_genconvit, set_result
+            from detection import runtime
+            from progress import StageProgress
+
+            # Progression suivant les étapes réelles du pipeline
+            progress = StageProgress(self.progress.emit, {
+                "load": (0, 10),
+                "decode": (10, 20),
+                "faces": (20, 35),
+                "score": (35, 40),
+                "saliency": (40, 75),
+                "frame": (75, 99),
+            })
+
+            # Répartition des threads : celle mesurée par --runtime tune, sinon une répartition par défaut (jamais de mesure ici)
+            runtime.configure()
+
+            model = load_genconvit(
+                load_config(), "genconvit", "genconvit_ed_inference", "genconvit_vae_inference", False
+            )
+            progress("load")
 
             def save_frame(image_path):
                 """Enregistre et émet chaque frame générée."""
                 self.frame_generated.emit(image_path)
 
-            result = vids(
-                ed_weight="genconvit_ed_inference",
-                vae_weight="genconvit_vae_inference",
-                root_dir=root_dir,
-                dataset=None,
+            # Seule la vidéo sélectionnée est analysée
+            result, _, _, _ = predict(
+                self.video_path,
+                model,
+                "genconvit",
+                set_result(),
                 num_frames=20,
-                net="genconvit",
-                fp16=False,
                 output_dir=self.output_dir,
-                frame_callback=save_frame  # Utiliser le callback pour chaque frame
+                frame_callback=save_frame,  # Utiliser le callback pour chaque frame
+                progress=progress,
             )
 
-            self.progress.emit(90)
-            time.sleep(0.5)
-            self.progress.emit(100)
+            progress.done()
             self.finished.emit(result)
 
         except Exception as e:
@@ -1,52 +1,404 @@
+import os
+import csv
+import json
+import subprocess
+import threading
+import multiprocessing as mp
+from collections import deque
+from time import perf_counter
 import numpy as np
 import librosa
-from tensorflow.keras.models import load_model
-import cv2
 import argparse
+from audio_frontend import MelFrontend
+from audio_backends import load_backend
 
 SAMPLE_RATE = 16000
 N_MELS = 224
+MODEL_PATH = "detection_audio/final_model.h5"
+INPUT_SHAPE = (N_MELS, 224, 3)
+WINDOW_SECONDS = 5
+HOP_SECONDS = 2.5
+AUDIO_EXTS = ('.wav', '.mp3', '.flac')
+MANIFEST_EXTS = ('.txt', '.csv', '.jsonl')
 
-model = load_model("detection_audio/final_model.h5")
+class AudioModel:
+    """
+    Modèle audio partagé par tout le processus.
+
+    Le modèle n'est chargé qu'au premier besoin (predict ou warmup), puis sert
+    toutes les requêtes suivantes. Le backend (ONNX, TFLite ou Keras) est
+    choisi par audio_backends.load_backend : TensorFlow n'est importé que si
+    aucun modèle exporté n'est utilisable.
+    """
+
+    def __init__(self, path=MODEL_PATH):
+        self.path = path
+        self._model = None
+        self._lock = threading.RLock()
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                start = perf_counter()
+                self._model = load_backend(self.path)
+                print(f"[audio] modèle {self._model.name} chargé en {perf_counter() - start:.2f}s")
+            return self._model
+
+    def warmup(self):
+        """Charge le modèle et exécute une première prédiction (graphe construit d'avance)."""
+        start = perf_counter()
+        self.predict(np.zeros((1,) + INPUT_SHAPE, dtype=np.float32))
+        print(f"[audio] warmup en {perf_counter() - start:.2f}s")
+
+    def predict(self, batch):
+        with self._lock:
+            return self.load().predict(batch)
+
+class AudioModelProcess:
+    """
+    Même interface qu'AudioModel, mais le modèle vit dans un processus dédié
+    qui reste ouvert : TensorFlow ne se charge jamais dans le processus appelant
+    (interface Qt, pipeline vidéo PyTorch).
+    """
+
+    def __init__(self, path=MODEL_PATH):
+        ctx = mp.get_context("spawn")
+        self._conn, child = ctx.Pipe()
+        self._process = ctx.Process(target=_serve, args=(child, path), daemon=True)
+        self._process.start()
+        self._lock = threading.Lock()
+
+    def _call(self, command, batch=None):
+        with self._lock:
+            self._conn.send((command, batch))
+            status, value = self._conn.recv()
+        if status == "error":
+            raise RuntimeError(value)
+        return value
+
+    def warmup(self):
+        self._call("warmup")
+
+    def predict(self, batch):
+        return self._call("predict", batch)
+
+    def close(self):
+        with self._lock:
+            self._conn.send(None)
+        self._process.join()
+
+def _serve(conn, path):
+    model = AudioModel(path)
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        command, batch = request
+        try:
+            result = model.warmup() if command == "warmup" else model.predict(batch)
+            conn.send(("ok", result))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+_holder = None
+_holder_lock = threading.Lock()
+_frontends = {}
+
+def frontend(sr=SAMPLE_RATE):
+    """Frontend log-mel (fenêtre et banc de filtres précalculés), un par fréquence d'échantillonnage."""
+    if sr not in _frontends:
+        _frontends[sr] = MelFrontend(sr=sr, n_mels=N_MELS)
+    return _frontends[sr]
+
+def audio_model():
+    """
+    Modèle audio du processus, créé au premier appel. Avec DEEPFAKE_AUDIO_WORKER=1
+    il est placé dans un processus séparé de longue durée.
+    """
+    global _holder
+    with _holder_lock:
+        if _holder is None:
+            if os.environ.get("DEEPFAKE_AUDIO_WORKER", "0") == "1":
+                _holder = AudioModelProcess()
+            else:
+                _holder = AudioModel()
+        return _holder
 
 def process_audio(file_path):
     audio, sr = librosa.load(file_path, sr=SAMPLE_RATE)
+    return mel_from_audio(audio, sr)
+
+def mel_from_audio(audio, sr=SAMPLE_RATE):
     target_length = int(5 * sr)
     audio = audio[:target_length]
-    
-    mel_spec = librosa.feature.melspectrogram(
-    y=audio,
-    sr=sr,
-    n_mels=224,
-    hop_length=358,  # Modifié pour obtenir 224 frames
-    n_fft=2048
-)
-    mel_spec = librosa.power_to_db(mel_spec, ref=np.max)
-    mel_spec = np.stack([mel_spec] * 3, axis=-1)
-    return mel_spec
-
-def predict_file(file_path):
+    return frontend(sr).model_input(audio)[0]
+
+def predict_file(file_path, progress=None):
+   """`progress(stage, done, total)` est appelé après le log-mel ("features") puis après le modèle ("score")."""
    try:
        mel_spec = process_audio(file_path)
        if mel_spec is None:
            return None
+       if progress:
+           progress("features", 1, 1)
        mel_spec = np.expand_dims(mel_spec, axis=0)
-       prediction = model.predict(mel_spec)
+       prediction = audio_model().predict(mel_spec)
+       if progress:
+           progress("score", 1, 1)
        return prediction[0][1]
        
    except Exception as e:
        print(f"Erreur lors de l'inférence: {e}")
        return None
 
+def predict_audio(audio, sr=SAMPLE_RATE):
+   """Même prédiction que predict_file, sur un signal mono déjà décodé (à SAMPLE_RATE)."""
+   mel_spec = np.expand_dims(mel_from_audio(audio, sr), axis=0)
+   return audio_model().predict(mel_spec)[0][1]
+
+def stream_audio(file_path, sr=SAMPLE_RATE, block_seconds=60):
+   """
+   Décode le fichier par blocs de `block_seconds` (mono, `sr` Hz) via un pipe
+   ffmpeg, pour que la mémoire ne dépende pas de la durée de l'enregistrement.
+   Sans ffmpeg, le fichier est chargé en entier par librosa.
+   """
+   command = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", file_path,
+              "-vn", "-ac", "1", "-ar", str(sr), "-f", "f32le", "pipe:1"]
+   try:
+       proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+   except FileNotFoundError:
+       audio, _ = librosa.load(file_path, sr=sr)
+       for start in range(0, len(audio), int(block_seconds * sr)):
+           yield audio[start:start + int(block_seconds * sr)]
+       return
+   block_bytes = int(block_seconds * sr) * 4
+   try:
+       while True:
+           data = proc.stdout.read(block_bytes)
+           if not data:
+               break
+           yield np.frombuffer(data[:len(data) - len(data) % 4], dtype=np.float32)
+   finally:
+       proc.stdout.close()
+       proc.wait()
+
+def iter_windows(blocks, sr=SAMPLE_RATE, window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS):
+   """Fenêtres (début en échantillons, signal) qui se chevauchent ; la dernière est complétée par des zéros."""
+   win, hop = int(window_seconds * sr), int(hop_seconds * sr)
+   buf = np.zeros(0, dtype=np.float32)
+   start = 0
+   count = 0
+   for block in blocks:
+       buf = np.concatenate([buf, block])
+       while len(buf) >= win:
+           yield start, buf[:win]
+           buf = buf[hop:]
+           start += hop
+           count += 1
+   # fin du signal pas encore couverte par la dernière fenêtre
+   if len(buf) > (win - hop if count else 0):
+       yield start, np.pad(buf, (0, win - len(buf)))
+
+def mel_batch(windows, sr=SAMPLE_RATE):
+   """Log-mel (B, N_MELS, 224, 3) de fenêtres de même longueur, en une seule STFT."""
+   return frontend(sr).model_input(np.stack(windows))
+
+def predict_windows(file_path, window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS, batch_size=32, progress=None):
+   """
+   Analyse tout le fichier et pas seulement les 5 premières secondes : score
+   par fenêtre de `window_seconds` (pas de `hop_seconds`) et agrégat. Les
+   fenêtres sont traitées par lots de `batch_size`, mémoire constante.
+   `progress("window", done, total)` suit les fenêtres notées (total estimé
+   d'après la durée annoncée par le fichier).
+   """
+   windows = []
+   batch = []
+   total = None
+   if progress:
+       duration = librosa.get_duration(path=file_path)
+       total = max(1, int(np.ceil(max(0.0, duration - window_seconds) / hop_seconds)) + 1)
+
+   def flush():
+       scores = audio_model().predict(mel_batch([w for _, w in batch]))[:, 1]
+       for (start, _), score in zip(batch, scores):
+           windows.append({
+               "start": start / SAMPLE_RATE,
+               "end": start / SAMPLE_RATE + window_seconds,
+               "score": float(score),
+           })
+       batch.clear()
+       if progress:
+           progress("window", len(windows), total)
+
+   blocks = stream_audio(file_path, SAMPLE_RATE)
+   for start, window in iter_windows(blocks, SAMPLE_RATE, window_seconds, hop_seconds):
+       batch.append((start, window))
+       if len(batch) == batch_size:
+           flush()
+   if batch:
+       flush()
+
+   scores = [w["score"] for w in windows]
+   fake = [i for i, score in enumerate(scores) if score >= 0.5]
+   return {
+       "windows": windows,
+       "aggregate": {
+           "windows": len(windows),
+           "fake_windows": fake,
+           "max_score": max(scores, default=None),
+           "mean_score": float(np.mean(scores)) if scores else None,
+           "label": ("FAKE" if fake else "REAL") if scores else None,
+       },
+   }
+
+def collect_audio(source):
+   """
+   Fichiers à analyser : tous les .wav/.mp3/.flac d'un dossier (récursif), ou
+   ceux d'un manifeste (.txt : un chemin par ligne, .csv : colonne `file` ou
+   première colonne, .jsonl : clé `file`). Les chemins relatifs d'un manifeste
+   partent de son dossier.
+   """
+   if os.path.isdir(source):
+       files = []
+       for dirpath, _, filenames in os.walk(source):
+           files += [os.path.join(dirpath, f) for f in sorted(filenames) if f.lower().endswith(AUDIO_EXTS)]
+       return sorted(files)
+
+   root = os.path.dirname(os.path.abspath(source))
+   with open(source, newline='') as f:
+       if source.lower().endswith('.csv'):
+           rows = [row for row in csv.reader(f) if row]
+           column = 0
+           if rows and 'file' in rows[0]:
+               column = rows.pop(0).index('file')
+           paths = [row[column] for row in rows]
+       elif source.lower().endswith('.jsonl'):
+           paths = [json.loads(line)['file'] for line in f if line.strip()]
+       else:
+           paths = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+   return [os.path.join(root, p) for p in paths]
+
+def read_results(output):
+   """Fichiers déjà présents dans le fichier de résultats (reprise après interruption)."""
+   if not os.path.isfile(output):
+       return set()
+   with open(output, newline='') as f:
+       if output.lower().endswith('.jsonl'):
+           return {json.loads(line)['file'] for line in f if line.strip()}
+       return {row['file'] for row in csv.DictReader(f)}
+
+def _init_batch_worker():
+   # un seul thread FFT par processus : le parallélisme vient du pool
+   _frontends[SAMPLE_RATE] = MelFrontend(sr=SAMPLE_RATE, n_mels=N_MELS, fft_workers=1)
+
+def _batch_mel(file_path):
+   """Processus du pool : décodage des 5 premières secondes et log-mel (N_MELS, 224)."""
+   try:
+       audio, sr = librosa.load(file_path, sr=SAMPLE_RATE, duration=WINDOW_SECONDS)
+       if not len(audio):
+           return file_path, None, "fichier audio vide"
+       # les clips plus courts sont complétés par des zéros pour partager le lot
+       audio = np.pad(audio, (0, max(0, WINDOW_SECONDS * sr - len(audio))))
+       return file_path, frontend(sr).log_mel(audio)[0], None
+   except Exception as e:
+       return file_path, None, str(e)
+
+def predict_batch(source, output, workers=None, batch_size=32):
+   """
+   Analyse d'un dossier ou d'un manifeste : un pool de processus décode et
+   calcule les log-mel pendant que le processus principal, seul à utiliser le
+   modèle, les prédit par lots de `batch_size`. Chaque lot est ajouté à
+   `output` (.csv ou .jsonl) ; un fichier déjà présent dans `output` n'est pas
+   réanalysé, une analyse interrompue reprend donc où elle s'était arrêtée.
+   """
+   done = read_results(output)
+   files = [f for f in collect_audio(source) if f not in done]
+   workers = workers or os.cpu_count()
+   print(f"{len(done)} fichiers déjà analysés, {len(files)} à analyser.")
+
+   jsonl = output.lower().endswith('.jsonl')
+   fields = ['file', 'score', 'label', 'error']
+   new_file = not os.path.isfile(output) or os.path.getsize(output) == 0
+   out = open(output, 'a', newline='')
+   writer = None if jsonl else csv.DictWriter(out, fieldnames=fields)
+   if writer and new_file:
+       writer.writeheader()
+
+   def write(rows):
+       for row in rows:
+           if jsonl:
+               out.write(json.dumps(row) + "\n")
+           else:
+               writer.writerow(row)
+       out.flush()
+
+   batch = []
+
+   def flush():
+       mels = np.stack([mel for _, mel in batch])
+       scores = audio_model().predict(np.broadcast_to(mels[..., None], mels.shape + (3,)))[:, 1]
+       write([{
+           'file': file_path,
+           'score': float(score),
+           'label': "FAKE" if score >= 0.5 else "REAL",
+           'error': None,
+       } for (file_path, _), score in zip(batch, scores)])
+       batch.clear()
+
+   def collect(file_path, mel, error):
+       if mel is None:
+           write([{'file': file_path, 'score': None, 'label': None, 'error': error}])
+           return
+       batch.append((file_path, mel))
+       if len(batch) == batch_size:
+           flush()
+
+   start = perf_counter()
+   ctx = mp.get_context("spawn")
+   with ctx.Pool(workers, initializer=_init_batch_worker) as pool:
+       # nombre borné de spectrogrammes en attente : la mémoire ne dépend pas du nombre de fichiers
+       pending = deque()
+       for n, file_path in enumerate(files, 1):
+           if len(pending) >= 4 * workers:
+               collect(*pending.popleft().get())
+           pending.append(pool.apply_async(_batch_mel, (file_path,)))
+           if n % 500 == 0:
+               print(f"[{n}/{len(files)}] {n / (perf_counter() - start):.1f} fichiers/s")
+       while pending:
+           collect(*pending.popleft().get())
+   if batch:
+       flush()
+   out.close()
+   print(f"Terminé : {len(files)} fichiers en {perf_counter() - start:.1f}s")
+
 if __name__ == "__main__":
    parser = argparse.ArgumentParser(description='Détection de deepfake audio')
-   parser.add_argument('fichier_audio', type=str, help='Chemin vers le fichier audio à analyser (.wav, .mp3, .flac)')
+   parser.add_argument('fichier_audio', type=str, help='Fichier audio à analyser (.wav, .mp3, .flac), dossier ou manifeste (.txt, .csv, .jsonl)')
+   parser.add_argument('--full', action='store_true', help='Analyser tout le fichier par fenêtres de 5 s qui se chevauchent')
+   parser.add_argument('--hop', type=float, default=HOP_SECONDS, help='Pas entre deux fenêtres en secondes (avec --full)')
+   parser.add_argument('--batch', type=int, default=32, help='Fenêtres (ou fichiers, pour un dossier) par lot')
+   parser.add_argument('--o', type=str, default='audio_results.csv', help='Résultats d\'un dossier ou manifeste (.csv ou .jsonl)')
+   parser.add_argument('--w', type=int, default=None, help='Processus de décodage pour un dossier ou manifeste (défaut : nombre de cœurs)')
    args = parser.parse_args()
+
+   if os.path.isdir(args.fichier_audio) or args.fichier_audio.lower().endswith(MANIFEST_EXTS):
+       predict_batch(args.fichier_audio, args.o, args.w, args.batch)
+       exit(0)
    
-   if not args.fichier_audio.lower().endswith(('.wav', '.mp3', '.flac')):
+   if not args.fichier_audio.lower().endswith(AUDIO_EXTS):
        print("Erreur: Le fichier doit être au format .wav, .mp3 ou .flac")
        exit(1)
 
+   if args.full:
+       report = predict_windows(args.fichier_audio, WINDOW_SECONDS, args.hop, args.batch)
+       for window in report["windows"]:
+           print(f"[{window['start']:8.1f}s - {window['end']:8.1f}s] {window['score']:.2%}")
+       aggregate = report["aggregate"]
+       if aggregate["windows"]:
+           print(f"{aggregate['label']} : max {aggregate['max_score']:.2%}, moyenne {aggregate['mean_score']:.2%}, "
+                 f"{len(aggregate['fake_windows'])}/{aggregate['windows']} fenêtres suspectes")
+       exit(0)
+
    result = predict_file(args.fichier_audio)
    if result is not None:
        print(f"Probabilité que l'audio soit un deepfake : {result:.2%}")
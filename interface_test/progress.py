@@ -0,0 +1,38 @@
+"""
+Progression réelle des tâches de détection.
+
+Les pipelines (GenConViT, heatmap, audio) acceptent un callback
+`progress(stage, done, total)` appelé au fil de leurs étapes réelles : frames
+décodées, visages détectés, visages scorés, fenêtres audio notées... Aucune
+étape n'est simulée : la barre avance quand le travail avance.
+
+StageProgress est un tel callback : chaque étape occupe une plage de la barre
+et l'avancement done/total de l'étape est ramené dans cette plage.
+"""
+
+
+class StageProgress:
+
+    def __init__(self, emit, stages):
+        """
+        emit   : fonction recevant le pourcentage (ex. le signal progress.emit d'un worker)
+        stages : {étape: (début %, fin %)} ; les étapes inconnues sont ignorées
+        """
+        self.emit = emit
+        self.stages = stages
+        self.value = 0
+
+    def __call__(self, stage, done=1, total=1):
+        if stage not in self.stages:
+            return
+        start, end = self.stages[stage]
+        fraction = min(1.0, done / total) if total else 1.0
+        value = int(start + (end - start) * fraction)
+        # la barre ne recule jamais (les étapes peuvent se chevaucher)
+        if value > self.value:
+            self.value = value
+            self.emit(value)
+
+    def done(self):
+        self.value = 100
+        self.emit(100)
@@ -1,75 +1,79 @@
 from PyQt5.QtCore import QObject, pyqtSignal
-import subprocess
-import shlex
 import os
+from generation_service import ServiceClient, ProgressMeter
+
+# Options run.py de la génération (source, cible et sortie sont ajoutées par le worker Roop)
+ROOP_OPTIONS = [
+    "--output-video-quality", "0",
+    "--frame-processor", "face_swapper", "face_enhancer",
+    "--execution-provider", "cpu",
+    "--output-video-encoder", "libx264",
+    "--temp-frame-quality", "0",
+    "--skip-audio",
+    "--keep-fps",
+    "--many-faces",
+]
+
+# Plage de la barre occupée par chaque étape de roop.core.start ;
+# "frames" est partagée entre les processeurs (échange puis amélioration)
+STAGES = {"check": (0, 3), "extract": (3, 8), "frames": (8, 95), "encode": (95, 99)}
+LABELS = {
+    "check": "Vérification de la vidéo",
+    "extract": "Extraction des images",
+    "ROOP.FACE-SWAPPER": "Échange de visage",
+    "ROOP.FACE-ENHANCER": "Amélioration (GFPGAN)",
+    "encode": "Encodage de la vidéo",
+}
 
 class VideoGenerationWorker(QObject):
     progress = pyqtSignal(int)  # Pour la barre de progression
     finished = pyqtSignal(str)  # Chemin de la vidéo générée
     error = pyqtSignal(str)     # Message d'erreur
+    status = pyqtSignal(str)    # Texte de la barre : étape, images/s, temps restant
 
     def __init__(self, target_path, source_path, output_dir):
         super().__init__()
         self.target_path = target_path
         self.source_path = source_path
         self.output_dir = output_dir
+        self.meter = ProgressMeter(STAGES, LABELS)
+
+    def on_event(self, event):
+        """Événements de progression du worker Roop (update_progress), lus au fil de l'eau sur sa socket."""
+        if event["event"] == "progress":
+            value, text = self.meter.update(event)
+            self.progress.emit(value)
+            self.status.emit(text)
 
     def run(self):
         """
-        Lance la génération DeepFake vidéo via run.py, en mode unbuffered (-u)
-        afin que la sortie standard ne soit pas retardée.
-        On lit stdout et stderr en temps réel pour potentiellement mettre à jour
-        la barre de progression ou afficher des infos.
+        Envoie la génération DeepFake vidéo au worker Roop résident (lancé au
+        premier appel, voir generation_service.py) : l'analyseur de visages,
+        inswapper et GFPGAN restent chargés d'une génération à l'autre.
         """
 
         # 1) Construction du nom du fichier de sortie
         base_name = os.path.splitext(os.path.basename(self.target_path))[0]
         output_file = os.path.join(self.output_dir, f"{base_name}_deepfake.mp4")
 
-        # 2) Construction de la commande
-        # Remarquez le "python -u" pour éviter les buffers sur la sortie
-        command = (
-            f"python -u run.py "
-            f"--target \"{self.target_path}\" "
-            f"--output-video-quality 0 "
-            f"--source \"{self.source_path}\" "
-            f"-o \"{output_file}\" "
-            f"--execution-provider cpu "
-            f"--frame-processor face_swapper face_enhancer "
-            f"--output-video-encoder libx264 "
-            f"--temp-frame-quality 0 "
-            f"--skip-audio "
-            f"--keep-fps "
-            f"--many-faces"
-        )
-
-        print("[VideoGenerationWorker] Commande utilisée :", command)
-
-        # 3) Dossier d’exécution (important)
-        roop_video_dir = r"C:\Users\khoze\Desktop\M2 ISI\PFE\Deepfake-PFE-generation\generation\Roop_video"
-
-        # 4) Lancement du processus
-        process = subprocess.Popen(
-        shlex.split(command),
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        universal_newlines=True,
-        cwd=roop_video_dir,
-        shell=True
-    )
-
-        # Au lieu du while True, on attend la fin d’un coup :
-        stdout_data, stderr_data = process.communicate()
-
-        # Afficher tout (debug)
-        print("===== STDOUT =====\n", stdout_data)
-        print("===== STDERR =====\n", stderr_data)
+        # 2) Tâche envoyée au worker
+        job = {
+            "source": os.path.abspath(self.source_path),
+            "target": os.path.abspath(self.target_path),
+            "output": os.path.abspath(output_file),
+            "args": ROOP_OPTIONS,
+        }
+        print("[VideoGenerationWorker] Tâche :", job)
 
-        return_code = process.returncode
+        try:
+            result = ServiceClient("roop").submit(job, self.on_event)
+        except Exception as e:
+            self.error.emit(str(e))
+            return
 
-        if return_code == 0:
+        if result["event"] == "done":
+            print(f"[VideoGenerationWorker] Génération en {result['seconds']:.1f}s")
             self.progress.emit(100)
-            self.finished.emit(output_file)
+            self.finished.emit(result["output"])
         else:
-            msg = f"Le processus s'est terminé avec le code {return_code}\n{stderr_data}"
-            self.error.emit(msg)
+            self.error.emit(result["message"])